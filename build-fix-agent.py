@@ -4,436 +4,692 @@ BuildBot9000 Auto-Fix Agent
 Monitors failed builds and automatically applies fixes for common issues.
 """
 
+import errno
 import subprocess
 import time
-import re
 import os
 import json
+import queue
+import threading
+import urllib.error
+import urllib.request
 from datetime import datetime
 
-GH_CLI = '/opt/homebrew/bin/gh'
+from build_history import BuildHistory
+from build_metrics import parse_timestamp
+from failure_fingerprints import FINGERPRINT_TAIL, FingerprintCache, app_name_pattern, fingerprint, runner_fingerprint
+from failure_signatures import SignatureScanner
+from fix_pipeline import FixPipeline
+from github_api import GitHubAPIError, get_client, get_workflow_file, platform_for_job
+
+# Runs, jobs and the failures we've already attempted to fix (shared with the dashboard)
+history = BuildHistory()
+
+# Rebuilds go through the dashboard server's dispatch layer, so they're merged
+# with (not raced against) dashboard clicks and bulk triggers
+DASHBOARD_URL = os.environ.get('DASHBOARD_URL', 'http://localhost:8765')
+
+APPS = [
+    'blackjack21', 'keno4card', 'keno20card', 'kenocasino', 'kenosuper4x',
+    'roulette', 'vintageslots', 'videopokercasino', 'multihandpoker',
+    'fvg-multicardkeno', 'fvg-keno', 'fvg-fourcardkeno'
+]
+PLATFORMS = ['ios', 'aab', 'amazon', 'windows']
+
+# Failures arrive as events from the dashboard's /api/events stream; the full
+# scan over every app is only a reconciliation while the stream is up
+POLL_INTERVAL = 30  # Seconds between full scans while the event stream is unavailable
+RECONCILE_INTERVAL = 900  # Seconds between full scans while events are arriving
+EVENT_RETRY_DELAY = 5  # Seconds before reconnecting to the event stream
+
+failed_apps = queue.Queue()  # Apps whose builds just settled with a failure
+events_connected = threading.Event()
+app_status = {}  # Latest per-app status from the event stream
+
+# Failed job logs (tens of MB for Unity builds) are streamed and scanned chunk
+# by chunk instead of downloaded whole; the download stops once a decisive
+# failure signature (see failure_signatures.py) shows up
+LOG_CHUNK = 64 * 1024  # Characters scanned at a time when a whole-run log has to be used
+
+DEFAULT_RETRY_PLATFORM = 'ios'  # Rebuilt when a failed job's platform can't be told from its name (e.g. setup)
+
+# Identical failures (one broken runner failing every app) are analyzed once:
+# later ones are recognized from the tail of their log and reuse the result
+fingerprints = FingerprintCache()
+APP_NAMES = app_name_pattern(APPS)
+# Fixes that act on the runner machine: their analysis is only reused for the
+# same runner group, and the fix is run again each time
+LOCAL_FIXES = {'cocoapods_duplicate_repos', 'keychain_timeout', 'unity_terminated', 'git_authentication'}
+
+# The ledger of handled failures lives in the build history; entries older
+# than this are evicted, and failed runs that old are left alone
+FIX_HISTORY_RETENTION = 14 * 86400
+# An app that keeps failing the same way is rebuilt less and less often, then not at all
+MAX_RETRIES = 4  # Failed runs with one signature that get a rebuild, until the app builds successfully
+RETRY_BACKOFF = 300  # Seconds before the rebuild after the second such failure, doubling after each
+MAX_RETRY_DELAY = 3600
 
-# Track which failures we've already attempted to fix
-attempted_fixes = {}
 
 class BuildFailureAnalyzer:
-    """Analyzes build failures and determines appropriate fixes"""
+    """Analyzes build failures and determines appropriate fixes.
+
+    Which failure a log shows is decided by the rule table in
+    failure_signatures.py; the _fix_* methods here only act on it.
+    """
     
-    def __init__(self, app_name, run_id, job_name):
+    def __init__(self, app_name, run_id, job_name, job_id=None, platform=None, runner=None):
         self.app = app_name
         self.run_id = run_id
         self.job_name = job_name
-        self.logs = None
+        self.job_id = job_id
+        self.platform = platform
+        self.runner = runner
+        self.scanner = None
+        self.matches = []  # Every failure signature found: [{'rule', 'fix', 'lines': {phrase: line}}]
         self.fix_applied = None
+        self.fingerprint = None
+        self.error_lines = []
+        self.cached = None  # Earlier analysis of the same failure: {'fix', 'rules', 'fixes'}
+    
+    def identify(self):
+        """Fingerprint the failure from the tail of the job's log; True if it was already analyzed"""
+        if self.job_id is None:
+            return False
+        try:
+            tail = get_client().job_log_tail(self.app, self.job_id, FINGERPRINT_TAIL)
+        except Exception as e:
+            print(f"⚠️  Couldn't read the end of the log ({e}) - analyzing in full", flush=True)
+            return False
+        self.fingerprint, self.error_lines = fingerprint(tail, self.platform, APP_NAMES)
+        if self.fingerprint:
+            self.cached = fingerprints.get(self.fingerprint, runner_fingerprint(self.fingerprint, self.runner))
+        return self.cached is not None
         
     def fetch_logs(self):
-        """Fetch job logs from GitHub Actions"""
+        """Stream the failed job's log through the scanner, stopping at the first decisive error"""
+        self.scanner = SignatureScanner()
+        chunks = None
         try:
-            cmd = f"{GH_CLI} run view {self.run_id} --repo LuckyJackpotCasino/{self.app} --log"
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=30)
-            if result.returncode == 0:
-                self.logs = result.stdout
-                return True
-            return False
+            if self.job_id is not None:
+                chunks = get_client().stream_job_logs(self.app, self.job_id)
+            else:
+                # Job id unknown: fall back to the whole run's logs, scanned the same way
+                logs = get_client().download_run_logs(self.app, self.run_id)
+                chunks = (logs[i:i + LOG_CHUNK] for i in range(0, len(logs), LOG_CHUNK))
+            for text in chunks:
+                decisive = self.scanner.feed(text)
+                if decisive:
+                    print(f"⚡ Found {decisive['rule']} after {self.scanner.chars // 1024} KB - stopped reading", flush=True)
+                    break
+            else:
+                self.scanner.finish()
+            return True
         except Exception as e:
-            print(f"❌ Error fetching logs: {e}", flush=True)
-            return False
+            if not self.scanner.chars:
+                print(f"❌ Error fetching logs: {e}", flush=True)
+                return False
+            # Keep what arrived: the error is usually near where the download broke off
+            print(f"⚠️  Log download broke off after {self.scanner.chars // 1024} KB ({e}) - analyzing what arrived", flush=True)
+            self.scanner.finish()
+            return True
+        finally:
+            if chunks is not None:
+                chunks.close()
     
     def analyze_and_fix(self):
         """Analyze failure and apply fix if possible"""
-        if not self.logs:
+        if self.scanner is None or not self.scanner.chars:
             return None
         
-        # Pattern matching for common failures
-        fixes = [
-            self._fix_cocoapods_duplicate_repos,
-            self._fix_xcode_command_line_tools,
-            self._fix_provisioning_profile_not_found,
-            self._fix_keychain_timeout,
-            self._fix_unity_terminated,
-            self._fix_pod_install_failure,
-            self._fix_git_authentication,
-            self._fix_certificate_not_found,
-            self._fix_transient_network_error,
-            self._fix_windows_unity_not_found,
-            self._fix_windows_il2cpp_failure,
-            self._fix_windows_visual_studio_missing,
-            self._fix_windows_disk_space,
-        ]
+        # Every signature that matched, in priority order; the first fix that works wins
+        self.matches = self.scanner.matches()
+        if self.matches:
+            found = ', '.join(f"{m['rule']} (line {', '.join(map(str, sorted(set(m['lines'].values()))))})"
+                              for m in self.matches)
+            print(f"🔎 Signatures found: {found}", flush=True)
         
-        for fix_func in fixes:
-            result = fix_func()
+        return self.apply_fixes([match['fix'] for match in self.matches])
+    
+    def apply_fixes(self, fixes):
+        """Run the _fix_ methods in order, each once; the first one that works wins"""
+        for fix in dict.fromkeys(fixes):  # Several rules can share a fix
+            result = getattr(self, f"_fix_{fix}")()
             if result:
                 self.fix_applied = result
                 return result
-        
         return None
     
     def _fix_cocoapods_duplicate_repos(self):
         """Fix: CocoaPods duplicate repos causing conflicts"""
-        if 'duplicate sources' in self.logs.lower() or 'cocoapods/repos/cocoapods' in self.logs.lower():
-            print(f"🔧 Detected: CocoaPods duplicate repos issue", flush=True)
+        print(f"🔧 Detected: CocoaPods duplicate repos issue", flush=True)
             
-            # Clean up duplicate repos
-            home = os.path.expanduser('~')
-            cocoapods_dir = os.path.join(home, '.cocoapods/repos/cocoapods')
-            if os.path.exists(cocoapods_dir):
-                try:
-                    import shutil
-                    shutil.rmtree(cocoapods_dir)
-                    print(f"✅ Removed duplicate CocoaPods repo", flush=True)
-                    return {
-                        'issue': 'CocoaPods duplicate repos',
-                        'action': 'Removed ~/. cocoapods/repos/cocoapods',
-                        'retry': True
-                    }
-                except Exception as e:
-                    print(f"❌ Failed to remove duplicate repo: {e}", flush=True)
+        # Clean up duplicate repos
+        home = os.path.expanduser('~')
+        cocoapods_dir = os.path.join(home, '.cocoapods/repos/cocoapods')
+        if os.path.exists(cocoapods_dir):
+            try:
+                import shutil
+                shutil.rmtree(cocoapods_dir)
+                print(f"✅ Removed duplicate CocoaPods repo", flush=True)
+                return {
+                    'issue': 'CocoaPods duplicate repos',
+                    'action': 'Removed ~/. cocoapods/repos/cocoapods',
+                    'retry': True
+                }
+            except Exception as e:
+                print(f"❌ Failed to remove duplicate repo: {e}", flush=True)
         return None
     
     def _fix_xcode_command_line_tools(self):
         """Fix: xcode-select pointing to Command Line Tools instead of Xcode.app"""
-        if 'requires Xcode, but active developer directory' in self.logs and 'CommandLineTools' in self.logs:
-            print(f"🔧 Detected: DEVELOPER_DIR not set correctly", flush=True)
-            # This should be fixed in workflow now, but log it
-            return {
-                'issue': 'DEVELOPER_DIR pointing to CommandLineTools',
-                'action': 'Already fixed in workflow (DEVELOPER_DIR set at job level)',
-                'retry': True,
-                'workflow_update_needed': False
-            }
-        return None
+        print(f"🔧 Detected: DEVELOPER_DIR not set correctly", flush=True)
+        # This should be fixed in workflow now, but log it
+        return {
+            'issue': 'DEVELOPER_DIR pointing to CommandLineTools',
+            'action': 'Already fixed in workflow (DEVELOPER_DIR set at job level)',
+            'retry': True,
+            'workflow_update_needed': False
+        }
     
     def _fix_provisioning_profile_not_found(self):
         """Fix: Provisioning profile path incorrect"""
-        if 'No provisioning profile found after match' in self.logs:
-            print(f"🔧 Detected: Provisioning profile path issue", flush=True)
-            # This should be fixed in workflow, but could be a Match/Fastlane issue
-            return {
-                'issue': 'Provisioning profile not found',
-                'action': 'Check Fastlane Match configuration',
-                'retry': True,
-                'investigation_needed': True
-            }
-        return None
+        print(f"🔧 Detected: Provisioning profile path issue", flush=True)
+        # This should be fixed in workflow, but could be a Match/Fastlane issue
+        return {
+            'issue': 'Provisioning profile not found',
+            'action': 'Check Fastlane Match configuration',
+            'retry': True,
+            'investigation_needed': True
+        }
     
     def _fix_keychain_timeout(self):
         """Fix: Keychain locked or timed out"""
-        if 'keychain' in self.logs.lower() and ('locked' in self.logs.lower() or 'timeout' in self.logs.lower()):
-            print(f"🔧 Detected: Keychain timeout/lock issue", flush=True)
-            # Clean up stale keychains
-            try:
-                result = subprocess.run(
-                    "security list-keychains | grep ci-signing | xargs -I {} security delete-keychain {} || true",
-                    shell=True, capture_output=True, text=True, timeout=10
-                )
-                print(f"✅ Cleaned up stale CI keychains", flush=True)
-                return {
-                    'issue': 'Keychain locked/timeout',
-                    'action': 'Cleaned up stale keychains',
-                    'retry': True
-                }
-            except Exception as e:
-                print(f"❌ Failed to clean keychains: {e}", flush=True)
+        print(f"🔧 Detected: Keychain timeout/lock issue", flush=True)
+        # Clean up stale keychains
+        try:
+            result = subprocess.run(
+                "security list-keychains | grep ci-signing | xargs -I {} security delete-keychain {} || true",
+                shell=True, capture_output=True, text=True, timeout=10
+            )
+            print(f"✅ Cleaned up stale CI keychains", flush=True)
+            return {
+                'issue': 'Keychain locked/timeout',
+                'action': 'Cleaned up stale keychains',
+                'retry': True
+            }
+        except Exception as e:
+            print(f"❌ Failed to clean keychains: {e}", flush=True)
         return None
     
     def _fix_unity_terminated(self):
         """Fix: Unity terminated (exit code 143 - SIGTERM)"""
-        if 'Terminated: 15' in self.logs or 'exit code 143' in self.logs:
-            print(f"🔧 Detected: Unity process terminated", flush=True)
-            # Check if there are other Unity processes running
-            try:
-                result = subprocess.run(
-                    "ps aux | grep -i unity | grep -v grep | wc -l",
-                    shell=True, capture_output=True, text=True, timeout=5
-                )
-                unity_count = int(result.stdout.strip())
+        print(f"🔧 Detected: Unity process terminated", flush=True)
+        # Check if there are other Unity processes running
+        try:
+            result = subprocess.run(
+                "ps aux | grep -i unity | grep -v grep | wc -l",
+                shell=True, capture_output=True, text=True, timeout=5
+            )
+            unity_count = int(result.stdout.strip())
                 
-                if unity_count > 2:  # More than expected
-                    print(f"⚠️  Warning: {unity_count} Unity processes running - may cause conflicts", flush=True)
-                    return {
-                        'issue': 'Unity terminated (possible conflict)',
-                        'action': 'Multiple Unity instances detected',
-                        'retry': True,
-                        'note': f'{unity_count} Unity processes running'
-                    }
-                else:
-                    return {
-                        'issue': 'Unity terminated (transient)',
-                        'action': 'No obvious cause - safe to retry',
-                        'retry': True
-                    }
-            except:
-                pass
-        return None
-    
-    def _fix_pod_install_failure(self):
-        """Fix: CocoaPods install failure"""
-        if 'pod install' in self.logs.lower() and ('error' in self.logs.lower() or 'failed' in self.logs.lower()):
-            # Check for specific pod issues
-            if 'cdn.cocoapods.org' in self.logs:
-                print(f"🔧 Detected: CocoaPods CDN network issue", flush=True)
+            if unity_count > 2:  # More than expected
+                print(f"⚠️  Warning: {unity_count} Unity processes running - may cause conflicts", flush=True)
                 return {
-                    'issue': 'CocoaPods CDN network error',
-                    'action': 'Transient network issue',
+                    'issue': 'Unity terminated (possible conflict)',
+                    'action': 'Multiple Unity instances detected',
                     'retry': True,
-                    'delay': 60  # Wait 1 minute before retry
+                    'note': f'{unity_count} Unity processes running'
                 }
+            else:
+                return {
+                    'issue': 'Unity terminated (transient)',
+                    'action': 'No obvious cause - safe to retry',
+                    'retry': True
+                }
+        except:
+            pass
         return None
     
+    def _fix_pod_install_failure(self):
+        """Fix: CocoaPods install failure"""
+        print(f"🔧 Detected: CocoaPods CDN network issue", flush=True)
+        return {
+            'issue': 'CocoaPods CDN network error',
+            'action': 'Transient network issue',
+            'retry': True,
+            'delay': 60  # Wait 1 minute before retry
+        }
+    
     def _fix_git_authentication(self):
         """Fix: Git authentication failure"""
-        if 'Permission denied (publickey)' in self.logs or 'Authentication failed' in self.logs:
-            print(f"🔧 Detected: Git authentication failure", flush=True)
-            # Check SSH key configuration
-            try:
-                result = subprocess.run(
-                    "ssh -T git@github.com 2>&1",
-                    shell=True, capture_output=True, text=True, timeout=10
-                )
-                if 'successfully authenticated' in result.stdout or 'successfully authenticated' in result.stderr:
-                    return {
-                        'issue': 'Git authentication (transient)',
-                        'action': 'SSH key is valid - retry',
-                        'retry': True
-                    }
-                else:
-                    return {
-                        'issue': 'Git SSH key invalid',
-                        'action': 'SSH key verification failed',
-                        'retry': False,
-                        'manual_intervention_needed': True
-                    }
-            except:
-                pass
+        print(f"🔧 Detected: Git authentication failure", flush=True)
+        # Check SSH key configuration
+        try:
+            result = subprocess.run(
+                "ssh -T git@github.com 2>&1",
+                shell=True, capture_output=True, text=True, timeout=10
+            )
+            if 'successfully authenticated' in result.stdout or 'successfully authenticated' in result.stderr:
+                return {
+                    'issue': 'Git authentication (transient)',
+                    'action': 'SSH key is valid - retry',
+                    'retry': True
+                }
+            else:
+                return {
+                    'issue': 'Git SSH key invalid',
+                    'action': 'SSH key verification failed',
+                    'retry': False,
+                    'manual_intervention_needed': True
+                }
+        except:
+            pass
         return None
     
     def _fix_certificate_not_found(self):
         """Fix: Code signing certificate not found"""
-        if 'no local code signing identities' in self.logs.lower() or 'certificate' in self.logs.lower() and 'not found' in self.logs.lower():
-            print(f"🔧 Detected: Certificate installation issue", flush=True)
-            return {
-                'issue': 'Code signing certificate not found',
-                'action': 'Fastlane Match may need to re-sync',
-                'retry': True,
-                'note': 'Certificate may not have been installed to keychain properly'
-            }
-        return None
+        print(f"🔧 Detected: Certificate installation issue", flush=True)
+        return {
+            'issue': 'Code signing certificate not found',
+            'action': 'Fastlane Match may need to re-sync',
+            'retry': True,
+            'note': 'Certificate may not have been installed to keychain properly'
+        }
     
     def _fix_transient_network_error(self):
         """Fix: Transient network errors"""
-        network_errors = [
-            'connection refused',
-            'connection timeout',
-            'network is unreachable',
-            'temporary failure in name resolution',
-            'could not resolve host'
-        ]
-        
-        for error in network_errors:
-            if error in self.logs.lower():
-                print(f"🔧 Detected: Transient network error", flush=True)
-                return {
-                    'issue': 'Transient network error',
-                    'action': 'Network connectivity issue',
-                    'retry': True,
-                    'delay': 30
-                }
-        return None
+        print(f"🔧 Detected: Transient network error", flush=True)
+        return {
+            'issue': 'Transient network error',
+            'action': 'Network connectivity issue',
+            'retry': True,
+            'delay': 30
+        }
 
 
     def _fix_windows_unity_not_found(self):
         """Fix: Unity not found on Windows runner"""
-        if 'no unity installation found' in self.logs.lower() or 'unity.exe' in self.logs.lower() and 'not found' in self.logs.lower():
-            print(f"🔧 Detected: Unity not installed on Windows runner", flush=True)
-            return {
-                'issue': 'Unity not found on Windows runner',
-                'action': 'Install Unity via Hub on the Windows build server',
-                'retry': False,
-                'manual_intervention_needed': True
-            }
-        return None
+        print(f"🔧 Detected: Unity not installed on Windows runner", flush=True)
+        return {
+            'issue': 'Unity not found on Windows runner',
+            'action': 'Install Unity via Hub on the Windows build server',
+            'retry': False,
+            'manual_intervention_needed': True
+        }
 
     def _fix_windows_il2cpp_failure(self):
         """Fix: IL2CPP build failure on Windows (missing Visual Studio C++ components)"""
-        il2cpp_errors = [
-            'il2cpp error',
-            'il2cpp.exe did not run properly',
-            'buildFailedException: il2cpp',
-            'c++ compiler not found',
-            'msvc',
-        ]
-        for error in il2cpp_errors:
-            if error in self.logs.lower():
-                print(f"🔧 Detected: IL2CPP build failure on Windows", flush=True)
-                return {
-                    'issue': 'IL2CPP build failure (Windows)',
-                    'action': 'Verify Visual Studio Build Tools with C++ workload are installed on Windows runner',
-                    'retry': True,
-                    'note': 'IL2CPP requires Visual Studio with "Desktop development with C++" workload'
-                }
-        return None
+        print(f"🔧 Detected: IL2CPP build failure on Windows", flush=True)
+        return {
+            'issue': 'IL2CPP build failure (Windows)',
+            'action': 'Verify Visual Studio Build Tools with C++ workload are installed on Windows runner',
+            'retry': True,
+            'note': 'IL2CPP requires Visual Studio with "Desktop development with C++" workload'
+        }
 
     def _fix_windows_visual_studio_missing(self):
         """Fix: Visual Studio or Build Tools not found"""
-        if 'visual studio' in self.logs.lower() and ('not found' in self.logs.lower() or 'not installed' in self.logs.lower()):
-            print(f"🔧 Detected: Visual Studio not found on Windows runner", flush=True)
-            return {
-                'issue': 'Visual Studio Build Tools missing',
-                'action': 'Install Visual Studio Build Tools with C++ workload on Windows runner',
-                'retry': False,
-                'manual_intervention_needed': True
-            }
-        return None
+        print(f"🔧 Detected: Visual Studio not found on Windows runner", flush=True)
+        return {
+            'issue': 'Visual Studio Build Tools missing',
+            'action': 'Install Visual Studio Build Tools with C++ workload on Windows runner',
+            'retry': False,
+            'manual_intervention_needed': True
+        }
 
     def _fix_windows_disk_space(self):
         """Fix: Disk space issues on Windows runner"""
-        if 'not enough space' in self.logs.lower() or 'disk full' in self.logs.lower() or 'no space left' in self.logs.lower():
-            print(f"🔧 Detected: Disk space issue on Windows runner", flush=True)
-            return {
-                'issue': 'Windows runner disk space low',
-                'action': 'Clean old builds from C:\\Builds and Unity Library cache',
-                'retry': True,
-                'note': 'Consider running disk cleanup on the Windows build server'
-            }
-        return None
+        print(f"🔧 Detected: Disk space issue on Windows runner", flush=True)
+        return {
+            'issue': 'Windows runner disk space low',
+            'action': 'Clean old builds from C:\\Builds and Unity Library cache',
+            'retry': True,
+            'note': 'Consider running disk cleanup on the Windows build server'
+        }
+
+
+class FailedRun:
+    """The failed jobs of one run, handled together so their retries go out as one dispatch"""
+    
+    def __init__(self, app_name, run_id, jobs):
+        self.app = app_name
+        self.run_id = run_id
+        self.jobs = jobs  # A BuildFailureAnalyzer per failed job
+
+
+def handle_dashboard_event(event, data):
+    """Queue apps whose builds just settled with a failure"""
+    if event == 'snapshot':
+        app_status.clear()
+        app_status.update(data.get('status') or {})
+        settled = list(app_status)
+    elif event == 'status':
+        app = data.get('app')
+        changes = data.get('changes') or {}
+        app_status.setdefault(app, {}).update(changes)
+        settled = [app] if any(p in changes for p in PLATFORMS) else []
+    else:
+        return
+    
+    for app in settled:
+        status = app_status.get(app) or {}
+        states = [status.get(p) for p in PLATFORMS]
+        # Wait for the app's other builds to finish, as find_new_failures would
+        if 'failure' in states and not any(s in ('queued', 'in_progress', 'waiting') for s in states):
+            failed_apps.put(app)
+
+
+def follow_dashboard_events():
+    """Follow the dashboard's /api/events stream (Server-Sent Events), reconnecting as needed"""
+    last_id = None
+    warned = False
+    while True:
+        try:
+            request = urllib.request.Request(f"{DASHBOARD_URL}/api/events")
+            if last_id is not None:
+                request.add_header('Last-Event-ID', last_id)
+            # The server sends a keep-alive every 15s, so a minute of silence means it's gone
+            with urllib.request.urlopen(request, timeout=60) as stream:
+                events_connected.set()
+                warned = False
+                print(f"📡 Following build events from {DASHBOARD_URL}", flush=True)
+                event, data = None, []
+                for raw in stream:
+                    line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+                    if line.startswith('id:'):
+                        last_id = line[3:].strip()
+                    elif line.startswith('event:'):
+                        event = line[6:].strip()
+                    elif line.startswith('data:'):
+                        data.append(line[5:].lstrip())
+                    elif not line:
+                        if event and data:
+                            handle_dashboard_event(event, json.loads('\n'.join(data)))
+                        event, data = None, []
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            if not warned:
+                print(f"⚠️  No dashboard event stream ({e}) - scanning every {POLL_INTERVAL}s", flush=True)
+                warned = True
+        events_connected.clear()
+        time.sleep(EVENT_RETRY_DELAY)
 
 
 def monitor_and_fix_failures():
-    """Main monitoring loop"""
+    """Main monitoring loop: react to failure events, with a periodic full scan to reconcile.
+
+    The loop only decides which apps to check; the checks, log downloads,
+    analysis and retries run on the pipeline's pools.
+    """
     print(f"🤖 BuildBot9000 Auto-Fix Agent started at {datetime.now()}", flush=True)
     print(f"Monitoring for failed builds...\n", flush=True)
+    threading.Thread(target=follow_dashboard_events, name='dashboard-events', daemon=True).start()
     
+    last_scan = 0
     while True:
         try:
-            # Get list of recent workflow runs across all apps
-            apps = [
-                'blackjack21', 'keno4card', 'keno20card', 'kenocasino', 'kenosuper4x',
-                'roulette', 'vintageslots', 'videopokercasino', 'multihandpoker',
-                'fvg-multicardkeno', 'fvg-keno', 'fvg-fourcardkeno'
-            ]
-            
-            for app in apps:
-                check_app_failures(app)
+            interval = RECONCILE_INTERVAL if events_connected.is_set() else POLL_INTERVAL
+            if time.time() - last_scan >= interval:
+                if last_scan:
+                    report_pipeline()
+                evict_fix_history()
+                for app in APPS:
+                    pipeline.submit(app)
+                last_scan = time.time()
+                continue
             
-            # Sleep for 30 seconds before next check
-            time.sleep(30)
+            # Wait for a failure event (re-checking the stream state at least every POLL_INTERVAL)
+            try:
+                app = failed_apps.get(timeout=min(POLL_INTERVAL, max(0.1, last_scan + interval - time.time())))
+            except queue.Empty:
+                continue
+            print(f"📨 Failure reported for {app}", flush=True)
+            pipeline.submit(app)
             
         except KeyboardInterrupt:
             print(f"\n🛑 Agent stopped by user", flush=True)
+            pipeline.shutdown()
             break
         except Exception as e:
             print(f"❌ Error in monitoring loop: {e}", flush=True)
             time.sleep(30)
 
 
-def check_app_failures(app):
-    """Check for failures in a specific app"""
-    global attempted_fixes
-    
+def find_new_failures(app):
+    """Failed jobs of an app's recent runs that haven't been looked at yet (pipeline scan stage)"""
+    # Bring the stored history up to date, then work from it
     try:
-        # First, check if there are any queued or in_progress builds
-        cmd = f"{GH_CLI} run list --repo LuckyJackpotCasino/{app} --limit 5 --json status,conclusion,databaseId,createdAt"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=10)
-        
-        if result.returncode != 0:
-            return
+        history.sync(app, get_client())
+    except GitHubAPIError:
+        return []
+    runs = history.recent_runs(app, 5)
+    history.link_retries(app)
+    
+    # A successful build ends the app's failure streaks before it (and their back-off)
+    succeeded = [r['id'] for r in runs if r['status'] == 'completed' and r.get('conclusion') == 'success']
+    if succeeded and history.reset_failed_runs(app, max(succeeded)):
+        print(f"🟢 {app} built successfully - retry back-off reset", flush=True)
+    
+    # Check if there are any queued or in_progress runs
+    pending_runs = [r for r in runs if r['status'] in ['queued', 'in_progress', 'waiting']]
+    if pending_runs:
+        print(f"⏸️  Skipping {app} - {len(pending_runs)} builds already queued/running", flush=True)
+        return []  # Don't analyze failures if builds are already running
+    
+    failures = []
+    for run in runs:
+        run_id = run['id']
         
-        runs = json.loads(result.stdout)
+        # Check if this is a completed failure we haven't already tried to fix (possibly before a restart)
+        if run['status'] != 'completed' or run.get('conclusion') != 'failure' or history.fix_attempted(app, run_id):
+            continue
+        # Too old to still be in the ledger (a restart after a long pause): not worth a rebuild now
+        created = parse_timestamp(run.get('created_at'))
+        if created and created < time.time() - FIX_HISTORY_RETENTION:
+            continue
         
-        # Check if there are any queued or in_progress runs
-        pending_runs = [r for r in runs if r['status'] in ['queued', 'in_progress', 'waiting']]
-        if pending_runs:
-            print(f"⏸️  Skipping {app} - {len(pending_runs)} builds already queued/running", flush=True)
-            return  # Don't analyze failures if builds are already running
+        # Get job details (stored by the sync; ask GitHub if they're missing)
+        jobs = history.jobs_for_run(app, run_id)
+        if jobs is None:
+            try:
+                jobs = get_client().list_jobs(app, run_id)
+            except GitHubAPIError:
+                continue
         
-        for run in runs:
-            run_id = run['databaseId']
-            status = run['status']
-            conclusion = run.get('conclusion')
-            
-            # Check if this is a completed failure
-            if status == 'completed' and conclusion == 'failure':
-                # Have we already tried to fix this?
-                fix_key = f"{app}:{run_id}"
-                if fix_key in attempted_fixes:
-                    continue  # Already attempted
-                
-                print(f"\n🔍 Analyzing failure: {app} (run #{run_id})", flush=True)
-                
-                # Get job details
-                jobs_cmd = f"{GH_CLI} run view {run_id} --repo LuckyJackpotCasino/{app} --json jobs"
-                jobs_result = subprocess.run(jobs_cmd, shell=True, capture_output=True, text=True, timeout=10)
-                
-                if jobs_result.returncode == 0:
-                    run_data = json.loads(jobs_result.stdout)
-                    jobs = run_data.get('jobs', [])
-                    
-                    for job in jobs:
-                        if job.get('conclusion') == 'failure':
-                            job_name = job.get('name', 'unknown')
-                            
-                            # Analyze and fix
-                            analyzer = BuildFailureAnalyzer(app, run_id, job_name)
-                            if analyzer.fetch_logs():
-                                fix_result = analyzer.analyze_and_fix()
-                                
-                                if fix_result:
-                                    print(f"✅ Fix applied: {fix_result['issue']}", flush=True)
-                                    print(f"   Action: {fix_result['action']}", flush=True)
-                                    
-                                    # Mark as attempted
-                                    attempted_fixes[fix_key] = {
-                                        'timestamp': time.time(),
-                                        'fix': fix_result
-                                    }
-                                    
-                                    # Trigger retry if recommended
-                                    if fix_result.get('retry'):
-                                        delay = fix_result.get('delay', 0)
-                                        if delay > 0:
-                                            print(f"⏳ Waiting {delay}s before retry...", flush=True)
-                                            time.sleep(delay)
-                                        
-                                        print(f"🔄 Triggering rebuild for {app}...", flush=True)
-                                        trigger_rebuild(app)
-                                else:
-                                    print(f"❓ No automatic fix available for this failure", flush=True)
-                                    # Mark as seen but not fixed
-                                    attempted_fixes[fix_key] = {
-                                        'timestamp': time.time(),
-                                        'fix': None
-                                    }
-    except Exception as e:
-        print(f"Error checking {app}: {e}", flush=True)
+        analyzers = [
+            BuildFailureAnalyzer(app, run_id, job.get('name', 'unknown'), job.get('id'),
+                                 job.get('platform') or platform_for_job(job.get('name', '')), job.get('runner_name'))
+            for job in jobs if job.get('conclusion') == 'failure'
+        ]
+        if analyzers:
+            failures.append(FailedRun(app, run_id, analyzers))
+    return failures
+
+
+def fetch_failure_logs(failed_run):
+    """Download the failed jobs' logs (pipeline fetch stage); None if none could be fetched
+
+    A failure already analyzed under the same fingerprint needs only its log's tail.
+    """
+    retry_of = history.retry_of(failed_run.app, failed_run.run_id)
+    fetched = []
+    for analyzer in failed_run.jobs:
+        print(f"\n🔍 Analyzing failure: {analyzer.app} (run #{analyzer.run_id}, {analyzer.job_name})"
+              f"{f' - a retry of run #{retry_of}' if retry_of else ''}", flush=True)
+        if analyzer.identify() or analyzer.fetch_logs():
+            fetched.append(analyzer)
+    failed_run.jobs = fetched
+    return failed_run if fetched else None
+
+
+def analyze_failure(failed_run):
+    """Analyze each failed job of a run and combine their fixes (pipeline analysis stage).
+
+    The combined fix asks for one rebuild of just the platforms whose fixes
+    recommend a retry.
+    """
+    fixes = [(analyzer, analyze_job(analyzer)) for analyzer in failed_run.jobs]
+    applied = [(analyzer, fix) for analyzer, fix in fixes if fix]
+    if not applied:
+        history.record_fix_attempt(failed_run.app, failed_run.run_id, None)
+        return None
+    
+    retrying = [(analyzer, fix) for analyzer, fix in applied if fix.get('retry')]
+    platforms = {analyzer.platform or DEFAULT_RETRY_PLATFORM for analyzer, fix in retrying}
+    fix_result = {
+        'issue': '; '.join(dict.fromkeys(fix['issue'] for analyzer, fix in applied)),
+        'action': '; '.join(dict.fromkeys(fix['action'] for analyzer, fix in applied)),
+        'retry': bool(retrying),
+        'platforms': [p for p in PLATFORMS if p in platforms],
+        'jobs': {analyzer.job_name: fix for analyzer, fix in fixes}
+    }
+    delay = max((fix.get('delay', 0) for analyzer, fix in retrying), default=0)
+    if delay:
+        fix_result['delay'] = delay
+    if retrying:
+        fix_result = back_off(retrying[0][0], fix_result)
+    
+    # Mark as attempted
+    history.record_fix_attempt(failed_run.app, failed_run.run_id, fix_result)
+    return fix_result
+
+
+def analyze_job(analyzer):
+    """Match one failed job's log against known failures and apply the fix"""
+    if analyzer.cached is not None:
+        # Same failure as one analyzed before: reuse its result, but run a fix
+        # that works on the runner again (the earlier run cleaned up after another job)
+        fixes = analyzer.cached['fixes']
+        local = any(fix in LOCAL_FIXES for fix in fixes)
+        rules = ', '.join(analyzer.cached['rules']) or 'no known signature'
+        print(f"♻️  Seen before (fingerprint {analyzer.fingerprint}: {rules}) - "
+              f"{'applying its fix again' if local else 'reusing that analysis'}", flush=True)
+        fix_result = analyzer.apply_fixes(fixes) if local else analyzer.cached['fix']
+        if fix_result:
+            fix_result = dict(fix_result, fingerprint=analyzer.fingerprint, from_cache=True)
+    else:
+        fix_result = analyzer.analyze_and_fix()
+        if analyzer.fingerprint:
+            fixes = [m['fix'] for m in analyzer.matches]
+            key = analyzer.fingerprint
+            if any(fix in LOCAL_FIXES for fix in fixes):
+                key = runner_fingerprint(key, analyzer.runner)
+            fingerprints.put(key, {'fix': fix_result, 'rules': [m['rule'] for m in analyzer.matches], 'fixes': fixes})
+    if analyzer.fingerprint:
+        history.record_fingerprint(analyzer.fingerprint, analyzer.platform, analyzer.runner,
+                                   analyzer.error_lines, fix_result, analyzer.cached is not None)
+    
+    if fix_result:
+        print(f"✅ Fix applied: {fix_result['issue']}", flush=True)
+        print(f"   Action: {fix_result['action']}", flush=True)
+    else:
+        print(f"❓ No automatic fix available for this failure", flush=True)
+    if analyzer.platform is None and fix_result and fix_result.get('retry'):
+        print(f"⚠️  Can't tell which platform '{analyzer.job_name}' builds - retrying {DEFAULT_RETRY_PLATFORM}", flush=True)
+    return fix_result
+
+
+def back_off(analyzer, fix_result):
+    """Delay the rebuild further each time the app fails the same way again; stop after MAX_RETRIES"""
+    if analyzer.fingerprint:
+        signature = analyzer.fingerprint
+    elif analyzer.matches:
+        signature = analyzer.matches[0]['rule']
+    else:
+        signature = fix_result['issue']
+    failed_runs = history.record_failed_run(analyzer.app, signature, analyzer.run_id)
+    if failed_runs > MAX_RETRIES:
+        print(f"🛑 {analyzer.app} failed with '{fix_result['issue']}' {failed_runs} times in a row - "
+              f"no more rebuilds until it builds successfully", flush=True)
+        return dict(fix_result, retry=False, gave_up=True, failed_runs=failed_runs)
+    if failed_runs > 1:
+        delay = min(RETRY_BACKOFF * 2 ** (failed_runs - 2), MAX_RETRY_DELAY)
+        print(f"🐢 {analyzer.app} failed with '{fix_result['issue']}' {failed_runs} times in a row - "
+              f"backing off {delay}s", flush=True)
+        fix_result = dict(fix_result, delay=max(fix_result.get('delay', 0), delay))
+    return dict(fix_result, failed_runs=failed_runs)
 
 
-def trigger_rebuild(app):
-    """Trigger a rebuild for an app"""
+def report_pipeline():
+    """Log what the pipeline has done so far and what it's holding right now"""
+    status = pipeline.to_dict()
+    counts = ', '.join(f"{status.get(name, 0)} {name}" for name in
+                       ('scans', 'failures', 'analyzed', 'fixed', 'retries', 'delayed', 'errors'))
+    print(f"📊 Pipeline: {counts}; in flight: {', '.join(status['inFlight']) or 'none'}"
+          f"{f'; retries waiting: ' + ', '.join(status['retryTimers']) if status['retryTimers'] else ''}", flush=True)
+    cache = fingerprints.to_dict()
+    hit_rate = f"{cache['hitRate']:.0%}" if cache['hitRate'] is not None else 'n/a'
+    print(f"📇 Fingerprint cache: {cache['entries']} entries, {cache['hits']}/{cache['lookups']} hits ({hit_rate}), "
+          f"{cache['expired']} expired, {cache['evicted']} evicted", flush=True)
+
+
+def evict_fix_history():
+    """Drop ledger entries older than FIX_HISTORY_RETENTION"""
+    removed = history.evict_fix_history(time.time() - FIX_HISTORY_RETENTION)
+    if any(removed.values()):
+        print("🧹 Evicted from the fix ledger: " + ', '.join(f"{n} {table}" for table, n in removed.items() if n),
+              flush=True)
+
+
+def retry_failure(failed_run, fix_result):
+    """Rebuild the platforms the fixes recommended, in one dispatch (pipeline retry stage, after any delay)"""
+    platforms = fix_result['platforms']
+    print(f"🔄 Triggering rebuild for {failed_run.app} ({', '.join(platforms)})...", flush=True)
+    if trigger_rebuild(failed_run.app, ','.join(platforms)):
+        history.record_retry(failed_run.app, failed_run.run_id, platforms)
+
+
+pipeline = FixPipeline(find_new_failures, fetch_failure_logs, analyze_failure, retry_failure)
+
+
+def dashboard_unreachable(error):
+    """True if the request never reached the dashboard server (connection refused or no route to it)"""
+    reason = getattr(error, 'reason', error)
+    return isinstance(reason, ConnectionRefusedError) or (
+        isinstance(reason, OSError) and reason.errno in (errno.ENETUNREACH, errno.EHOSTUNREACH))
+
+
+def trigger_rebuild(app, platform):
+    """Trigger a rebuild of an app's platforms ('ios' or e.g. 'ios,windows') through the dashboard
+    server (directly if it isn't running)"""
     try:
-        workflow_map = {
-            'kenocasino': 'keno-builds.yml',
-            'blackjack21': 'blackjack-builds.yml',
-            'fvg-multicardkeno': 'fvg-multicardkeno-builds.yml',
-            'fvg-keno': 'fvg-keno-builds.yml',
-            'fvg-fourcardkeno': 'fvg-fourcardkeno-builds.yml'
-        }
-        workflow = workflow_map.get(app, f'{app}-builds.yml')
-        
-        cmd = f'{GH_CLI} workflow run {workflow} --repo LuckyJackpotCasino/{app} -f build_platforms="ios"'
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=30)
-        
-        if result.returncode == 0:
-            print(f"✅ Rebuild triggered successfully", flush=True)
+        request = urllib.request.Request(f"{DASHBOARD_URL}/trigger/{app}/{platform}", method='POST')
+        with urllib.request.urlopen(request, timeout=60) as response:
+            result = json.loads(response.read())
+        if result.get('success'):
+            merged = ' (merged with other requests)' if result.get('coalesced') or result.get('deduplicated') else ''
+            print(f"✅ Rebuild triggered successfully{merged}", flush=True)
             return True
-        else:
-            print(f"❌ Failed to trigger rebuild: {result.stderr}", flush=True)
+        if result.get('skipped'):
+            print(f"⏸️  Rebuild not needed - {result.get('error')}", flush=True)
             return False
+        print(f"❌ Failed to trigger rebuild: {result.get('error')}", flush=True)
+        return False
+    except urllib.error.HTTPError as e:
+        print(f"❌ Failed to trigger rebuild: dashboard returned {e.code}", flush=True)
+        return False
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        if not dashboard_unreachable(e):
+            # It may have taken the request (and dispatched it) before this went wrong
+            print(f"⚠️  No answer from the dashboard server ({e}) - not dispatching again", flush=True)
+            return False
+        print(f"⚠️  Dashboard server unreachable ({e}) - dispatching directly", flush=True)
+    
+    try:
+        workflow = get_workflow_file(app)
+        get_client().dispatch_workflow(app, workflow, {'build_platforms': platform})
+        print(f"✅ Rebuild triggered successfully", flush=True)
+        return True
+    except GitHubAPIError as e:
+        print(f"❌ Failed to trigger rebuild: {e.message}", flush=True)
+        return False
     except Exception as e:
         print(f"❌ Error triggering rebuild: {e}", flush=True)
         return False
 
 
 if __name__ == '__main__':
+    # Load the GitHub token once, up front
+    if not get_client().token:
+        print("⚠️  No GitHub token found - set GITHUB_TOKEN or run: gh auth login", flush=True)
     monitor_and_fix_failures()
 
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Single dispatch layer for build triggers.
+
+Dashboard clicks, bulk batches and the auto-fix agent's retries all end up
+here, so they can't race each other into redundant multi-hour Unity builds:
+
+  - Requests for the same app arriving within COALESCE_WINDOW are merged into
+    one workflow dispatch (ios + aab -> build_platforms "ios,aab"), and every
+    caller gets the same PendingDispatch handle back. A runner label (runner
+    affinity) one of them asked for is kept for the merged dispatch.
+  - A request for platforms dispatched less than DEDUPE_WINDOW ago returns
+    that dispatch's handle instead of dispatching again - until the status
+    store shows a newer run for them, queued, running or already finished.
+  - Platforms the status store already shows as queued or running are dropped
+    (this replaces the extra `gh run list` before every trigger).
+"""
+
+import itertools
+import logging
+import threading
+import time
+
+ALL_PLATFORMS = ['ios', 'aab', 'amazon', 'windows']
+COALESCE_WINDOW = 3  # Seconds to wait for more requests for the same app before dispatching
+DEDUPE_WINDOW = 120  # Seconds a dispatch answers repeat requests, until its run shows up in the status
+ACTIVE_STATES = ('queued', 'in_progress', 'waiting')
+
+log = logging.getLogger('dashboard.dispatch')
+
+
+class PendingDispatch:
+    """One (possibly merged) workflow dispatch, shared by every request coalesced into it"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, app, runner_label=None):
+        self.id = next(self._ids)
+        self.app = app
+        self.runner_label = runner_label
+        self.platforms = []  # In request order, e.g. ['ios', 'aab']
+        self.requests = 0
+        self.created_at = time.time()
+        self.sent_at = None
+        self.run_ids = {}  # {platform: run id the status store showed when it was sent}
+        self.result = None  # dispatch() result once sent
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the dispatch was sent (or failed); returns the result dict, or None on timeout"""
+        self._done.wait(timeout)
+        return self.to_dict() if self._done.is_set() else None
+
+    def to_dict(self):
+        result = dict(self.result or {'success': None})
+        result.update({
+            'dispatchId': self.id,
+            'app': self.app,
+            'platform': ','.join(self.platforms),
+            'requests': self.requests
+        })
+        return result
+
+
+def newer_run(pending, status):
+    """Whether the status shows a run for one of a sent dispatch's platforms newer than the one it replaced"""
+    return any((status.get(f'{p}RunId') or 0) > (pending.run_ids.get(p) or 0) for p in pending.platforms)
+
+
+class DispatchCoalescer:
+    """Merges and de-duplicates build dispatches per app.
+
+    dispatch(app, platforms_csv, runner_label) sends one workflow dispatch and
+    returns {'success': bool, 'error'?: str, ...}; status(app) returns the
+    status store's entry for the app ({platform: state, '<platform>RunId': id}).
+    """
+
+    def __init__(self, dispatch, status, window=COALESCE_WINDOW):
+        self.dispatch = dispatch
+        self.status = status
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = {}  # {app: PendingDispatch} still collecting requests
+        self._recent = []  # PendingDispatches sent (or being sent) less than DEDUPE_WINDOW ago
+        self.stats = {'requests': 0, 'dispatches': 0, 'coalesced': 0, 'deduplicated': 0, 'skipped': 0}
+
+    def request(self, app, platforms, runner_label=None):
+        """Ask for a build of app on platforms ('all', 'ios', or a list).
+
+        Returns (handle, note): the PendingDispatch this request joined, or None
+        if every platform is already building; note is 'coalesced',
+        'deduplicated', 'skipped' or None.
+        """
+        if isinstance(platforms, str):
+            platforms = ALL_PLATFORMS if platforms == 'all' else platforms.split(',')
+        status = self.status(app) or {}
+        active = {p for p in ALL_PLATFORMS if status.get(p) in ACTIVE_STATES}
+        wanted = [p for p in platforms if p not in active]
+
+        with self._lock:
+            self.stats['requests'] += 1
+            if not wanted:
+                self.stats['skipped'] += 1
+                return None, 'skipped'
+
+            # Everything asked for was dispatched moments ago - hand back that dispatch.
+            # Once a newer run shows up (even one that already finished), new requests are new builds
+            now = time.time()
+            self._recent = [d for d in self._recent if now - d.sent_at < DEDUPE_WINDOW
+                            and not (d.app == app and newer_run(d, status))]
+            for recent in reversed(self._recent):
+                if recent.app == app and set(wanted) <= set(recent.platforms):
+                    recent.requests += 1
+                    self.stats['deduplicated'] += 1
+                    return recent, 'deduplicated'
+
+            pending = self._pending.get(app)
+            note = 'coalesced' if pending else None
+            if pending is None:
+                pending = self._pending[app] = PendingDispatch(app, runner_label)
+                timer = threading.Timer(self.window, self._send, args=(app, pending))
+                timer.daemon = True
+                timer.start()
+            else:
+                self.stats['coalesced'] += 1
+                # One run builds them all: the first runner label asked for (e.g. the scheduler's affinity target) wins
+                pending.runner_label = pending.runner_label or runner_label
+            pending.requests += 1
+            pending.platforms += [p for p in wanted if p not in pending.platforms]
+
+        return pending, note
+
+    def _send(self, app, pending):
+        status = self.status(app) or {}
+        with self._lock:
+            del self._pending[app]
+            platforms = [p for p in ALL_PLATFORMS if p in pending.platforms]  # Stable order for the input
+            pending.platforms = platforms
+            pending.run_ids = {p: status.get(f'{p}RunId') for p in platforms}
+            pending.sent_at = time.time()
+            self._recent.append(pending)  # Requests arriving mid-dispatch join it
+
+        try:
+            pending.result = self.dispatch(pending.app, ','.join(platforms), pending.runner_label)
+        except Exception as e:
+            pending.result = {'success': False, 'error': str(e)}
+        with self._lock:
+            self.stats['dispatches'] += 1
+            if not pending.result.get('success') and pending in self._recent:
+                self._recent.remove(pending)
+        if pending.requests > 1:
+            log.info("[DISPATCH] %s (%s): %d requests, one dispatch", pending.app, ','.join(platforms), pending.requests)
+        pending._done.set()
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                **self.stats,
+                'pending': [{'app': d.app, 'platform': ','.join(d.platforms), 'requests': d.requests,
+                             'runnerLabel': d.runner_label} for d in self._pending.values()]
+            }
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Persistent build history shared by the dashboard server and the auto-fix agent.
+
+Workflow runs and their jobs are stored in an embedded SQLite database (WAL
+mode, so both processes can read while one writes). Syncing is incremental:
+only runs newer than the stored high-water mark are paged in, and a run's jobs
+are only re-fetched when the run itself changed since they were stored.
+Status lookups are then indexed queries instead of API walks, and history
+survives restarts.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from build_metrics import parse_timestamp
+from github_api import platform_for_job
+
+BUILD_HISTORY_DB = os.environ.get(
+    'BUILD_HISTORY_DB', os.path.expanduser('~/.cache/buildbot9000/build-history.sqlite3'))
+
+RUNS_PAGE_SIZE = 25  # Runs requested per page when syncing
+RETRY_LINK_SKEW = 60  # Seconds a retry's run may appear to start before it was requested (clock skew)
+MAX_SYNC_PAGES = 4  # Pages walked to reach the high-water mark after a long gap
+JOBS_WINDOW = 10  # Newest runs per app whose jobs are kept in sync
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    app TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    run_number INTEGER,
+    workflow TEXT,
+    event TEXT,
+    head_branch TEXT,
+    status TEXT,
+    conclusion TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    jobs_synced TEXT,  -- run signature (status/conclusion/updated_at) the stored jobs belong to
+    synced_at REAL,
+    PRIMARY KEY (app, run_id)
+);
+CREATE INDEX IF NOT EXISTS runs_app_created ON runs (app, created_at);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    app TEXT NOT NULL,
+    job_id INTEGER NOT NULL,
+    run_id INTEGER NOT NULL,
+    platform TEXT,
+    name TEXT,
+    status TEXT,
+    conclusion TEXT,
+    runner_name TEXT,
+    created_at TEXT,
+    started_at TEXT,
+    completed_at TEXT,
+    recorded_at REAL DEFAULT 0,  -- when this row was last written; lets readers pick up only what changed
+    PRIMARY KEY (app, job_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_run ON jobs (app, run_id);
+CREATE INDEX IF NOT EXISTS jobs_app_platform ON jobs (app, platform, run_id DESC);
+
+CREATE TABLE IF NOT EXISTS fix_attempts (
+    app TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    attempted_at REAL NOT NULL,
+    fix TEXT,  -- JSON of the applied fix, or null if none was available
+    PRIMARY KEY (app, run_id)
+);
+CREATE INDEX IF NOT EXISTS fix_attempts_age ON fix_attempts (attempted_at);
+
+CREATE TABLE IF NOT EXISTS retries (
+    app TEXT NOT NULL,
+    run_id INTEGER NOT NULL,  -- the failed run
+    platforms TEXT NOT NULL,  -- the platforms rebuilt, e.g. 'ios,windows'
+    requested_at REAL NOT NULL,
+    retry_run_id INTEGER,  -- the run the rebuild started, once it has shown up
+    PRIMARY KEY (app, run_id)
+);
+CREATE INDEX IF NOT EXISTS retries_retry_run ON retries (app, retry_run_id);
+
+CREATE TABLE IF NOT EXISTS retry_backoff (
+    app TEXT NOT NULL,
+    signature TEXT NOT NULL,  -- what the failure was recognized as: its fingerprint, or the matched rule
+    failed_runs INTEGER DEFAULT 0,  -- runs that failed this way since the app last built successfully
+    last_run_id INTEGER,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (app, signature)
+);
+
+CREATE TABLE IF NOT EXISTS failure_fingerprints (
+    fingerprint TEXT PRIMARY KEY,  -- see failure_fingerprints.py
+    platform TEXT,
+    runner TEXT,
+    error_lines TEXT,  -- JSON list of the normalized error lines it was taken from
+    issue TEXT,  -- the fix's issue, or null if no automatic fix was available
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    failures INTEGER DEFAULT 0,
+    cache_hits INTEGER DEFAULT 0  -- failures resolved from an earlier analysis, without reading the log
+);
+CREATE INDEX IF NOT EXISTS failure_fingerprints_seen ON failure_fingerprints (last_seen);
+"""
+
+# Columns added after a table was first created: (table, column, type)
+MIGRATIONS = [
+    ('jobs', 'recorded_at', 'REAL DEFAULT 0'),
+]
+POST_MIGRATION_SCHEMA = 'CREATE INDEX IF NOT EXISTS jobs_recorded ON jobs (recorded_at);'
+
+
+JOB_UPSERT = """
+    INSERT INTO jobs (job_id, run_id, app, platform, name, status, conclusion,
+                      runner_name, created_at, started_at, completed_at, recorded_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (app, job_id) DO UPDATE SET
+        run_id = excluded.run_id, platform = excluded.platform, name = excluded.name,
+        status = excluded.status, conclusion = excluded.conclusion,
+        runner_name = COALESCE(excluded.runner_name, runner_name),
+        created_at = COALESCE(excluded.created_at, created_at),
+        started_at = COALESCE(excluded.started_at, started_at),
+        completed_at = COALESCE(excluded.completed_at, completed_at),
+        recorded_at = excluded.recorded_at"""
+
+
+def job_row(app, run_id, job, recorded_at):
+    """JOB_UPSERT parameters for a job (REST, GraphQL or webhook shape)"""
+    return (job['id'], run_id, app, platform_for_job(job.get('name', '')), job.get('name'), job.get('status'),
+            job.get('conclusion'), job.get('runner_name'), job.get('created_at'), job.get('started_at'),
+            job.get('completed_at'), recorded_at)
+
+
+def run_signature(run):
+    """Changes whenever a run's state does, so its jobs need re-fetching"""
+    return f"{run.get('status')}/{run.get('conclusion')}/{run.get('updated_at')}"
+
+
+class BuildHistory:
+    """SQLite-backed store of workflow runs, jobs and fix attempts.
+
+    Each thread gets its own connection; SQLite (in WAL mode) handles
+    concurrency between threads and between the server and agent processes.
+    """
+
+    def __init__(self, path=BUILD_HISTORY_DB):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            with self._schema_lock:
+                if not self._schema_ready:
+                    db.executescript(SCHEMA)
+                    for table, column, kind in MIGRATIONS:
+                        columns = [row['name'] for row in db.execute(f'PRAGMA table_info({table})')]
+                        if column not in columns:
+                            db.execute(f'ALTER TABLE {table} ADD COLUMN {column} {kind}')
+                    db.executescript(POST_MIGRATION_SCHEMA)
+                    self._schema_ready = True
+            self._local.db = db
+        return db
+
+    def _write(self, statements):
+        """Run [(sql, params)] in one transaction"""
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            for sql, params in statements:
+                db.execute(sql, params)
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+
+    # --- Runs and jobs ---
+
+    def high_water_mark(self, app):
+        """Newest stored run id for an app, or None"""
+        row = self._db().execute('SELECT MAX(run_id) FROM runs WHERE app = ?', (app,)).fetchone()
+        return row[0]
+
+    def record_runs(self, app, runs):
+        """Upsert workflow runs (REST shape). Jobs already stored are kept."""
+        now = time.time()
+        self._write([(
+            """INSERT INTO runs (run_id, app, run_number, workflow, event, head_branch, status, conclusion,
+                                 created_at, updated_at, synced_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (app, run_id) DO UPDATE SET
+                   run_number = excluded.run_number, status = excluded.status, conclusion = excluded.conclusion,
+                   updated_at = excluded.updated_at, synced_at = excluded.synced_at,
+                   workflow = COALESCE(excluded.workflow, workflow), event = COALESCE(excluded.event, event),
+                   head_branch = COALESCE(excluded.head_branch, head_branch),
+                   created_at = COALESCE(excluded.created_at, created_at)""",
+            (run['id'], app, run.get('run_number'), run.get('name'), run.get('event'), run.get('head_branch'),
+             run.get('status'), run.get('conclusion'), run.get('created_at'), run.get('updated_at'), now)
+        ) for run in runs])
+
+    def record_jobs(self, app, run_id, jobs, signature=None):
+        """Store a run's jobs; signature marks which run state they belong to.
+
+        Jobs are upserted so a source that leaves fields out (GraphQL has no
+        runner_name or created_at) doesn't erase what another one stored;
+        jobs no longer part of the run (an earlier attempt) are dropped.
+        """
+        now = time.time()
+        jobs = [job for job in jobs if job.get('id') is not None]
+        job_ids = [job['id'] for job in jobs]
+        statements = [(
+            f"DELETE FROM jobs WHERE app = ? AND run_id = ? AND job_id NOT IN ({','.join('?' * len(job_ids))})",
+            [app, run_id] + job_ids
+        )]
+        statements += [(JOB_UPSERT, job_row(app, run_id, job, now)) for job in jobs]
+        statements.append(('UPDATE runs SET jobs_synced = ? WHERE app = ? AND run_id = ?', (signature, app, run_id)))
+        self._write(statements)
+
+    def record_job(self, app, job):
+        """Upsert a single job (e.g. from a workflow_job webhook)"""
+        self._write([(JOB_UPSERT, job_row(app, job['run_id'], job, time.time()))])
+
+    def jobs_synced(self, app, run_ids):
+        """{run_id: signature} the stored jobs of these runs belong to (None if never synced)"""
+        if not run_ids:
+            return {}
+        rows = self._db().execute(
+            f"SELECT run_id, jobs_synced FROM runs WHERE app = ? AND run_id IN ({','.join('?' * len(run_ids))})",
+            [app] + list(run_ids))
+        return {row['run_id']: row['jobs_synced'] for row in rows}
+
+    def sync(self, app, client, map_fn=map, fetch_jobs=None):
+        """Bring an app's stored runs and jobs up to date with GitHub.
+
+        Pages through runs newest first until reaching the stored high-water
+        mark (one page on a fresh database), then fetches jobs only for runs
+        in the newest JOBS_WINDOW whose state changed since their jobs were
+        stored. map_fn lets the caller run job lookups in a thread pool;
+        fetch_jobs(app, run_id) returns a run's jobs, or None if the lookup
+        failed (that run is retried on the next sync). Returns the number of
+        job lookups made.
+        """
+        fetch_jobs = fetch_jobs or client.list_jobs
+        high_water = self.high_water_mark(app)
+        for page in range(1, MAX_SYNC_PAGES + 1):
+            runs = client.list_runs(app, per_page=RUNS_PAGE_SIZE, page=page)
+            self.record_runs(app, runs)
+            if len(runs) < RUNS_PAGE_SIZE or high_water is None or runs[-1]['id'] <= high_water:
+                break
+
+        stale = [
+            (row['run_id'], run_signature(dict(row)))
+            for row in self._db().execute(
+                """SELECT run_id, status, conclusion, updated_at, jobs_synced FROM runs
+                   WHERE app = ? ORDER BY run_id DESC LIMIT ?""", (app, JOBS_WINDOW))
+            if row['jobs_synced'] != run_signature(dict(row))
+        ]
+
+        def fetch(item):
+            run_id, signature = item
+            return run_id, signature, fetch_jobs(app, run_id)
+
+        for run_id, signature, jobs in map_fn(fetch, stale):
+            if jobs is not None:
+                self.record_jobs(app, run_id, jobs, signature)
+        return len(stale)
+
+    def recent_runs(self, app, limit=JOBS_WINDOW):
+        """Newest stored runs for an app (dicts in the REST shape)"""
+        rows = self._db().execute(
+            """SELECT run_id AS id, run_number, workflow AS name, event, head_branch, status, conclusion,
+                      created_at, updated_at FROM runs WHERE app = ? ORDER BY run_id DESC LIMIT ?""",
+            (app, limit))
+        return [dict(row) for row in rows]
+
+    def recent_branches(self, app, limit=JOBS_WINDOW):
+        """Branches the newest stored runs of an app were built from"""
+        rows = self._db().execute(
+            """SELECT DISTINCT head_branch FROM (SELECT head_branch FROM runs WHERE app = ? ORDER BY run_id DESC LIMIT ?)
+               WHERE head_branch IS NOT NULL""",
+            (app, limit))
+        return {row['head_branch'] for row in rows}
+
+    def jobs_for_run(self, app, run_id):
+        """Stored jobs of a run, or None if they were never synced"""
+        db = self._db()
+        synced = db.execute('SELECT jobs_synced FROM runs WHERE app = ? AND run_id = ?', (app, run_id)).fetchone()
+        rows = db.execute(
+            """SELECT job_id AS id, run_id, name, platform, status, conclusion, runner_name,
+                      created_at, started_at, completed_at FROM jobs WHERE app = ? AND run_id = ? ORDER BY job_id""",
+            (app, run_id)).fetchall()
+        if not rows and (synced is None or synced['jobs_synced'] is None):
+            return None
+        return [dict(row) for row in rows]
+
+    def recent_run_jobs(self, app, limit=JOBS_WINDOW):
+        """(run_id, run_number, jobs) for the newest runs, newest first - the input resolve_platform_status takes"""
+        db = self._db()
+        runs = db.execute(
+            'SELECT run_id, run_number, jobs_synced FROM runs WHERE app = ? ORDER BY run_id DESC LIMIT ?',
+            (app, limit)).fetchall()
+        if not runs:
+            return []
+        jobs = {}
+        for row in db.execute(
+                f"""SELECT run_id, name, status, conclusion FROM jobs
+                    WHERE app = ? AND run_id IN ({','.join('?' * len(runs))}) ORDER BY run_id, job_id""",
+                [app] + [run['run_id'] for run in runs]):
+            jobs.setdefault(row['run_id'], []).append(dict(row))
+        return [
+            (run['run_id'], run['run_number'] or run['run_id'],
+             jobs.get(run['run_id'], []) if run['jobs_synced'] is not None else None)
+            for run in runs
+        ]
+
+    def last_runners(self):
+        """{(app, platform): runner_name} of the newest finished job per app/platform"""
+        rows = self._db().execute(
+            """SELECT app, platform, runner_name FROM jobs
+               WHERE platform IS NOT NULL AND runner_name IS NOT NULL AND completed_at IS NOT NULL
+                     AND conclusion IN ('success', 'failure')
+               ORDER BY job_id""")
+        return {(row['app'], row['platform']): row['runner_name'] for row in rows}
+
+    def completed_jobs_since(self, recorded_after):
+        """Finished jobs written after a recorded_at timestamp, oldest write first"""
+        rows = self._db().execute(
+            """SELECT app, job_id, platform, runner_name, conclusion, created_at, started_at, completed_at,
+                      recorded_at FROM jobs
+               WHERE recorded_at > ? AND completed_at IS NOT NULL ORDER BY recorded_at""",
+            (recorded_after,))
+        return [dict(row) for row in rows]
+
+    # --- Fix attempts (auto-fix agent) ---
+
+    def fix_attempted(self, app, run_id):
+        """True if the agent already looked at this failed run"""
+        row = self._db().execute('SELECT 1 FROM fix_attempts WHERE app = ? AND run_id = ?', (app, run_id)).fetchone()
+        return row is not None
+
+    def record_fix_attempt(self, app, run_id, fix):
+        """Remember that a failed run was analyzed (fix is the applied fix, or None)"""
+        self._write([(
+            'INSERT OR REPLACE INTO fix_attempts (app, run_id, attempted_at, fix) VALUES (?, ?, ?, ?)',
+            (app, run_id, time.time(), json.dumps(fix, default=str) if fix is not None else None)
+        )])
+
+    def record_failed_run(self, app, signature, run_id):
+        """Count a run that failed with this signature (once per run); returns the app's count for it"""
+        self._write([(
+            """INSERT INTO retry_backoff (app, signature, failed_runs, last_run_id, updated_at)
+               VALUES (?, ?, 1, ?, ?)
+               ON CONFLICT (app, signature) DO UPDATE SET
+                   failed_runs = failed_runs + (last_run_id IS NOT excluded.last_run_id),
+                   last_run_id = excluded.last_run_id, updated_at = excluded.updated_at""",
+            (app, signature, run_id, time.time())
+        )])
+        row = self._db().execute('SELECT failed_runs FROM retry_backoff WHERE app = ? AND signature = ?',
+                                 (app, signature)).fetchone()
+        return row[0]
+
+    def reset_failed_runs(self, app, success_run_id):
+        """Forget an app's failure counts from before a successful run; returns how many were dropped"""
+        db = self._db()
+        return db.execute('DELETE FROM retry_backoff WHERE app = ? AND last_run_id < ?',
+                          (app, success_run_id)).rowcount
+
+    def evict_fix_history(self, before):
+        """Drop fix attempts, failure counts and fingerprints last touched before a time: {table: rows}"""
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            removed = {
+                'fix_attempts': db.execute('DELETE FROM fix_attempts WHERE attempted_at < ?', (before,)).rowcount,
+                'retry_backoff': db.execute('DELETE FROM retry_backoff WHERE updated_at < ?', (before,)).rowcount,
+                'retries': db.execute('DELETE FROM retries WHERE requested_at < ?', (before,)).rowcount,
+                'failure_fingerprints': db.execute(
+                    'DELETE FROM failure_fingerprints WHERE last_seen < ?', (before,)).rowcount
+            }
+            db.execute('COMMIT')
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        return removed
+
+    # --- Retry lineage ---
+
+    def record_retry(self, app, run_id, platforms):
+        """Remember that a failed run's platforms were rebuilt; link_retries finds the run it started"""
+        self._write([(
+            'INSERT OR REPLACE INTO retries (app, run_id, platforms, requested_at) VALUES (?, ?, ?, ?)',
+            (app, run_id, ','.join(platforms), time.time())
+        )])
+
+    def link_retries(self, app):
+        """Match an app's retries to the dispatched runs they started (the first new one after each); returns links made"""
+        db = self._db()
+        pending = db.execute(
+            'SELECT run_id, requested_at FROM retries WHERE app = ? AND retry_run_id IS NULL ORDER BY requested_at',
+            (app,)).fetchall()
+        if not pending:
+            return 0
+        taken = {row[0] for row in db.execute(
+            'SELECT retry_run_id FROM retries WHERE app = ? AND retry_run_id IS NOT NULL', (app,))}
+        candidates = [(row['run_id'], parse_timestamp(row['created_at'])) for row in db.execute(
+            """SELECT run_id, created_at FROM runs WHERE app = ? AND event = 'workflow_dispatch' AND run_id > ?
+               ORDER BY run_id""", (app, min(row['run_id'] for row in pending)))]
+        links = []
+        for row in pending:
+            for run_id, created in candidates:
+                if run_id > row['run_id'] and run_id not in taken and created and \
+                        created >= row['requested_at'] - RETRY_LINK_SKEW:
+                    taken.add(run_id)
+                    links.append(('UPDATE retries SET retry_run_id = ? WHERE app = ? AND run_id = ?',
+                                  (run_id, app, row['run_id'])))
+                    break
+        if links:
+            self._write(links)
+        return len(links)
+
+    def retry_of(self, app, run_id):
+        """The failed run a run was started to retry, or None"""
+        row = self._db().execute('SELECT run_id FROM retries WHERE app = ? AND retry_run_id = ?',
+                                 (app, run_id)).fetchone()
+        return row[0] if row else None
+
+    def retry_summary(self, since, limit=20):
+        """Retries requested since a time, with how the retried platforms fared in the runs they started"""
+        db = self._db()
+        rows = db.execute(
+            """SELECT app, run_id, platforms, requested_at, retry_run_id FROM retries
+               WHERE requested_at >= ? ORDER BY requested_at DESC""", (since,)).fetchall()
+        outcomes = {'success': 0, 'failure': 0, 'pending': 0}
+        platforms = {}
+        recent = []
+        for row in rows:
+            retried = row['platforms'].split(',')
+            conclusions = {}
+            if row['retry_run_id'] is not None:
+                for job in db.execute('SELECT platform, status, conclusion FROM jobs WHERE app = ? AND run_id = ?',
+                                      (row['app'], row['retry_run_id'])):
+                    if job['platform'] in retried:
+                        conclusions[job['platform']] = job['conclusion'] if job['status'] == 'completed' else None
+            if any(c not in (None, 'success') for c in conclusions.values()):
+                outcome = 'failure'
+            elif conclusions and all(conclusions.get(p) == 'success' for p in retried):
+                outcome = 'success'
+            else:
+                outcome = 'pending'
+            outcomes[outcome] += 1
+            for platform in retried:
+                platforms[platform] = platforms.get(platform, 0) + 1
+            if len(recent) < limit:
+                recent.append({
+                    'app': row['app'],
+                    'runId': row['run_id'],
+                    'retryRunId': row['retry_run_id'],
+                    'platforms': retried,
+                    'requestedAt': row['requested_at'],
+                    'outcome': outcome,
+                    'jobs': conclusions
+                })
+        finished = outcomes['success'] + outcomes['failure']
+        return {
+            'retries': len(rows),
+            'succeeded': outcomes['success'],
+            'failed': outcomes['failure'],
+            'pending': outcomes['pending'],
+            'successRate': round(outcomes['success'] / finished, 3) if finished else None,
+            'platforms': platforms,
+            'recent': recent
+        }
+
+    # --- Failure fingerprints ---
+
+    def record_fingerprint(self, fingerprint, platform, runner, error_lines, fix, cache_hit):
+        """Count one more failure with this fingerprint (cache_hit: resolved from an earlier analysis)"""
+        now = time.time()
+        self._write([(
+            """INSERT INTO failure_fingerprints (fingerprint, platform, runner, error_lines, issue,
+                                               first_seen, last_seen, failures, cache_hits)
+               VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+               ON CONFLICT (fingerprint) DO UPDATE SET
+                   issue = excluded.issue, last_seen = excluded.last_seen,
+                   failures = failures + 1, cache_hits = cache_hits + excluded.cache_hits""",
+            (fingerprint, platform, runner, json.dumps(error_lines), fix.get('issue') if fix else None,
+             now, now, int(bool(cache_hit)))
+        )])
+
+    def fingerprint_summary(self, since, limit=10):
+        """Failures and cache hits over fingerprints seen since a time, with the most frequent ones
+
+        (Counts are lifetime totals of the fingerprints last seen in the window.)
+        """
+        db = self._db()
+        totals = db.execute(
+            'SELECT COUNT(*), SUM(failures), SUM(cache_hits) FROM failure_fingerprints WHERE last_seen >= ?',
+            (since,)).fetchone()
+        rows = db.execute(
+            """SELECT fingerprint, platform, runner, error_lines, issue, first_seen, last_seen, failures, cache_hits
+               FROM failure_fingerprints WHERE last_seen >= ?
+               ORDER BY failures DESC, last_seen DESC LIMIT ?""",
+            (since, limit)).fetchall()
+        failures, hits = totals[1] or 0, totals[2] or 0
+        return {
+            'fingerprints': totals[0],
+            'failures': failures,
+            'cacheHits': hits,
+            'hitRate': round(hits / failures, 3) if failures else None,
+            'top': [{
+                'fingerprint': row['fingerprint'],
+                'platform': row['platform'],
+                'runner': row['runner'],
+                'errorLines': json.loads(row['error_lines'] or '[]'),
+                'issue': row['issue'],
+                'firstSeen': row['first_seen'],
+                'lastSeen': row['last_seen'],
+                'failures': row['failures'],
+                'cacheHits': row['cache_hits']
+            } for row in rows]
+        }
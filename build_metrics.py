@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Queue-time and build-time analytics over the stored build history.
+
+For every finished job the history knows about, BuildMetrics keeps one small
+sample: how long the job waited for a runner (created -> started) and how long
+it ran (started -> completed), tagged with app, platform and runner. Samples are
+loaded incrementally - each update only reads jobs written to the history since
+the previous one - and aggregated into p50/p95/max per app/platform and per
+runner for a requested window. Builds are also split by whether they ran on
+the same runner as the previous build of that app/platform (warm Unity
+Library/) or not, to show what a reimport costs.
+"""
+
+import math
+import re
+import threading
+import time
+from datetime import datetime
+
+from instrumentation import instruments
+
+METRICS_WINDOWS = ['24h', '7d', '30d']  # Windows offered by the dashboard
+DEFAULT_METRICS_WINDOW = '7d'
+METRICS_RETENTION = 90 * 86400  # Samples older than this are dropped (the longest window allowed)
+METRICS_CACHE_TTL = 60  # Seconds a computed summary is reused while no new samples arrive
+RECORD_OVERLAP = 5  # Seconds re-read on each update, in case a write committed out of timestamp order
+
+WINDOW_PATTERN = re.compile(r'^(\d+)([hd])$')
+COUNTED_CONCLUSIONS = ('success', 'failure')  # Skipped/cancelled jobs would skew the timings
+
+
+def parse_window(window):
+    """'24h' / '7d' -> seconds, or None if malformed or longer than METRICS_RETENTION"""
+    match = WINDOW_PATTERN.match(window or '')
+    if not match:
+        return None
+    seconds = int(match.group(1)) * (3600 if match.group(2) == 'h' else 86400)
+    return seconds if 0 < seconds <= METRICS_RETENTION else None
+
+
+def parse_timestamp(value):
+    """GitHub ISO 8601 timestamp -> epoch seconds, or None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def runner_group(runner_name):
+    """Self-hosted runners by name; GitHub's hosted runners (one name per VM) as one group"""
+    if not runner_name:
+        return 'unknown'
+    if runner_name.startswith('GitHub Actions'):
+        return 'github-hosted'
+    return runner_name
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[max(0, rank - 1)]
+
+
+def distribution(values):
+    """{'p50', 'p95', 'max'} in whole seconds, or None for no values"""
+    if not values:
+        return None
+    values = sorted(values)
+    return {
+        'p50': round(percentile(values, 0.50)),
+        'p95': round(percentile(values, 0.95)),
+        'max': round(values[-1])
+    }
+
+
+def summarize(samples, key):
+    """Group samples by key(sample) and summarize queue and build times per group"""
+    groups = {}
+    for sample in samples:
+        groups.setdefault(key(sample), []).append(sample)
+    return {
+        group: {
+            'count': len(items),
+            'queue': distribution([s['queue'] for s in items if s['queue'] is not None]),
+            'build': distribution([s['build'] for s in items])
+        }
+        for group, items in groups.items()
+    }
+
+
+def library_cache_runs(samples):
+    """{id(sample): True if it ran where its app/platform's previous build ran} for self-hosted builds"""
+    warm = {}
+    previous = {}
+    for sample in sorted(samples, key=lambda s: s['completed']):
+        key = (sample['app'], sample['platform'])
+        if key in previous and sample['runner'] not in ('github-hosted', 'unknown'):
+            warm[id(sample)] = previous[key] == sample['runner']
+        previous[key] = sample['runner']
+    return warm
+
+
+class BuildMetrics:
+    """Per-job timing samples kept in memory and fed incrementally from a BuildHistory"""
+
+    def __init__(self, history):
+        self.history = history
+        self._lock = threading.Lock()
+        self._samples = {}  # {(app, job_id): sample}
+        self._cursor = -1  # Newest recorded_at seen in the history
+        self._cache = {}  # {(window, app): (computed_at, summary)}, cleared whenever samples change
+
+    def update(self):
+        """Load jobs written to the history since the last update. Returns how many were new or changed."""
+        with self._lock:
+            since = self._cursor - RECORD_OVERLAP if self._cursor > RECORD_OVERLAP else self._cursor
+            rows = self.history.completed_jobs_since(since)
+            changed = 0
+            for row in rows:
+                self._cursor = max(self._cursor, row['recorded_at'] or 0)
+                sample = self.sample_for(row)
+                key = (row['app'], row['job_id'])
+                if sample is None:
+                    if self._samples.pop(key, None) is not None:
+                        changed += 1
+                elif self._samples.get(key) != sample:
+                    self._samples[key] = sample
+                    changed += 1
+
+            cutoff = time.time() - METRICS_RETENTION
+            expired = [key for key, sample in self._samples.items() if sample['completed'] < cutoff]
+            for key in expired:
+                del self._samples[key]
+
+            if changed or expired:
+                self._cache.clear()
+            return changed
+
+    @staticmethod
+    def sample_for(row):
+        """Timing sample for a finished job row, or None if it shouldn't count"""
+        if not row['platform'] or row['conclusion'] not in COUNTED_CONCLUSIONS:
+            return None
+        created = parse_timestamp(row['created_at'])
+        started = parse_timestamp(row['started_at'])
+        completed = parse_timestamp(row['completed_at'])
+        if started is None or completed is None or completed < started:
+            return None
+        return {
+            'app': row['app'],
+            'platform': row['platform'],
+            'runner': runner_group(row['runner_name']),
+            'completed': completed,
+            'queue': max(0.0, started - created) if created is not None else None,
+            'build': completed - started
+        }
+
+    def build_time(self, app, platform):
+        """Median build seconds for an app/platform over the retained history, or None if never seen"""
+        self.update()
+        with self._lock:
+            builds = sorted(s['build'] for s in self._samples.values()
+                            if s['app'] == app and s['platform'] == platform)
+        return percentile(builds, 0.50) if builds else None
+
+    def summary(self, window=DEFAULT_METRICS_WINDOW, app=None):
+        """Queue/build time distributions for jobs completed within window (e.g. '7d').
+
+        Returns {'window', 'jobs', 'platforms': [...], 'runners': [...]}, where
+        each entry has a count plus 'queue' and 'build' as {'p50', 'p95', 'max'}
+        seconds. Raises ValueError for a malformed window.
+        """
+        seconds = parse_window(window)
+        if seconds is None:
+            raise ValueError(f"Invalid window '{window}' - use e.g. 24h or 7d (at most {METRICS_RETENTION // 86400}d)")
+
+        self.update()
+        with self._lock:
+            cached = self._cache.get((window, app))
+            fresh = cached is not None and time.time() - cached[0] < METRICS_CACHE_TTL
+            instruments.cache('metrics_summary', fresh)
+            if fresh:
+                return cached[1]
+
+            cutoff = time.time() - seconds
+            samples = [s for s in self._samples.values()
+                       if s['completed'] >= cutoff and (app is None or s['app'] == app)]
+            by_platform = summarize(samples, lambda s: (s['app'], s['platform']))
+            by_runner = summarize(samples, lambda s: s['runner'])
+            # Judge warm/cold against all retained builds, so the first build in the window has a predecessor
+            warm = library_cache_runs(self._samples.values())
+            placed = [s for s in samples if id(s) in warm]
+            by_cache = summarize(placed, lambda s: 'warm' if warm[id(s)] else 'cold')
+            result = {
+                'window': window,
+                'jobs': len(samples),
+                'platforms': [dict(app=a, platform=p, **stats) for (a, p), stats in sorted(by_platform.items())],
+                'runners': [dict(runner=r, **stats) for r, stats in sorted(by_runner.items())],
+                'libraryCache': {
+                    'warm': by_cache.get('warm'),
+                    'cold': by_cache.get('cold'),
+                    'warmShare': round(len([s for s in placed if warm[id(s)]]) / len(placed), 3) if placed else None
+                }
+            }
+            self._cache[(window, app)] = (time.time(), result)
+            return result
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Runner-aware scheduler for bulk build dispatches.
+
+A bulk trigger used to dispatch every app at once, dumping dozens of jobs on a
+handful of self-hosted runners. Instead, a bulk request becomes a batch of
+per-app items in a queue - one workflow run each, with all the requested
+platforms - and the scheduler thread dispatches an item only when the runner
+pool that gates it has a free slot:
+
+  - 'mac': the Mac Studio runners (iOS, Google Play, Amazon); slots are the
+    online runners in the runner monitor's table
+  - 'windows': the windows-builder machine; WINDOWS_BUILDER_SLOTS slots
+
+Only the Mac-bound platforms are split for scheduling: an item with any of
+them waits for a free Mac slot, and each of its Mac jobs then holds one; its
+Windows job rides along in the Windows builder's queue (one machine builds
+those one after another anyway). A slot is taken by anything the pool is
+already doing: jobs the status store shows as queued or in progress, busy
+runners, and our own recent dispatches that haven't shown up yet. Among
+admissible items, higher priority goes first, then older batches, then the
+longest expected build (longest-first keeps the tail of a full-fleet rebuild
+short).
+
+Admission alone doesn't make a full-fleet rebuild finish sooner - GitHub's
+own queue keeps the runners just as busy (scripts/bench-bulk-schedule.py:
+-1.4% to +3.9% makespan vs blind dispatch). What it buys is a queue we
+control: priorities, one run per app, dispatches held back while rate
+limited, and the place where runner affinity (below) decides placement,
+which is where the makespan gain comes from.
+
+Unity keeps each app's Library/ on the runner that built it, so a build that
+lands on a different runner pays a full reimport. RunnerAffinity remembers
+which runner last built each app/platform and counts how often builds land
+back on it. With RUNNER_AFFINITY=1 the scheduler also targets each Mac build at
+that runner (via the workflows' runner_label input, which needs every runner
+registered with its own name as an extra label), waiting up to AFFINITY_WAIT
+for it before letting any idle runner take the build; single dashboard
+triggers are targeted too, but only at an idle runner. It stays off by
+default: GitHub keeps a job whose label no runner carries queued forever, so
+it is only safe once every Mac runner has been re-registered with its name.
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+import uuid
+
+from github_api import platform_for_job
+
+PLATFORM_POOLS = {'ios': 'mac', 'aab': 'mac', 'amazon': 'mac', 'windows': 'windows'}
+BULK_PLATFORMS = {'all': ['ios', 'aab', 'amazon', 'windows']}  # Bulk targets that expand to several platforms
+
+WINDOWS_BUILDER_SLOTS = int(os.environ.get('WINDOWS_BUILDER_SLOTS', '1'))
+MAC_FALLBACK_SLOTS = int(os.environ.get('MAC_FALLBACK_SLOTS', '2'))  # Used when no local runners are visible
+DISPATCH_GRACE = 300  # Seconds a dispatch holds its slot before GitHub/the runners show the job
+SCHEDULER_TICK = 5  # Seconds between scheduling passes when nothing wakes the scheduler
+FINISHED_BATCHES_KEPT = 20  # Finished batches still reported by the queue API
+
+RUNNER_AFFINITY = os.environ.get('RUNNER_AFFINITY', '') == '1'  # Target Mac builds at the runner that built them last
+AFFINITY_WAIT = 600  # Seconds a build waits for its previous runner before any idle runner may take it
+
+# Typical build times (seconds), used to order work until the build history has real ones
+DEFAULT_BUILD_ESTIMATES = {'ios': 1800, 'aab': 1200, 'amazon': 1200, 'windows': 1500}
+ACTIVE_STATES = ('queued', 'in_progress', 'waiting')
+
+log = logging.getLogger('dashboard.scheduler')
+
+
+def admission_pool(platforms):
+    """The pool whose free slot admits a build of these platforms (Mac if any of them is Mac-bound)"""
+    pools = [PLATFORM_POOLS.get(platform) for platform in platforms]
+    return 'mac' if 'mac' in pools else pools[0]
+
+
+class RunnerAffinity:
+    """Which local runner last built each app/platform, and how often builds land back on it.
+
+    A build that starts on the runner that last built the same app/platform is
+    a hit (warm Library/), on any other runner a miss; builds with no previous
+    runner on record are counted as cold.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = {}  # {(app, platform): runner name}
+        self._current = {}  # {runner name: (run id, job name)} of the job it's running
+        self._stats = {'hits': 0, 'misses': 0, 'cold': 0, 'targeted': 0, 'anyRunner': 0}
+
+    def seed(self, last_runners):
+        """Load {(app, platform): runner} from the build history (runner monitor updates win)"""
+        with self._lock:
+            self._last = {**last_runners, **self._last}
+
+    def preferred(self, app, platform):
+        """The runner that last built app/platform, or None"""
+        with self._lock:
+            return self._last.get((app, platform))
+
+    def observe(self, records):
+        """Runner monitor callback data: note where each newly started job landed"""
+        with self._lock:
+            for record in records:
+                if not record['busy']:
+                    self._current.pop(record['name'], None)
+                    continue
+                job = (record.get('runId'), record.get('job'))
+                if not record['project'] or not record.get('job') or self._current.get(record['name']) == job:
+                    continue
+                self._current[record['name']] = job
+                platform = platform_for_job(record['job'])
+                if PLATFORM_POOLS.get(platform) != 'mac':
+                    continue
+                key = (record['project'], platform)
+                previous = self._last.get(key)
+                outcome = 'cold' if previous is None else ('hits' if previous == record['name'] else 'misses')
+                self._stats[outcome] += 1
+                self._last[key] = record['name']
+
+    def note_dispatch(self, targeted):
+        """Count a Mac dispatch sent to its previous runner (targeted) or left to any runner"""
+        with self._lock:
+            self._stats['targeted' if targeted else 'anyRunner'] += 1
+
+    def to_dict(self):
+        with self._lock:
+            stats = dict(self._stats)
+        placed = stats['hits'] + stats['misses']
+        return {
+            'enabled': RUNNER_AFFINITY,
+            **stats,
+            'hitRate': round(stats['hits'] / placed, 3) if placed else None
+        }
+
+
+class BuildScheduler:
+    """Queue of batched per-app dispatches, admitted by runner capacity.
+
+    The server supplies the moving parts (app_names are all apps whose builds
+    share the runners):
+      dispatch(app, platforms_csv, runner_label) -> {'success': bool, 'error'?: str, 'runnerLabel'?: str}
+      runners() -> the current RunnerSnapshot
+      status(app) -> the app's raw status dict (or None)
+      estimate(app, platform) -> expected build seconds, or None if unknown
+      paused() -> True while dispatching should wait (e.g. rate limited)
+    on_change() is called after every change to the queue. affinity is the
+    RunnerAffinity used to place Mac builds when RUNNER_AFFINITY is on.
+    """
+
+    def __init__(self, app_names, dispatch, runners, status, estimate=None, paused=None, on_change=None,
+                 affinity=None):
+        self.app_names = list(app_names)
+        self.affinity = affinity or RunnerAffinity()
+        self.dispatch = dispatch
+        self.runners = runners
+        self.status = status
+        self.estimate = estimate or (lambda app, platform: None)
+        self.paused = paused or (lambda: False)
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._seq = itertools.count()
+        self._queue = []  # Items waiting for a slot
+        self._batches = {}  # {batch id: batch}, in creation order
+        self._pending = {}  # {(app, platform): {'at', 'seen', 'runner'}} - dispatched, not yet visible
+
+    def start(self):
+        threading.Thread(target=self.run, name='build-scheduler', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def wake(self):
+        """Run a scheduling pass soon (runner or status change)"""
+        self._wake.set()
+
+    def submit(self, apps, platform, priority=0):
+        """Queue a bulk build of platform ('all' or one platform) for apps, one item (and run) per app.
+        Returns the batch dict."""
+        platforms = BULK_PLATFORMS.get(platform, [platform])
+        batch = {
+            'id': uuid.uuid4().hex[:12],
+            'platform': platform,
+            'priority': priority,
+            'createdAt': time.time(),
+            'finishedAt': None,
+            'items': []
+        }
+        seq = next(self._seq)
+        for app in apps:
+            # The run takes as long as its longest job
+            estimate = max(self.estimate(app, p) or DEFAULT_BUILD_ESTIMATES.get(p, 0) for p in platforms)
+            batch['items'].append({
+                'app': app,
+                'platform': ','.join(platforms),
+                'state': 'queued',
+                'estimate': round(estimate),
+                'queuedAt': batch['createdAt'],
+                'dispatchedAt': None,
+                'runner': None,
+                'error': None,
+                'batch': batch['id'],
+                'order': (-priority, seq, -estimate)
+            })
+        with self._lock:
+            self._batches[batch['id']] = batch
+            self._queue.extend(batch['items'])
+            self._queue.sort(key=lambda item: item['order'])
+            self._prune_batches()
+            result = self._batch_dict(batch)
+        log.info("[SCHEDULER] Queued batch %s: %d builds (%s, priority %s)", batch['id'], len(batch['items']), platform, priority)
+        self._changed()
+        self._wake.set()
+        return result
+
+    def run(self):
+        while not self._stopped:
+            try:
+                self.schedule()
+            except Exception as e:
+                log.error("[SCHEDULER] Error in scheduling pass: %s", e)
+            self._wake.wait(timeout=SCHEDULER_TICK)
+            self._wake.clear()
+
+    def schedule(self):
+        """One pass: dispatch queued items while their pools have free slots"""
+        while not self._stopped and not self.paused():
+            with self._lock:
+                if not self._queue:
+                    return
+                slots, occupied = self._pool_usage()
+                self._prune_pending(occupied['mac'] | occupied['windows'])
+                free = self._free_slots(slots, occupied)
+                item, runner = None, None
+                for candidate in self._queue:
+                    if free.get(admission_pool(candidate['platform'].split(',')), 0) > 0:
+                        placement = self._placement(candidate)
+                        if placement is not False:
+                            item, runner = candidate, placement
+                            break
+                if item is None:
+                    return
+                self._queue.remove(item)
+                item['state'] = 'dispatching'
+
+            app = item['app']
+            current = self.status(app) or {}
+            platforms = [p for p in item['platform'].split(',') if current.get(p) not in ACTIVE_STATES]
+            if not platforms:
+                self._finish(item, 'skipped', f"{item['platform']} build(s) already queued/running")
+                continue
+
+            result = self.dispatch(app, ','.join(platforms), runner)
+            if result.get('skipped'):
+                self._finish(item, 'skipped', result.get('error'))
+            elif result.get('success'):
+                item['runner'] = self._dispatched(app, platforms, result.get('runnerLabel'))
+                self._finish(item, 'dispatched')
+            elif self.paused():
+                # Rate limited mid-batch: put it back and wait
+                with self._lock:
+                    item['state'] = 'queued'
+                    self._queue.append(item)
+                    self._queue.sort(key=lambda i: i['order'])
+                self._changed()
+                return
+            else:
+                self._finish(item, 'failed', result.get('error'))
+
+    def trigger(self, app, platform):
+        """Dispatch one build right away, outside the queue (dashboard trigger buttons).
+
+        With RUNNER_AFFINITY on, a Mac build still goes to the runner that built
+        it last when that runner is idle, but never waits for it.
+        """
+        platforms = BULK_PLATFORMS.get(platform, platform.split(','))
+        with self._lock:
+            runner = self._placement({'app': app, 'platform': ','.join(platforms)}, wait=False)
+        result = self.dispatch(app, platform, runner)
+        if result.get('success') and not result.get('skipped'):
+            self._dispatched(app, platforms, result.get('runnerLabel'))
+            self._wake.set()
+        return result
+
+    def _dispatched(self, app, platforms, runner):
+        """Hold the slots (and the targeted runner) of a dispatch until it shows up; returns runner"""
+        if RUNNER_AFFINITY and admission_pool(platforms) == 'mac':
+            self.affinity.note_dispatch(targeted=runner is not None)
+        with self._lock:
+            for platform in platforms:
+                self._pending[(app, platform)] = {'at': time.time(), 'seen': False, 'runner': runner}
+        return runner
+
+    def _placement(self, item, wait=True):
+        """Where to send a queued item (lock held): a runner name to target, None for any
+        runner, or False to keep waiting for its previous runner (only if wait)"""
+        mac_platforms = [p for p in item['platform'].split(',') if PLATFORM_POOLS.get(p) == 'mac']
+        if not RUNNER_AFFINITY or not mac_platforms:
+            return None
+        # One runner label per run: the one that last built its first (longest) Mac platform
+        preferred = self.affinity.preferred(item['app'], mac_platforms[0])
+        runner = next((r for r in self.runners().runners if r['name'] == preferred), None)
+        if runner is None or runner['status'] != 'online':
+            return None  # Never built here, or its runner is gone/offline - no point waiting
+        reserved = {pending['runner'] for pending in self._pending.values() if not pending['seen']}
+        if not runner['busy'] and preferred not in reserved:
+            return preferred
+        if not wait or time.time() - item['queuedAt'] > AFFINITY_WAIT:
+            return None
+        return False
+
+    def _pool_usage(self):
+        """({pool: slots}, {pool: {(app, platform)}}) - capacity and what each pool is doing (lock held)"""
+        runners = self.runners()
+        slots = {
+            'mac': runners.online if runners.total else MAC_FALLBACK_SLOTS,
+            'windows': WINDOWS_BUILDER_SLOTS
+        }
+        # Everything each pool is doing, as (app, platform) keys so a job the
+        # status store and a busy runner both report is only counted once
+        occupied = {pool: set() for pool in slots}
+        for app in self.app_names:
+            current = self.status(app) or {}
+            for platform, pool in PLATFORM_POOLS.items():
+                if current.get(platform) in ACTIVE_STATES:
+                    occupied[pool].add((app, platform))
+        for runner in runners.runners:
+            if runner['busy']:
+                # Busy local runners hold a mac slot whatever they build (including apps we don't track)
+                platform = platform_for_job(runner['job']) if runner.get('job') else None
+                occupied['mac'].add((runner['project'], platform) if runner['project'] and platform
+                                    else ('runner', runner['name']))
+        return slots, occupied
+
+    def _prune_pending(self, active):
+        """Note recent dispatches that have shown up; forget those that started and finished,
+        or never showed up within DISPATCH_GRACE (lock held)"""
+        now = time.time()
+        for key, pending in list(self._pending.items()):
+            if key in active:
+                pending['seen'] = True
+            elif pending['seen'] or now - pending['at'] > DISPATCH_GRACE:
+                del self._pending[key]
+
+    def _free_slots(self, slots, occupied):
+        """{pool: free slots} (lock held). Recent dispatches that haven't shown up yet hold theirs; the
+        Mac jobs of a run targeted at one runner share one slot, as they build there one after another"""
+        now = time.time()
+        active = occupied['mac'] | occupied['windows']
+        taken = {pool: set(keys) for pool, keys in occupied.items()}
+        for key, pending in self._pending.items():
+            if key not in active and not pending['seen'] and now - pending['at'] <= DISPATCH_GRACE:
+                taken[PLATFORM_POOLS[key[1]]].add(key)
+        targeted = {key: ('runner', pending['runner']) for key, pending in self._pending.items() if pending['runner']}
+        taken['mac'] = {targeted.get(key, key) for key in taken['mac']}
+        return {pool: slots[pool] - len(taken[pool]) for pool in slots}
+
+    def _finish(self, item, state, error=None):
+        label = {'dispatched': '✅ Dispatched', 'skipped': '⏸️  Skipped', 'failed': '❌ Failed'}[state]
+        where = f" on {item['runner']}" if item['runner'] else ''
+        log.log(logging.WARNING if state == 'failed' else logging.INFO, "[SCHEDULER] %s %s (%s)%s%s",
+                label, item['app'], item['platform'], where, f' - {error}' if error else '')
+        with self._lock:
+            item['state'] = state
+            item['error'] = error
+            if state == 'dispatched':
+                item['dispatchedAt'] = time.time()
+            batch = self._batches.get(item['batch'])
+            if batch and batch['finishedAt'] is None and all(
+                    i['state'] not in ('queued', 'dispatching') for i in batch['items']):
+                batch['finishedAt'] = time.time()
+                log.info("[SCHEDULER] Batch %s done: %s", batch['id'], self._counts(batch))
+        self._changed()
+
+    def _prune_batches(self):
+        finished = [batch_id for batch_id, batch in self._batches.items() if batch['finishedAt']]
+        for batch_id in finished[:-FINISHED_BATCHES_KEPT]:
+            del self._batches[batch_id]
+
+    @staticmethod
+    def _counts(batch):
+        counts = {}
+        for item in batch['items']:
+            counts[item['state']] = counts.get(item['state'], 0) + 1
+        return counts
+
+    def _batch_dict(self, batch):
+        """Plain-dict copy of a batch (lock held)"""
+        return {
+            **{key: value for key, value in batch.items() if key != 'items'},
+            'counts': self._counts(batch),
+            'items': [{key: value for key, value in item.items() if key != 'order'} for item in batch['items']]
+        }
+
+    def batch(self, batch_id):
+        """A batch in the /api/queue shape, or None"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return self._batch_dict(batch) if batch else None
+
+    def to_dict(self, batches=True):
+        """Queue state for /api/queue: free slots per pool, waiting items in order, and recent batches"""
+        with self._lock:
+            free = self._free_slots(*self._pool_usage())
+            queue = {
+                'freeSlots': free,
+                'affinity': self.affinity.to_dict(),
+                'queued': [{'app': i['app'], 'platform': i['platform'], 'estimate': i['estimate'],
+                            'priority': -i['order'][0]} for i in self._queue],
+                'inFlight': [{'app': app, 'platform': platform, 'dispatchedAt': pending['at'], 'runner': pending['runner']}
+                             for (app, platform), pending in self._pending.items()],
+            }
+            if batches:
+                queue['batches'] = [self._batch_dict(batch) for batch in reversed(list(self._batches.values()))]
+            return queue
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Fingerprints of build failures, so a failure seen before is analyzed once.
+
+A broken runner fails every app's build the same way (a locked keychain on the
+Mac, Unity missing on the Windows box), and the agent used to download and scan
+each of those multi-MB logs again to reach the same conclusion. A failure's
+fingerprint is taken from the last FINGERPRINT_TAIL bytes of its job log: the
+platform and the last few distinct error lines with everything that changes
+from build to build normalized away (timestamps, numbers, hashes, paths, app
+names). An analysis whose fix works on the runner itself (clearing a CocoaPods
+repo, a keychain) only holds for that runner, so it is stored under
+runner_fingerprint(), which adds the runner group. FingerprintCache maps
+fingerprints to the analysis result, LRU-evicted and expired after
+FINGERPRINT_TTL so a runner that gets repaired (or breaks differently) is
+looked at afresh.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from build_metrics import runner_group
+
+FINGERPRINT_TAIL = 64 * 1024  # Bytes from the end of a job log the fingerprint is taken from
+FINGERPRINT_LINES = 5  # Distinct error lines (the last ones in the tail) that make up a fingerprint
+FINGERPRINT_CACHE_SIZE = 256  # Fingerprints remembered
+FINGERPRINT_TTL = 3600  # Seconds an analysis is reused before the next occurrence is analyzed again
+
+ERROR_LINE = re.compile(r'##\[error\]|\berror\b|\bfailed\b|\bfatal\b|exception|\[!\]', re.IGNORECASE)
+TIMESTAMP = re.compile('^\ufeff?' r'\d{4}-\d\d-\d\dt[\d:.]+z\s*')
+PATH = re.compile(r'(?:\b[a-z]:)?(?:[\\/][\w.@+-]+){2,}[\\/]?')
+HEX = re.compile(r'\b(?:0x[0-9a-f]+|(?=[0-9a-f]*\d)[0-9a-f]{7,})\b')
+NUMBER = re.compile(r'\d+')
+SPACE = re.compile(r'\s+')
+
+
+def normalize_line(line, app_pattern=None):
+    """An error line with what differs between builds of different apps replaced by placeholders"""
+    line = TIMESTAMP.sub('', line.strip().lower())
+    line = PATH.sub('<path>', line)
+    if app_pattern:
+        line = app_pattern.sub('<app>', line)
+    line = HEX.sub('<hex>', line)
+    line = NUMBER.sub('#', line)
+    return SPACE.sub(' ', line).strip()
+
+
+def app_name_pattern(apps):
+    """Regex matching any of the app names (longest first), for normalize_line"""
+    names = sorted({app.lower() for app in apps}, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(name) for name in names)) if names else None
+
+
+def error_lines(log_tail, app_pattern=None):
+    """The last FINGERPRINT_LINES distinct normalized error lines of a log tail, in log order"""
+    lines = []
+    for line in reversed(log_tail.splitlines()):
+        if not ERROR_LINE.search(line):
+            continue
+        normalized = normalize_line(line, app_pattern)
+        if normalized and normalized not in lines:
+            lines.append(normalized)
+            if len(lines) == FINGERPRINT_LINES:
+                break
+    return lines[::-1]
+
+
+def fingerprint(log_tail, platform, app_pattern=None):
+    """(fingerprint, error lines) of a failed job, or (None, []) if its tail has no error lines"""
+    lines = error_lines(log_tail, app_pattern)
+    if not lines:
+        return None, []
+    key = '\n'.join([platform or ''] + lines)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16], lines
+
+
+def runner_fingerprint(key, runner_name):
+    """A fingerprint narrowed to one runner group, for analyses whose fix was applied on the runner"""
+    return hashlib.sha1(f"{key}\n{runner_group(runner_name)}".encode('utf-8')).hexdigest()[:16]
+
+
+class FingerprintCache:
+    """LRU + TTL map of failure fingerprint -> analysis result, with hit statistics"""
+
+    def __init__(self, max_entries=FINGERPRINT_CACHE_SIZE, ttl=FINGERPRINT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {fingerprint: (stored_at, result)}
+        self.stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0}
+
+    def get(self, *keys):
+        """The result stored under the first of these fingerprints that has a live one, or None
+        (counted as one lookup)"""
+        with self._lock:
+            self.stats['lookups'] += 1
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and time.time() - entry[0] > self.ttl:
+                    del self._entries[key]
+                    self.stats['expired'] += 1
+                    entry = None
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return entry[1]
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = (time.time(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evicted'] += 1
+
+    def to_dict(self):
+        with self._lock:
+            lookups = self.stats['lookups']
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'hitRate': round(self.stats['hits'] / lookups, 3) if lookups else None
+            }
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Failure signatures the auto-fix agent recognizes in build logs.
+
+FAILURE_RULES is the declarative table: in priority order, each rule names the
+BuildFailureAnalyzer fix it triggers (`_fix_<fix>`) and when it applies - any
+of its alternatives, where an alternative is a list of phrases that must all
+appear somewhere in the log. Phrases are matched case-insensitively, except
+those named by the rule's match_case (all of its phrases if True), which must
+appear exactly as written - as the original checks had them. A fix can have more
+than one rule, e.g. an exact error message that settles it on sight (decisive)
+and a looser combination of words that only counts if nothing better turns up.
+Decisive rules are ranked above all others; among themselves the one that
+appears first in the log wins, so a streamed log can be dropped as soon as one
+shows up.
+
+SignatureScanner compiles the table into a few regexes and runs the log
+through them once, chunk by chunk: each chunk is lower-cased once, every
+pattern is searched through it (match_case phrases are then checked against
+the chunk as written), and the line each phrase first appeared on is
+recorded. A phrase found drops out of its pattern, which is recompiled, so
+the common ones ('error', 'failed') are only looked for until their first
+appearance.
+
+Each pattern starts with one literal anchor character and covers every
+phrase filed under it (anchor_groups: all 36 phrases fit under three), so a
+chunk takes three regex passes instead of one str.find per phrase. The anchor
+matters: re finds a literal first character with a fast scan, but one
+alternation over phrases starting with different characters makes it test
+every position, and measured several times slower than the anchored patterns - see
+scripts/bench-failure-signatures.py.
+"""
+
+import re
+import string
+
+# Decisive rules identify the failure on their own and outrank every other rule: the first of them to
+# appear in the log settles it, and the agent stops reading there. The rest count only without one
+FAILURE_RULES = [
+    {'rule': 'cocoapods-duplicate-sources', 'fix': 'cocoapods_duplicate_repos', 'decisive': True,
+     'when': [['duplicate sources']]},
+    {'rule': 'xcode-command-line-tools', 'fix': 'xcode_command_line_tools', 'decisive': True, 'match_case': True,
+     'when': [['requires Xcode, but active developer directory', 'CommandLineTools']]},
+    {'rule': 'provisioning-profile-not-found', 'fix': 'provisioning_profile_not_found', 'decisive': True,
+     'match_case': True, 'when': [['No provisioning profile found after match']]},
+    {'rule': 'git-publickey-denied', 'fix': 'git_authentication', 'decisive': True, 'match_case': True,
+     'when': [['Permission denied (publickey)']]},
+    {'rule': 'no-signing-identities', 'fix': 'certificate_not_found', 'decisive': True,
+     'when': [['no local code signing identities']]},
+    {'rule': 'windows-no-unity-installation', 'fix': 'windows_unity_not_found', 'decisive': True,
+     'when': [['no unity installation found']]},
+    {'rule': 'windows-il2cpp-did-not-run', 'fix': 'windows_il2cpp_failure', 'decisive': True,
+     'when': [['il2cpp.exe did not run properly']]},
+    {'rule': 'windows-disk-space', 'fix': 'windows_disk_space', 'decisive': True,
+     'when': [['not enough space'], ['disk full'], ['no space left']]},
+    {'rule': 'cocoapods-master-repo', 'fix': 'cocoapods_duplicate_repos',
+     'when': [['cocoapods/repos/cocoapods']]},
+    {'rule': 'keychain-locked', 'fix': 'keychain_timeout',
+     'when': [['keychain', 'locked'], ['keychain', 'timeout']]},
+    {'rule': 'unity-sigterm', 'fix': 'unity_terminated', 'match_case': True,
+     'when': [['Terminated: 15'], ['exit code 143']]},
+    {'rule': 'cocoapods-cdn', 'fix': 'pod_install_failure', 'match_case': ['cdn.cocoapods.org'],
+     'when': [['pod install', 'error', 'cdn.cocoapods.org'], ['pod install', 'failed', 'cdn.cocoapods.org']]},
+    {'rule': 'git-authentication-failed', 'fix': 'git_authentication', 'match_case': True,
+     'when': [['Authentication failed']]},
+    {'rule': 'certificate-not-found', 'fix': 'certificate_not_found',
+     'when': [['certificate', 'not found']]},
+    {'rule': 'network-error', 'fix': 'transient_network_error',
+     'when': [['connection refused'], ['connection timeout'], ['network is unreachable'],
+              ['temporary failure in name resolution'], ['could not resolve host']]},
+    {'rule': 'windows-unity-exe-not-found', 'fix': 'windows_unity_not_found',
+     'when': [['unity.exe', 'not found']]},
+    {'rule': 'windows-il2cpp-error', 'fix': 'windows_il2cpp_failure',
+     'when': [['il2cpp error'], ['buildfailedexception: il2cpp'], ['c++ compiler not found'], ['msvc']]},
+    {'rule': 'windows-visual-studio-missing', 'fix': 'windows_visual_studio_missing',
+     'when': [['visual studio', 'not found'], ['visual studio', 'not installed']]},
+]
+
+MAX_LINE = 64 * 1024  # Characters of a single unfinished line held back before scanning it anyway
+LINE_OVERLAP = 200  # Characters of such a line kept, so a phrase split where it was cut is still found
+
+# Case-folds ASCII letters only, for text whose lower() changes length (so positions still line up)
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def phrase_key(rule, phrase):
+    """(phrase as searched for, whether it must match case) for a phrase of a rule"""
+    match_case = rule.get('match_case', False)
+    exact = match_case is True or phrase in (match_case or ())
+    return (phrase, True) if exact else (phrase.lower(), False)
+
+
+def rule_phrases(rules):
+    """Every distinct phrase the rules use, as phrase_key()s"""
+    return {phrase_key(rule, phrase) for rule in rules for alternative in rule['when'] for phrase in alternative}
+
+
+def anchor_groups(phrases):
+    """{anchor character: [phrases containing it]} - every phrase under one anchor, as few anchors as possible"""
+    left = set(phrases)
+    groups = {}
+    while left:
+        anchor = max(sorted({char for phrase in left for char in phrase}),
+                     key=lambda char: sum(char in phrase for phrase in left))
+        group = sorted(phrase for phrase in left if anchor in phrase)
+        if len(group) == 1 and group[0][0] not in groups:
+            anchor = group[0][0]  # A phrase on its own is searched for as one literal
+        groups[anchor] = group
+        left -= set(group)
+    return groups
+
+
+def anchored_regex(anchor, phrases):
+    """The anchor character, then a trie of what follows it in each phrase, each ending in a lookbehind for the whole phrase.
+
+    A match starts at the anchor of a phrase occurrence; the phrase itself
+    starts phrase.index(anchor) characters earlier.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase[phrase.index(anchor) + 1:]:
+            node = node.setdefault(char, {})
+        node.setdefault('', []).append(phrase)
+
+    def alternation(node):
+        options = [re.escape(char) + alternation(child) for char, child in sorted(node.items()) if char]
+        options += [f'(?<={re.escape(phrase)})' for phrase in node.get('', ())]
+        return options[0] if len(options) == 1 else '(?:' + '|'.join(options) + ')'
+
+    return re.compile(re.escape(anchor) + alternation(trie))
+
+
+class SignatureScanner:
+    """Runs a log through all the rules' phrases in one pass, fed chunk by chunk.
+
+    Only complete lines are scanned (the unfinished last line of a chunk waits
+    for the next one), so line numbers are exact and no phrase is cut in two.
+    """
+
+    def __init__(self, rules=FAILURE_RULES):
+        self.rules = rules
+        self._pending = rule_phrases(rules)
+        self._groups = anchor_groups({phrase.lower() for phrase, _ in self._pending})
+        self._patterns = {anchor: anchored_regex(anchor, phrases) for anchor, phrases in self._groups.items()}
+        self.first_seen = {}  # {phrase_key: line number (1-based) where it first appeared}
+        self.lines = 0  # Complete lines scanned so far
+        self.chars = 0  # Characters fed so far
+        self._carry = ''
+
+    def feed(self, text):
+        """Scan the next chunk of the log; returns the first decisive rule matched so far, or None"""
+        self.chars += len(text)
+        block = self._carry + text
+        end = block.rfind('\n') + 1
+        if end:
+            self._scan(block[:end])
+            self._carry = block[end:]
+        elif len(block) > MAX_LINE:
+            self._scan(block)
+            self._carry = block[-LINE_OVERLAP:]
+        else:
+            self._carry = block
+        return self.decisive()
+
+    def finish(self):
+        """Scan whatever is left after the last newline; returns the first decisive rule matched, or None"""
+        if self._carry:
+            self._scan(self._carry + '\n')
+            self._carry = ''
+        return self.decisive()
+
+    def _scan(self, segment):
+        lowered = segment.lower()
+        if len(lowered) != len(segment):
+            lowered = segment.translate(ASCII_LOWER)
+        for anchor in list(self._patterns):
+            pos = 0
+            while anchor in self._patterns:
+                match = self._patterns[anchor].search(lowered, pos)
+                if match is None:
+                    break
+                # Every phrase of the group anchored here, as written for match_case ones
+                start = match.start()
+                found = set()
+                for phrase in self._groups[anchor]:
+                    begin = start - phrase.index(anchor)
+                    if begin >= 0 and lowered.startswith(phrase, begin):
+                        found |= {key for key in self._pending if key[0].lower() == phrase
+                                  and (not key[1] or segment.startswith(key[0], begin))}
+                if found:
+                    self._found(anchor, found, self.lines + lowered.count('\n', 0, start) + 1)
+                pos = start + 1
+        self.lines += segment.count('\n')
+
+    def _found(self, anchor, keys, line):
+        """Record phrases' first line and recompile their group without them"""
+        for key in keys:
+            self.first_seen[key] = line
+        self._pending -= keys
+        pending = {phrase.lower() for phrase, _ in self._pending}
+        self._groups[anchor] = [phrase for phrase in self._groups[anchor] if phrase in pending]
+        if self._groups[anchor]:
+            self._patterns[anchor] = anchored_regex(anchor, self._groups[anchor])
+        else:
+            del self._patterns[anchor]
+
+    def _matched(self, rule):
+        """(line, alternative) for the rule's alternative that completed first in the log, or None"""
+        found = [(max(self.first_seen[phrase_key(rule, p)] for p in alternative), alternative)
+                 for alternative in rule['when'] if all(phrase_key(rule, p) in self.first_seen for p in alternative)]
+        return min(found, key=lambda f: f[0]) if found else None
+
+    def _ranked(self):
+        """[(rule, alternative)] for the rules that matched: decisive ones in the order they appeared, then the rest"""
+        matched = [(rule, self._matched(rule)) for rule in self.rules]
+        decisive = sorted(((r, m) for r, m in matched if m and r.get('decisive')), key=lambda rm: rm[1][0])
+        rest = [(r, m) for r, m in matched if m and not r.get('decisive')]
+        return [(r, m[1]) for r, m in decisive + rest]
+
+    def decisive(self):
+        """The decisive rule that appeared first in the log so far, or None"""
+        ranked = self._ranked()
+        return ranked[0][0] if ranked and ranked[0][0].get('decisive') else None
+
+    def matches(self):
+        """Every rule that matched, in priority order: [{'rule', 'fix', 'lines': {phrase: line}}]"""
+        return [{'rule': rule['rule'], 'fix': rule['fix'],
+                 'lines': {p: self.first_seen[phrase_key(rule, p)] for p in alternative}}
+                for rule, alternative in self._ranked()]
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Work queue for the auto-fix agent.
+
+Handling a failure takes four steps with very different costs, and the agent
+used to run them one app, one run and one job at a time - with a blocking
+sleep before delayed retries (up to a minute) that stalled every other app.
+FixPipeline gives each step its own bounded pool:
+
+  - scan + fetch: bring an app's history up to date and find failed runs not
+    yet handled, then download their failed jobs' logs (GitHub I/O)
+  - analyze: match the log against the known failures and apply the local fix
+  - retry: trigger the rebuild; a delayed retry waits on a timer, not a worker
+
+Work for one app stays in order: each app has a lane, and the next item in it
+(a scan, or a failed run found by one) starts only after the previous item has
+left the pipeline, so a run's retry is always sent before the app's next
+failure is analyzed. Different apps move through the pools independently.
+"""
+
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+FETCH_WORKERS = 4  # App scans and log downloads in flight at once
+ANALYSIS_WORKERS = 2  # Logs analyzed (and local fixes applied) at once
+RETRY_WORKERS = 2  # Rebuild triggers in flight at once
+
+
+class FixPipeline:
+    """Bounded scan/fetch, analysis and retry pools with per-app ordering.
+
+    The stages are plain callables:
+      scan(app) -> list of failure items not handled yet (the agent's: a run's failed jobs)
+      fetch(item) -> item with its log loaded, or None to drop it
+      analyze(item) -> fix dict ({'retry': bool, 'delay'?: seconds, ...}) or None
+      retry(item, fix) -> trigger the rebuild
+    """
+
+    def __init__(self, scan, fetch, analyze, retry,
+                 fetch_workers=FETCH_WORKERS, analysis_workers=ANALYSIS_WORKERS, retry_workers=RETRY_WORKERS):
+        self.stages = {'scan': scan, 'fetch': fetch, 'analyze': analyze, 'retry': retry}
+        self._pools = {
+            'fetch': ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix='fix-fetch'),
+            'analyze': ThreadPoolExecutor(max_workers=analysis_workers, thread_name_prefix='fix-analyze'),
+            'retry': ThreadPoolExecutor(max_workers=retry_workers, thread_name_prefix='fix-retry')
+        }
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._lanes = {}  # {app: deque of ('scan', None) / ('fetch', item) waiting their turn}
+        self._active = set()  # Apps with an item somewhere in the pipeline
+        self._timers = {}  # {app: threading.Timer} for delayed retries
+        self.stats = collections.Counter()  # scans, scansMerged, failures, fetched, analyzed, fixed, delayed, retries, errors
+
+    def submit(self, app):
+        """Queue a check of app for new failures; a check already waiting in its lane absorbs this one"""
+        with self._lock:
+            lane = self._lanes.setdefault(app, collections.deque())
+            if ('scan', None) in lane:
+                self.stats['scansMerged'] += 1
+                return
+            lane.append(('scan', None))
+        self._advance(app)
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def _advance(self, app):
+        """Start the app's next item if nothing of it is in the pipeline"""
+        with self._lock:
+            lane = self._lanes.get(app)
+            if app in self._active or not lane:
+                return
+            stage, item = lane.popleft()
+            self._active.add(app)
+        self._pools['fetch'].submit(self._run, stage, app, item)
+
+    def _run(self, stage, app, item, fix=None):
+        try:
+            if stage == 'scan':
+                self._count('scans')
+                items = self.stages['scan'](app) or []
+                with self._lock:
+                    self.stats['failures'] += len(items)
+                    # Ahead of anything queued for the app since, in the order found
+                    self._lanes[app].extendleft(('fetch', i) for i in reversed(items))
+                return self._finish(app)
+
+            if stage == 'fetch':
+                item = self.stages['fetch'](item)
+                if item is None:
+                    return self._finish(app)
+                self._count('fetched')
+                self._pools['analyze'].submit(self._run, 'analyze', app, item)
+                return
+
+            if stage == 'analyze':
+                fix = self.stages['analyze'](item)
+                self._count('analyzed')
+                if not fix:
+                    return self._finish(app)
+                self._count('fixed')
+                if not fix.get('retry'):
+                    return self._finish(app)
+                delay = fix.get('delay', 0)
+                if delay > 0:
+                    self._count('delayed')
+                    print(f"⏳ Retrying {app} in {delay}s", flush=True)
+                    timer = threading.Timer(delay, self._retry_due, args=(app, item, fix))
+                    timer.daemon = True
+                    with self._lock:
+                        self._timers[app] = timer
+                    timer.start()
+                else:
+                    self._pools['retry'].submit(self._run, 'retry', app, item, fix)
+                return
+
+            if stage == 'retry':
+                self._count('retries')
+                self.stages['retry'](item, fix)
+                return self._finish(app)
+        except Exception as e:
+            self._count('errors')
+            print(f"❌ Error in {stage} for {app}: {e}", flush=True)
+            self._finish(app)
+
+    def _retry_due(self, app, item, fix):
+        with self._lock:
+            self._timers.pop(app, None)
+        self._pools['retry'].submit(self._run, 'retry', app, item, fix)
+
+    def _finish(self, app):
+        with self._lock:
+            self._active.discard(app)
+            if not self._lanes.get(app):
+                self._lanes.pop(app, None)
+            if not self._active and not self._lanes:
+                self._idle.notify_all()
+        self._advance(app)
+
+    def wait_idle(self, timeout=None):
+        """Block until no work is queued, in flight or waiting on a timer; False on timeout"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            while self._active or self._lanes:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+            return True
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                **self.stats,
+                'inFlight': sorted(self._active),
+                'queued': {app: len(lane) for app, lane in self._lanes.items() if lane},
+                'retryTimers': sorted(self._timers)
+            }
+
+    def shutdown(self):
+        """Cancel pending retry timers and stop the pools once their current work is done"""
+        with self._lock:
+            timers = list(self._timers.values())
+            self._timers.clear()
+        for timer in timers:
+            timer.cancel()
+        for pool in self._pools.values():
+            pool.shutdown(wait=False)
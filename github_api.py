@@ -0,0 +1,564 @@
+#!/usr/bin/env python3
+"""
+GitHub REST API client shared by the dashboard server and the auto-fix agent.
+
+Replaces per-call `gh` subprocesses: the auth token is loaded once, and HTTPS
+connections are kept alive and reused between calls. The transport is
+pluggable, so the client can be pointed at a local fake GitHub server.
+"""
+
+import atexit
+import codecs
+import http.client
+import io
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from urllib.parse import urlencode, urljoin, urlsplit
+
+from instrumentation import github_endpoint, instruments
+
+# GitHub CLI path (only used to look up the auth token if none is in the environment)
+GH_CLI = '/opt/homebrew/bin/gh'
+
+OWNER = 'LuckyJackpotCasino'
+API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com')
+
+# Workflows whose filename doesn't follow the <app>-builds.yml convention
+WORKFLOW_FILES = {
+    'kenocasino': 'keno-builds.yml',
+    'blackjack21': 'blackjack-builds.yml',
+    'fvg-multicardkeno': 'fvg-multicardkeno-builds.yml',
+    'fvg-keno': 'fvg-keno-builds.yml',
+    'fvg-fourcardkeno': 'fvg-fourcardkeno-builds.yml'
+}
+
+MAX_CONNECTIONS = 8  # Default cap on concurrent requests through one transport
+MAX_REDIRECTS = 3
+LOG_CHUNK_SIZE = 64 * 1024  # Bytes read at a time when streaming a job log
+
+# Conditional-request cache (304 responses don't count against the rate limit)
+RESPONSE_CACHE_FILE = os.environ.get(
+    'GITHUB_HTTP_CACHE', os.path.expanduser('~/.cache/buildbot9000/github-http-cache.json'))
+RESPONSE_CACHE_MAX_ENTRIES = 2000
+RESPONSE_CACHE_MAX_BODY = 1024 * 1024  # Don't cache anything bigger (e.g. logs)
+RESPONSE_CACHE_SAVE_INTERVAL = 30  # Seconds between writes of the cache file
+
+log = logging.getLogger('github_api')
+
+
+def get_workflow_file(app):
+    """Get the workflow filename for an app"""
+    return WORKFLOW_FILES.get(app, f'{app}-builds.yml')
+
+
+def platform_for_job(job_name):
+    """Map a job name to the platform it builds (None for setup/other jobs)"""
+    job_name = job_name.lower()
+    if job_name == 'setup':
+        return None
+    if 'build-ios' in job_name or 'ios' in job_name:
+        return 'ios'
+    elif 'build-aab' in job_name or 'aab' in job_name:
+        return 'aab'
+    elif 'build-amazon' in job_name or 'amazon' in job_name:
+        return 'amazon'
+    elif 'build-windows' in job_name or 'windows' in job_name:
+        return 'windows'
+    return None
+
+
+class GitHubAPIError(Exception):
+    """Raised for non-2xx responses from the GitHub API"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(f'GitHub API {status}: {message}')
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+    @property
+    def rate_limited(self):
+        """True if GitHub rejected the request because we're out of quota"""
+        if self.status not in (403, 429):
+            return False
+        return self.headers.get('x-ratelimit-remaining') == '0' or 'rate limit' in self.message.lower()
+
+    @property
+    def rate_limit_reset(self):
+        """Epoch seconds when the rate limit resets, if GitHub told us"""
+        try:
+            return int(self.headers['x-ratelimit-reset'])
+        except (KeyError, ValueError):
+            return None
+
+
+class Response:
+    """A fully-read HTTP response"""
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers  # Lower-cased header names
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8')) if self.body else None
+
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+
+class StreamResponse:
+    """An HTTP response whose body is read on demand; holds its connection (and slot) until closed"""
+
+    def __init__(self, status, headers, raw, release):
+        self.status = status
+        self.headers = headers  # Lower-cased header names
+        self._raw = raw
+        self._release = release
+
+    def read(self, size=-1):
+        return self._raw.read(size)
+
+    def iter_chunks(self, chunk_size):
+        """Yield the body in byte chunks of at most chunk_size"""
+        while True:
+            chunk = self._raw.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        if self._release:
+            self._release(reusable=self._raw.isclosed())
+            self._release = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PooledTransport:
+    """HTTP(S) transport that keeps connections alive and reuses them per host.
+
+    At most `max_connections` requests are in flight at once; callers beyond
+    that wait for a free slot, which doubles as a global concurrency cap.
+    """
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, timeout=15):
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._idle = {}  # {(scheme, netloc): [connection, ...]}
+
+    def _connect(self, scheme, netloc):
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _checkout(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self._connect(*key), False
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            self._idle.setdefault(key, []).append(conn)
+
+    def _send(self, method, url, headers, body):
+        """Send a request on a pooled connection; returns (key, connection, response with unread body)"""
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        conn, reused = self._checkout(key)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            return key, conn, conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+            # Server closed an idle keep-alive connection - retry once on a fresh one
+            conn = self._connect(*key)
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                return key, conn, conn.getresponse()
+            except Exception:
+                conn.close()
+                raise
+        except Exception:
+            conn.close()
+            raise
+
+    def request(self, method, url, headers=None, body=None):
+        """Send a request and return a Response with the body fully read"""
+        with self._slots:
+            key, conn, resp = self._send(method, url, headers, body)
+            try:
+                data = resp.read()
+            except Exception:
+                conn.close()
+                raise
+            response_headers = {k.lower(): v for k, v in resp.getheaders()}
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self._checkin(key, conn)
+
+        return Response(resp.status, response_headers, data)
+
+    def open(self, method, url, headers=None, body=None):
+        """Send a request and return a StreamResponse; the caller reads the body and closes it"""
+        self._slots.acquire()
+        try:
+            key, conn, resp = self._send(method, url, headers, body)
+        except Exception:
+            self._slots.release()
+            raise
+
+        def release(reusable):
+            # A body abandoned part-way leaves the connection mid-response: drop it
+            if reusable and not resp.will_close:
+                self._checkin(key, conn)
+            else:
+                conn.close()
+            self._slots.release()
+
+        return StreamResponse(resp.status, {k.lower(): v for k, v in resp.getheaders()}, resp, release)
+
+    def close(self):
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+class ResponseCache:
+    """ETag/Last-Modified cache of GET responses, persisted to disk.
+
+    Lets the client send conditional requests and serve 304s from the stored
+    copy. The file is shared by the server and the agent: saves merge with
+    whatever is already on disk and replace it atomically.
+    """
+
+    def __init__(self, path=None, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {key: {'etag', 'last_modified', 'body', 'stored_at'}}
+        self._dirty = False
+        self._last_save = time.time()
+        if path:
+            self._entries.update(self._read_file())
+
+    def _read_file(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, etag, last_modified, body):
+        if len(body) > RESPONSE_CACHE_MAX_BODY:
+            return
+        with self._lock:
+            self._entries[key] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'body': body.decode('utf-8', errors='replace'),
+                'stored_at': time.time()
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            due = time.time() - self._last_save >= RESPONSE_CACHE_SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def save(self):
+        """Write the cache to disk if anything changed since the last save"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            merged = self._read_file()
+            merged.update(self._entries)
+            if len(merged) > self.max_entries:
+                newest = sorted(merged.items(), key=lambda kv: kv[1].get('stored_at', 0))[-self.max_entries:]
+                merged = dict(newest)
+            self._dirty = False
+            self._last_save = time.time()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(merged, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning("⚠️  Could not save GitHub response cache: %s", e)
+
+
+def load_token():
+    """Load the GitHub token from the environment, falling back to `gh auth token`"""
+    token = os.environ.get('GITHUB_TOKEN') or os.environ.get('GH_TOKEN')
+    if token:
+        return token.strip()
+    try:
+        result = subprocess.run([GH_CLI, 'auth', 'token'], capture_output=True, text=True, timeout=10)
+        if result.returncode == 0 and result.stdout.strip():
+            return result.stdout.strip()
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    return None
+
+
+class GitHubClient:
+    """Thin client for the Actions endpoints the dashboard and agent use"""
+
+    def __init__(self, token=None, transport=None, base_url=API_URL, owner=OWNER, response_cache=None):
+        self.token = token
+        self.transport = transport or PooledTransport()
+        self.response_cache = response_cache
+        self.base_url = base_url.rstrip('/')
+        self.owner = owner
+        self._default_branches = {}
+        self._count_lock = threading.Lock()
+        self.requests_made = 0  # API calls issued (redirects to log storage not counted)
+        self.not_modified = 0  # Calls answered 304 from the response cache (free)
+
+    def request(self, method, path, params=None, body=None, accept='application/vnd.github+json'):
+        """Call the API and return the Response, following redirects (e.g. for log downloads)"""
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = self._request(method, path, params, body, accept)
+            status = response.status
+            return response
+        except GitHubAPIError as e:
+            status = e.status
+            raise
+        finally:
+            instruments.observe('github_request_seconds', time.perf_counter() - started,
+                                method=method, endpoint=github_endpoint(path), status=str(status))
+
+    def _request(self, method, path, params, body, accept):
+        url = path if path.startswith('http') else f'{self.base_url}{path}'
+        if params:
+            url += '?' + urlencode(params)
+
+        api_host = urlsplit(self.base_url).netloc
+        payload = json.dumps(body).encode() if body is not None else None
+        with self._count_lock:
+            self.requests_made += 1
+
+        # Conditional GETs against the API host: revalidate our stored copy
+        cache_key = f'{accept} {url}'
+        cached = None
+        if method == 'GET' and self.response_cache is not None:
+            cached = self.response_cache.get(cache_key)
+
+        for hop in range(MAX_REDIRECTS + 1):
+            headers = {
+                'Accept': accept,
+                'User-Agent': 'BuildBot9000',
+                'X-GitHub-Api-Version': '2022-11-28'
+            }
+            # Only send credentials to the API host, never to redirect targets (log storage)
+            if self.token and urlsplit(url).netloc == api_host:
+                headers['Authorization'] = f'Bearer {self.token}'
+            if payload is not None:
+                headers['Content-Type'] = 'application/json'
+            if cached and hop == 0:
+                if cached.get('etag'):
+                    headers['If-None-Match'] = cached['etag']
+                if cached.get('last_modified'):
+                    headers['If-Modified-Since'] = cached['last_modified']
+
+            response = self.transport.request(method, url, headers=headers, body=payload)
+
+            if response.status == 304 and cached and hop == 0:
+                with self._count_lock:
+                    self.not_modified += 1
+                instruments.cache('github_etag', True)
+                return Response(200, response.headers, cached['body'].encode('utf-8'))
+
+            if response.status in (301, 302, 303, 307, 308) and 'location' in response.headers:
+                url = urljoin(url, response.headers['location'])
+                if response.status == 303:
+                    method, payload = 'GET', None
+                continue
+
+            if response.status >= 400:
+                try:
+                    message = response.json().get('message', '')
+                except (ValueError, AttributeError):
+                    message = response.text()[:200]
+                raise GitHubAPIError(response.status, message, response.headers)
+
+            if method == 'GET' and hop == 0 and self.response_cache is not None:
+                instruments.cache('github_etag', False)
+                etag = response.headers.get('etag')
+                last_modified = response.headers.get('last-modified')
+                if etag or last_modified:
+                    self.response_cache.put(cache_key, etag, last_modified, response.body)
+            return response
+
+        raise GitHubAPIError(310, f'Too many redirects for {path}')
+
+    def graphql(self, query, variables=None):
+        """Run a GraphQL query and return its `data`"""
+        body = {'query': query, 'variables': variables or {}}
+        response = self.request('POST', '/graphql', body=body)
+        result = response.json() or {}
+        if result.get('errors'):
+            error = result['errors'][0]
+            message = error.get('message', 'GraphQL error')
+            if error.get('type') == 'RATE_LIMITED':
+                raise GitHubAPIError(403, message, {**response.headers, 'x-ratelimit-remaining': '0'})
+            raise GitHubAPIError(response.status, message, response.headers)
+        return result.get('data') or {}
+
+    def _repo(self, repo):
+        return f'/repos/{self.owner}/{repo}'
+
+    def default_branch(self, repo):
+        """Default branch of a repo (what `gh workflow run` dispatches against)"""
+        if repo not in self._default_branches:
+            data = self.request('GET', self._repo(repo)).json()
+            self._default_branches[repo] = data.get('default_branch', 'main')
+        return self._default_branches[repo]
+
+    def list_runs(self, repo, per_page=25, status=None, page=1):
+        """Most recent workflow runs for a repo, newest first"""
+        params = {'per_page': per_page}
+        if page > 1:
+            params['page'] = page
+        if status:
+            params['status'] = status
+        data = self.request('GET', f'{self._repo(repo)}/actions/runs', params=params).json()
+        return data.get('workflow_runs', [])
+
+    def list_jobs(self, repo, run_id):
+        """Jobs of a workflow run (latest attempt)"""
+        data = self.request('GET', f'{self._repo(repo)}/actions/runs/{run_id}/jobs', params={'per_page': 100}).json()
+        return data.get('jobs', [])
+
+    def dispatch_workflow(self, repo, workflow, inputs=None, ref=None):
+        """Trigger a workflow_dispatch run"""
+        body = {'ref': ref or self.default_branch(repo), 'inputs': inputs or {}}
+        self.request('POST', f'{self._repo(repo)}/actions/workflows/{workflow}/dispatches', body=body)
+
+    def cancel_run(self, repo, run_id):
+        """Cancel a queued or running workflow run"""
+        self.request('POST', f'{self._repo(repo)}/actions/runs/{run_id}/cancel')
+
+    def download_job_logs(self, repo, job_id):
+        """Plain-text log of a single job"""
+        return self.request('GET', f'{self._repo(repo)}/actions/jobs/{job_id}/logs').text()
+
+    def stream_job_logs(self, repo, job_id, chunk_size=LOG_CHUNK_SIZE):
+        """Plain-text log of a single job, yielded in chunks of text as it downloads.
+
+        Stopping early (closing the generator) drops the download; at most
+        one chunk is held in memory at a time.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for chunk in self._job_log_chunks(repo, job_id, chunk_size):
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        text = decoder.decode(b'', final=True)
+        if text:
+            yield text
+
+    def job_log_tail(self, repo, job_id, size):
+        """The last `size` bytes of a job's log as text (the first, probably partial, line dropped).
+
+        Asks the log storage for just that range; if it sends the whole log
+        anyway, only the tail is kept while it streams past.
+        """
+        tail = b''
+        for chunk in self._job_log_chunks(repo, job_id, LOG_CHUNK_SIZE, {'Range': f'bytes=-{size}'}):
+            tail = (tail + chunk)[-size:]
+        text = tail.decode('utf-8', errors='replace')
+        return text.split('\n', 1)[1] if '\n' in text else text
+
+    def _job_log_chunks(self, repo, job_id, chunk_size, extra_headers=None):
+        """A job's log as raw byte chunks, following the redirect to log storage"""
+        url = f'{self.base_url}{self._repo(repo)}/actions/jobs/{job_id}/logs'
+        api_host = urlsplit(self.base_url).netloc
+        with self._count_lock:
+            self.requests_made += 1
+
+        for hop in range(MAX_REDIRECTS + 1):
+            headers = {'Accept': 'application/vnd.github+json', 'User-Agent': 'BuildBot9000',
+                       'X-GitHub-Api-Version': '2022-11-28', **(extra_headers or {})}
+            # Only send credentials to the API host, never to the log storage it redirects to
+            if self.token and urlsplit(url).netloc == api_host:
+                headers['Authorization'] = f'Bearer {self.token}'
+            with self.transport.open('GET', url, headers=headers) as response:
+                if response.status in (301, 302, 303, 307, 308) and 'location' in response.headers:
+                    url = urljoin(url, response.headers['location'])
+                    continue
+                if response.status >= 400:
+                    body = response.read(64 * 1024)
+                    try:
+                        message = json.loads(body).get('message', '')
+                    except (ValueError, AttributeError):
+                        message = body.decode('utf-8', errors='replace')[:200]
+                    raise GitHubAPIError(response.status, message, response.headers)
+
+                yield from response.iter_chunks(chunk_size)
+                return
+
+        raise GitHubAPIError(310, f'Too many redirects for job {job_id} logs')
+
+    def download_run_logs(self, repo, run_id):
+        """Logs of every job in a run, concatenated (like `gh run view --log`)"""
+        archive = self.request('GET', f'{self._repo(repo)}/actions/runs/{run_id}/logs').body
+        with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+            names = sorted(n for n in zf.namelist() if n.endswith('.txt'))
+            # Top-level files hold each job's full log; per-step files under
+            # job directories duplicate them
+            job_logs = [n for n in names if '/' not in n] or names
+            return '\n'.join(zf.read(n).decode('utf-8', errors='replace') for n in job_logs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide client, created (and the token loaded) on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            cache = ResponseCache(RESPONSE_CACHE_FILE)
+            atexit.register(cache.save)
+            _client = GitHubClient(token=load_token(), response_cache=cache)
+        return _client
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Counters and timers for the dashboard server's hot paths.
+
+Handlers, GitHub API calls, subprocesses, runner scans and the caches in front
+of them record into one in-process registry (`instruments`), exported by the
+server at /api/internal/metrics as JSON or Prometheus text. Recording is a
+dict lookup and a few additions under a lock - cheap enough to leave on for
+every request. Timers are histograms over fixed buckets (seconds), so
+percentiles can be estimated without keeping samples.
+
+Label values must come from small fixed sets (route templates, not raw paths):
+every distinct combination is kept for the life of the process.
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PREFIX = 'buildbot_'
+
+ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+REPO_SEGMENT = re.compile(r'^/repos/[^/]+/[^/]+')
+
+
+def github_endpoint(path):
+    """A GitHub API path as a route template: /repos/:repo/actions/runs/:id/jobs"""
+    path = path.split('?', 1)[0]
+    if path.startswith('http'):
+        path = '/' + path.split('/', 3)[-1]
+    return ID_SEGMENT.sub('/:id', REPO_SEGMENT.sub('/repos/:repo', path))
+
+
+class Histogram:
+    """Count, sum, max and per-bucket counts of observed durations"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (None if empty or past the last bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': round(self.max, 6)
+        }
+
+
+class Instruments:
+    """Registry of labelled counters and timing histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # {(name, labels): value}
+        self._histograms = {}  # {(name, labels): Histogram}
+        self.started_at = time.time()
+
+    def count(self, name, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time a block into the named histogram (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def cache(self, name, hit):
+        """Count a lookup in one of the caches"""
+        self.count('cache_requests_total', cache=name, result='hit' if hit else 'miss')
+
+    def to_dict(self):
+        """{'uptime', 'counters': {name: [{'labels', 'value'}]}, 'timers': {name: [{'labels', ...summary}]}}"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = [(key, histogram.to_dict()) for key, histogram in sorted(self._histograms.items())]
+        result = {'uptime': round(time.time() - self.started_at, 1), 'counters': {}, 'timers': {}}
+        for (name, labels), value in counters:
+            result['counters'].setdefault(name, []).append({'labels': dict(labels), 'value': value})
+        for (name, labels), summary in histograms:
+            result['timers'].setdefault(name, []).append(dict(summary, labels=dict(labels)))
+        return result
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (0.0.4)"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = [(key, list(h.buckets), list(h.counts), h.count, h.sum)
+                          for key, h in sorted(self._histograms.items())]
+        lines = [f'# TYPE {PREFIX}uptime_seconds gauge', f'{PREFIX}uptime_seconds {time.time() - self.started_at:.1f}']
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {PREFIX}{name} counter')
+            lines.append(f'{PREFIX}{name}{format_labels(labels)} {value}')
+        for (name, labels), buckets, counts, count, total in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {PREFIX}{name} histogram')
+            cumulative = 0
+            for bound, n in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += n
+                lines.append(f'{PREFIX}{name}_bucket{format_labels(labels + (("le", str(bound)),))} {cumulative}')
+            lines.append(f'{PREFIX}{name}_sum{format_labels(labels)} {total:.6f}')
+            lines.append(f'{PREFIX}{name}_count{format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for k, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+instruments = Instruments()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Incremental readers for self-hosted runner diagnostic logs.
+
+A runner's `_diag/Worker_*.log` grows to many megabytes over a job. Rather than
+reading the whole file on every scan, WorkerLogTail remembers how far it has
+read each runner's current log (by inode and byte offset) and only looks at
+bytes appended since, scanning backwards in fixed-size blocks so memory use
+stays flat no matter how big the log gets.
+
+Each Worker log belongs to one job and opens with the job message the runner
+received, e.g.:
+
+    [2026-10-17 10:58:01Z INFO Worker] Job message:
+     {
+      ...
+      "jobDisplayName": "build-ios / build",
+      ...
+      "contextData": {
+        "github": {
+          "t": 2,
+          "d": [
+            {
+              "k": "repository",
+              "v": "LuckyJackpotCasino/roulette"
+            },
+            {
+              "k": "run_id",
+              "v": "11372054921"
+            },
+    ...
+
+parse_job_message() pulls the job name, repository and run out of that.
+"""
+
+import os
+import re
+import threading
+
+TAIL_BLOCK_SIZE = 64 * 1024  # Bytes read per seek when scanning a log backwards
+
+PROJECT_PATTERN = re.compile(
+    rb'LuckyJackpotCasino/([a-z0-9\-]+)(?:\s|/|$|\.git)', re.IGNORECASE | re.MULTILINE)
+PROJECT_MARKER = b'luckyjackpotcasino/'  # Cheap pre-check before running PROJECT_PATTERN on a block
+
+JOB_MESSAGE_LIMIT = 1024 * 1024  # The job message is at the start of the log; don't look past this
+JOB_NAME_PATTERN = re.compile(rb'"jobDisplayName":\s*"([^"]*)"')
+GITHUB_CONTEXT_PATTERN = re.compile(rb'"k":\s*"(repository|run_id|run_number|workflow)",\s*"v":\s*"([^"]*)"')
+
+
+def parse_job_message(data):
+    """Extract job metadata from the start of a Worker log.
+
+    Returns {'job', 'repository', 'run_id', 'run_number', 'workflow'}; fields
+    not found (yet) are None.
+    """
+    job = {'job': None, 'repository': None, 'run_id': None, 'run_number': None, 'workflow': None}
+    match = JOB_NAME_PATTERN.search(data)
+    if match:
+        job['job'] = match.group(1).decode('utf-8', 'ignore')
+    for match in GITHUB_CONTEXT_PATTERN.finditer(data):
+        key, value = match.group(1).decode(), match.group(2).decode('utf-8', 'ignore')
+        if job[key] is None:
+            job[key] = int(value) if key in ('run_id', 'run_number') and value.isdigit() else value
+    return job
+
+
+def last_project_in(data, app_names):
+    """The last known app mentioned in a chunk of log bytes, or None"""
+    if PROJECT_MARKER not in data.lower():
+        return None
+    for match in reversed(list(PROJECT_PATTERN.finditer(data))):
+        candidate = match.group(1).decode('utf-8', 'ignore')
+        if candidate in app_names:
+            return candidate
+    return None
+
+
+def find_last_project(f, start, end, app_names):
+    """Scan bytes [start, end) of an open log backwards for the last LuckyJackpotCasino/<app> mention.
+
+    Reads TAIL_BLOCK_SIZE bytes at a time from the end, so the newest mention is
+    usually found in the first block. Returns the app name, or None.
+    """
+    pos = end
+    carry = b''  # Start of a line whose beginning is in an earlier block
+    while pos > start:
+        read_from = max(start, pos - TAIL_BLOCK_SIZE)
+        f.seek(read_from)
+        block = f.read(pos - read_from) + carry
+        pos = read_from
+        carry = b''
+
+        if pos > start:
+            # The first line may begin in the previous block - finish it on the next read
+            cut = block.find(b'\n')
+            if cut != -1:
+                carry, block = block[:cut], block[cut:]
+            elif len(block) <= TAIL_BLOCK_SIZE * 4:
+                carry, block = block, b''
+
+        found = last_project_in(block, app_names)
+        if found:
+            return found
+
+    return last_project_in(carry, app_names)
+
+
+def complete_lines_end(f, start, end):
+    """Offset just past the last newline in [start, end), so a half-written line is re-read next time"""
+    read_from = max(start, end - TAIL_BLOCK_SIZE)
+    f.seek(read_from)
+    newline = f.read(end - read_from).rfind(b'\n')
+    if newline != -1:
+        return read_from + newline + 1
+    # No newline in the last block: a huge single line, or nothing complete yet
+    return end if read_from > start else start
+
+
+class WorkerLogTail:
+    """Remembers what each runner's current Worker log says about its job.
+
+    Tracks one log per runner: its path, inode and how many bytes have been
+    scanned. A scan only reads what was appended since the previous one; a new
+    log file (different path or inode) or a truncated one is scanned afresh.
+    The job message at the head of the log is parsed once, when it appears.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._logs = {}  # {runner: {'path', 'inode', 'offset', 'project', 'job'}}
+
+    def read(self, runner, log_path, app_names):
+        """Scan the runner's Worker log at log_path for anything new.
+
+        Returns {'project': app or None, 'job': parse_job_message() result or None}.
+        The project is the repository from the job message if it's a known app,
+        else the last app the log mentioned.
+        """
+        with self._lock:
+            stat = os.stat(log_path)
+            entry = self._logs.get(runner)
+            if (entry is None or entry['path'] != log_path or entry['inode'] != stat.st_ino
+                    or stat.st_size < entry['offset']):
+                entry = {'path': log_path, 'inode': stat.st_ino, 'offset': 0, 'project': None, 'job': None}
+                self._logs[runner] = entry
+
+            if stat.st_size > entry['offset']:
+                with open(log_path, 'rb') as f:
+                    end = complete_lines_end(f, entry['offset'], stat.st_size)
+                    if end > entry['offset']:
+                        job = entry['job']
+                        if (job is None or job['job'] is None or job['run_id'] is None) and entry['offset'] < JOB_MESSAGE_LIMIT:
+                            # Job message still (partly) missing - it may have just been written
+                            f.seek(0)
+                            entry['job'] = parse_job_message(f.read(min(end, JOB_MESSAGE_LIMIT)))
+                        found = find_last_project(f, entry['offset'], end, app_names)
+                        if found:
+                            entry['project'] = found
+                        entry['offset'] = end
+
+            job = entry['job']
+            repository = ((job or {}).get('repository') or '').split('/')[-1]
+            return {
+                'project': repository if repository in app_names else entry['project'],
+                'job': dict(job) if job else None
+            }
+
+    def project(self, runner, log_path, app_names):
+        """Return the app the runner's Worker log at log_path is building, or None"""
+        return self.read(runner, log_path, app_names)['project']
+
+    def forget(self, runner):
+        """Drop a runner's tail state (e.g. the runner was removed)"""
+        with self._lock:
+            self._logs.pop(runner, None)
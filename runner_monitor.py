@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Event-driven monitor for the self-hosted GitHub Actions runners on this machine.
+
+Keeps an in-memory table of every `mac-studio-runner*` directory under
+ACTIONS_RUNNERS_DIR, so reading runner status costs nothing. On Linux, changes
+to a runner's `_diag` directory (a new or growing Worker_*.log) arrive through
+inotify the moment they happen; elsewhere (macOS) the monitor polls directory
+and log mtimes, which only costs a few stat() calls per runner per tick.
+`svc.sh status` runs on a slow timer instead of on every read.
+
+Point ACTIONS_RUNNERS_DIR at a fake tree (runner dirs with a stub svc.sh,
+`_work/` and `_diag/Worker_*.log`) to exercise it without real runners.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+from types import MappingProxyType
+
+from instrumentation import instruments
+from runner_logs import WorkerLogTail
+
+RUNNERS_DIR = os.environ.get('ACTIONS_RUNNERS_DIR', os.path.expanduser('~/actions-runners'))
+RUNNER_PREFIX = 'mac-studio-runner'
+RUNNER_LABELS = ['macos', 'self-hosted', 'mac-studio-runner']
+
+BUSY_WINDOW = 120  # A Worker log written within this many seconds means a job is running
+POLL_INTERVAL = 2  # Seconds between checks (stat polling, busy -> idle timeouts)
+DEBOUNCE = 0.5  # Coalesce a burst of log writes into one rescan
+SERVICE_CHECK_INTERVAL = 60  # Seconds between `svc.sh status` checks (and full rescans)
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+DIR_EVENTS = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF
+LOG_EVENTS = DIR_EVENTS | IN_MODIFY | IN_CLOSE_WRITE
+EVENT_HEADER = struct.Struct('iIII')  # struct inotify_event: wd, mask, cookie, len
+
+log = logging.getLogger('dashboard.runners')
+
+
+class Inotify:
+    """Minimal ctypes binding for Linux inotify (raises OSError/AttributeError elsewhere)"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.paths = {}  # {watch descriptor: directory}
+
+    def watch(self, path, mask):
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {path}')
+        self.paths[wd] = path
+
+    def read(self, timeout):
+        """Wait up to timeout seconds and return [(directory, mask, name)]"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        pos = 0
+        while pos + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, pos)
+            pos += EVENT_HEADER.size
+            name = data[pos:pos + length].rstrip(b'\0').decode('utf-8', 'ignore')
+            pos += length
+            path = self.paths.get(wd)
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)  # Directory was removed
+            events.append((path, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def service_running(runner_dir):
+    """Ask the runner's svc.sh whether its service is up (None if that fails)"""
+    try:
+        with instruments.timer('subprocess_seconds', command='svc.sh status'):
+            result = subprocess.run(['./svc.sh', 'status'], cwd=runner_dir, capture_output=True, text=True, timeout=5)
+        output = (result.stdout + result.stderr).lower()
+        return 'started:' in output or 'running' in output
+    except Exception as e:
+        log.warning("[RUNNERS] Error checking %s: %s", os.path.basename(runner_dir), e)
+        return None
+
+
+def newest_worker_log(diag_dir):
+    """Path of the most recently modified Worker_*.log in a _diag directory, or None"""
+    try:
+        logs = [os.path.join(diag_dir, f) for f in os.listdir(diag_dir) if f.startswith('Worker_')]
+        return max(logs, key=os.path.getmtime) if logs else None
+    except OSError:
+        return None
+
+
+def newest_work_repo(work_dir):
+    """Most recently modified repo checkout under _work (fallback when the log names no project)"""
+    try:
+        repos = [d for d in os.listdir(work_dir) if not d.startswith('_') and os.path.isdir(os.path.join(work_dir, d))]
+        return max(repos, key=lambda d: os.path.getmtime(os.path.join(work_dir, d))) if repos else None
+    except OSError:
+        return None
+
+
+class RunnerSnapshot:
+    """Read-only runner table at one moment, shared by every reader.
+
+    Built once per monitor update; `by_project` indexes busy runners by the
+    app they're building, so "is this app building locally?" is a dict lookup.
+    """
+
+    def __init__(self, runners=(), error=None):
+        self.taken_at = time.time()
+        self.error = error
+        self.runners = tuple(MappingProxyType(dict(runner)) for runner in runners)
+        self.by_project = MappingProxyType({
+            runner['project']: runner for runner in self.runners if runner['busy'] and runner['project']
+        })
+        self.total = len(self.runners)
+        self.online = len([r for r in self.runners if r['status'] == 'online'])
+        self.busy = len([r for r in self.runners if r['busy']])
+        self.idle = self.online - self.busy
+
+    def runner_for(self, app):
+        """The runner currently building app, or None"""
+        return self.by_project.get(app)
+
+    def summary(self):
+        """The counts shown in the dashboard's runner stat cards"""
+        return {'total': self.total, 'online': self.online, 'busy': self.busy, 'idle': self.idle}
+
+    def to_dict(self):
+        """Plain-dict copy in the /api/runners shape"""
+        data = {**self.summary(), 'runners': [dict(runner) for runner in self.runners]}
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+class RunnerMonitor:
+    """In-memory runner table kept current by a background thread.
+
+    Readers get an immutable RunnerSnapshot, rebuilt only when something
+    changed. on_change(changed, removed) is called with the runner records that
+    changed and the names of runners that disappeared; on_job_complete(runner,
+    project) when a busy runner goes idle. Both run on the monitor thread.
+    """
+
+    def __init__(self, app_names, base_dir=RUNNERS_DIR, on_change=None, on_job_complete=None, use_inotify=True):
+        self.app_names = list(app_names)
+        self.base_dir = base_dir
+        self.on_change = on_change
+        self.on_job_complete = on_job_complete
+        self.use_inotify = use_inotify
+        self.mode = None  # 'inotify' or 'polling' once running
+        self.scanned = threading.Event()  # Set after the first full scan
+        self._lock = threading.Lock()
+        self._runners = {}  # {name: runner record, as served by /api/runners}
+        self._snapshot = RunnerSnapshot()
+        self._files = {}  # {name: {'diag_mtime', 'log_path', 'online', 'service_checked'}}
+        self._tail = WorkerLogTail()
+        self._inotify = None
+
+    def start(self):
+        threading.Thread(target=self.run, name='runner-monitor', daemon=True).start()
+        return self
+
+    def snapshot(self):
+        """The current RunnerSnapshot (never blocks on the filesystem)"""
+        return self._snapshot
+
+    def run(self):
+        if self.use_inotify:
+            try:
+                self._inotify = Inotify()
+            except (OSError, AttributeError) as e:
+                log.warning("[RUNNERS] inotify unavailable (%s) - polling every %ss", e, POLL_INTERVAL)
+        self.mode = 'inotify' if self._inotify else 'polling'
+        log.info("[RUNNERS] Watching %s (%s)", self.base_dir, self.mode)
+
+        self.rescan(discover=True, check_service=True)
+        self.scanned.set()
+        last_service_check = time.time()
+
+        while True:
+            try:
+                check_service = time.time() - last_service_check >= SERVICE_CHECK_INTERVAL
+                discover = check_service
+                dirty = set()
+                if self._inotify:
+                    events = self._inotify.read(POLL_INTERVAL)
+                    if events:
+                        time.sleep(DEBOUNCE)
+                        events += self._inotify.read(0)
+                    for path, mask, name in events:
+                        if mask & IN_Q_OVERFLOW or path == self.base_dir:
+                            discover = True  # Lost events, or a runner was added/removed
+                        elif path:
+                            dirty.add(os.path.relpath(path, self.base_dir).split(os.sep)[0])
+                else:
+                    # Polling: listing the base dir and stat()ing each runner is cheap;
+                    # _diag is only re-listed when its mtime changed
+                    time.sleep(POLL_INTERVAL)
+                    discover = True
+
+                # Busy runners must be rechecked to notice when their log goes quiet
+                with self._lock:
+                    dirty |= {name for name, runner in self._runners.items() if runner['busy']}
+
+                if discover or dirty:
+                    self.rescan(dirty, discover=discover, check_service=check_service)
+                if check_service:
+                    last_service_check = time.time()
+            except Exception as e:
+                log.error("[RUNNERS] Monitor error: %s", e)
+                time.sleep(POLL_INTERVAL)
+
+    def rescan(self, names=(), discover=False, check_service=False):
+        """Re-read the given runners (or, with discover, every runner found on disk) and publish changes"""
+        with instruments.timer('runner_scan_seconds', kind='full' if discover else 'changed'):
+            self._rescan(names, discover, check_service)
+
+    def _rescan(self, names, discover, check_service):
+        now = time.time()
+        removed = []
+        if discover:
+            names = self._discover()
+            removed = [name for name in self._files if name not in names]
+            for name in removed:
+                del self._files[name]
+                self._tail.forget(name)
+        names = [name for name in names if name in self._files]
+
+        records = {name: self._scan_runner(name, now, check_service) for name in names}
+        self._apply(records, removed)
+
+    def _discover(self):
+        """Find runner directories, and start tracking (and watching) new ones"""
+        try:
+            names = [item for item in os.listdir(self.base_dir)
+                     if item.startswith(RUNNER_PREFIX) and os.path.isdir(os.path.join(self.base_dir, item))]
+        except OSError:
+            return []
+
+        if self._inotify and self.base_dir not in self._inotify.paths.values():
+            self._watch(self.base_dir, DIR_EVENTS)
+        for name in names:
+            if name not in self._files:
+                self._files[name] = {'diag_mtime': None, 'log_path': None, 'online': None, 'service_checked': 0}
+            if self._inotify:
+                # Re-adding an existing watch is a no-op; this also picks up a _diag created later
+                runner_dir = os.path.join(self.base_dir, name)
+                self._watch(runner_dir, DIR_EVENTS)
+                if os.path.isdir(os.path.join(runner_dir, '_diag')):
+                    self._watch(os.path.join(runner_dir, '_diag'), LOG_EVENTS)
+        return names
+
+    def _watch(self, path, mask):
+        try:
+            self._inotify.watch(path, mask)
+        except OSError as e:
+            log.warning("[RUNNERS] Can't watch %s: %s", path, e)
+
+    def _scan_runner(self, name, now, check_service):
+        """Build a runner's current record from its service status and Worker log"""
+        runner_dir = os.path.join(self.base_dir, name)
+        files = self._files[name]
+
+        if check_service or now - files['service_checked'] >= SERVICE_CHECK_INTERVAL:
+            files['online'] = service_running(runner_dir)
+            files['service_checked'] = now
+
+        # Only re-list _diag when an entry was created or removed (a new job's log)
+        diag_dir = os.path.join(runner_dir, '_diag')
+        try:
+            diag_mtime = os.stat(diag_dir).st_mtime_ns
+        except OSError:
+            diag_mtime = None
+        if diag_mtime != files['diag_mtime'] or files['log_path'] is None:
+            files['diag_mtime'] = diag_mtime
+            files['log_path'] = newest_worker_log(diag_dir) if diag_mtime else None
+            if self._inotify and diag_mtime:
+                self._watch(diag_dir, LOG_EVENTS)
+
+        is_busy = False
+        project_name = None
+        job = None
+        work_dir = os.path.join(runner_dir, '_work')
+        if files['log_path'] and os.path.isdir(work_dir):
+            try:
+                if now - os.path.getmtime(files['log_path']) < BUSY_WINDOW:
+                    is_busy = True
+                    parsed = self._tail.read(name, files['log_path'], self.app_names)
+                    project_name, job = parsed['project'], parsed['job'] or {}
+            except OSError:
+                files['log_path'] = None  # Log rotated away; re-list next time
+            if is_busy and not project_name:
+                project_name = newest_work_repo(work_dir)
+
+        online = files['online']
+        return {
+            'id': hash(name),
+            'name': name,
+            'status': 'unknown' if online is None else ('online' if online else 'offline'),
+            'busy': is_busy,
+            'project': project_name,
+            'job': job.get('job') if job else None,  # e.g. 'build-ios / build'
+            'runId': job.get('run_id') if job else None,
+            'runNumber': job.get('run_number') if job else None,
+            'labels': RUNNER_LABELS
+        }
+
+    def _apply(self, records, removed):
+        """Store new records; report what changed and which jobs just finished"""
+        completed = []
+        error = None if os.path.isdir(self.base_dir) else 'Runners directory not found'
+        with self._lock:
+            changed = [record for name, record in records.items() if self._runners.get(name) != record]
+            for record in changed:
+                previous = self._runners.get(record['name'], {})
+                if previous.get('busy') and not record['busy'] and previous.get('project'):
+                    completed.append((record['name'], previous['project']))
+                self._runners[record['name']] = record
+            for name in removed:
+                self._runners.pop(name, None)
+            if changed or removed or error != self._snapshot.error or not self.scanned.is_set():
+                # Swap in a new snapshot; readers holding the old one keep a consistent view
+                self._snapshot = RunnerSnapshot([self._runners[name] for name in sorted(self._runners)], error)
+
+        for runner, project in completed:
+            log.info("🎯 [JOB COMPLETE] %s just finished building %s!", runner, project)
+            if self.on_job_complete:
+                self.on_job_complete(runner, project)
+        if (changed or removed) and self.on_change:
+            self.on_change(changed, removed)
+
+
+if __name__ == '__main__':
+    # Watch a runners directory and print changes: python3 runner_monitor.py [dir]
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+    monitor = RunnerMonitor(
+        app_names=sys.argv[2].split(',') if len(sys.argv) > 2 else [],
+        base_dir=sys.argv[1] if len(sys.argv) > 1 else RUNNERS_DIR,
+        on_change=lambda changed, removed: print(json.dumps({'changed': changed, 'removed': removed}), flush=True)
+    ).start()
+    monitor.scanned.wait()
+    print(json.dumps(monitor.snapshot().to_dict(), indent=2), flush=True)
+    while True:
+        time.sleep(3600)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Simulation: makespan of a full-fleet rebuild (/trigger-bulk/all).
+
+Replays the rebuild on simulated self-hosted runners (MAC_RUNNERS Mac Studio
+runners, one Windows builder) and a simulated GitHub job queue, in simulated
+time, three ways:
+
+  - blind: the previous /trigger-bulk handler - every app's 'all' run
+    dispatched a second apart, GitHub hands the 48 jobs to whichever runner
+    frees up next
+  - scheduler: build_scheduler.BuildScheduler (the real class, on a simulated
+    clock) admitting one run per app as Mac slots free up, longest first
+  - scheduler + affinity: the same with RUNNER_AFFINITY, each run targeted at
+    the runner that last built the app
+
+A Mac build that lands on a runner other than the one that last built the
+app/platform pays a Unity Library reimport (REIMPORT seconds). Reports the
+makespan, the workflow runs dispatched and the reimports for each.
+
+Expect the scheduler alone to land within a few percent of blind dispatch
+either way (with 12 apps on 3 runners, -1.4%): the runners stay busy in both,
+and neither avoids reimports. The makespan gain is affinity's (-7.9%).
+
+Usage: python3 scripts/bench-bulk-schedule.py [apps] [mac_runners]   (defaults 12, 3)
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import build_scheduler  # noqa: E402
+from build_scheduler import BULK_PLATFORMS, DEFAULT_BUILD_ESTIMATES, PLATFORM_POOLS, SCHEDULER_TICK  # noqa: E402
+from runner_monitor import RunnerSnapshot  # noqa: E402
+
+REIMPORT = 900  # Seconds a Mac build spends reimporting Library/ on a runner that didn't build it last
+BLIND_DISPATCH_GAP = 1  # Seconds the old handler slept between apps
+
+
+class Fleet:
+    """Runners, GitHub's job queue and the apps' build state, on a simulated clock"""
+
+    def __init__(self, apps, mac_runners):
+        rng = random.Random(15)
+        self.now = 0.0
+        self.apps = apps
+        self.durations = {(app, p): DEFAULT_BUILD_ESTIMATES[p] * rng.uniform(0.7, 1.3)
+                          for app in apps for p in DEFAULT_BUILD_ESTIMATES}
+        self.mac = [f'mac-studio-runner-{i + 1}' for i in range(mac_runners)]
+        self.last_runner = {(app, p): self.mac[i % mac_runners]
+                            for i, app in enumerate(apps) for p in PLATFORM_POOLS if PLATFORM_POOLS[p] == 'mac'}
+        self.queue = []  # Jobs waiting for a runner, in dispatch order
+        self.running = {}  # {runner: job}
+        self.state = {}  # {(app, platform): 'queued' | 'in_progress' | 'completed'}
+        self.runs = 0
+        self.reimports = 0
+        self.started = []  # Runner records of jobs started since the last call, for RunnerAffinity.observe
+
+    def dispatch(self, app, platforms, runner_label=None):
+        self.runs += 1
+        for platform in platforms.split(','):
+            # The workflows pass runner_label to the Mac builds only
+            label = runner_label if PLATFORM_POOLS[platform] == 'mac' else None
+            self.queue.append({'app': app, 'platform': platform, 'label': label})
+            self.state[(app, platform)] = 'queued'
+        return {'success': True, 'runnerLabel': runner_label}
+
+    def status(self, app):
+        return {platform: state for (a, platform), state in self.state.items() if a == app}
+
+    def snapshot(self):
+        return RunnerSnapshot([{
+            'name': name, 'status': 'online', 'busy': name in self.running,
+            'project': self.running[name]['app'] if name in self.running else None,
+            'job': f"build-{self.running[name]['platform']} / build" if name in self.running else None
+        } for name in self.mac])
+
+    def start_jobs(self):
+        """Idle runners take the first queued job they may run"""
+        for runner in self.mac + ['windows-builder']:
+            if runner in self.running:
+                continue
+            pool = 'windows' if runner == 'windows-builder' else 'mac'
+            job = next((j for j in self.queue if PLATFORM_POOLS[j['platform']] == pool
+                        and j['label'] in (None, runner)), None)
+            if job is None:
+                continue
+            self.queue.remove(job)
+            key = (job['app'], job['platform'])
+            job['end'] = self.now + self.durations[key]
+            if pool == 'mac':
+                if self.last_runner[key] != runner:
+                    job['end'] += REIMPORT
+                    self.reimports += 1
+                self.last_runner[key] = runner
+                self.started.append({'name': runner, 'busy': True, 'project': job['app'],
+                                     'job': f"build-{job['platform']} / build", 'runId': id(job)})
+            self.running[runner] = job
+            self.state[key] = 'in_progress'
+
+    def advance(self, until=None):
+        """Move the clock to the next job completion (or until, if sooner) and finish what ended"""
+        ends = [job['end'] for job in self.running.values()]
+        if until is not None:
+            ends.append(until)
+        self.now = min(ends)
+        for runner, job in list(self.running.items()):
+            if job['end'] <= self.now:
+                del self.running[runner]
+                self.state[(job['app'], job['platform'])] = 'completed'
+
+    def done(self):
+        return not self.queue and not self.running
+
+
+def blind(apps, mac_runners):
+    fleet = Fleet(apps, mac_runners)
+    for i, app in enumerate(apps):
+        fleet.now = i * BLIND_DISPATCH_GAP
+        fleet.dispatch(app, ','.join(BULK_PLATFORMS['all']))
+        fleet.start_jobs()
+    while not fleet.done():
+        fleet.advance()
+        fleet.start_jobs()
+    return fleet
+
+
+def scheduled(apps, mac_runners, affinity):
+    fleet = Fleet(apps, mac_runners)
+    build_scheduler.time = SimpleNamespace(time=lambda: fleet.now)
+    build_scheduler.RUNNER_AFFINITY = affinity
+    scheduler = build_scheduler.BuildScheduler(
+        apps, dispatch=fleet.dispatch, runners=fleet.snapshot, status=fleet.status,
+        estimate=lambda app, platform: fleet.durations[(app, platform)])
+    scheduler.affinity.seed(dict(fleet.last_runner))
+    scheduler.submit(apps, 'all')
+    while True:
+        scheduler.schedule()
+        fleet.start_jobs()
+        scheduler.affinity.observe(fleet.started)
+        fleet.started = []
+        waiting = bool(scheduler.to_dict(batches=False)['queued'])
+        if fleet.done() and not waiting:
+            return fleet
+        # Wake on the next job completion, or the scheduler's tick while builds wait for a runner
+        fleet.advance(fleet.now + SCHEDULER_TICK if waiting else None)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    mac_runners = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    apps = [f'app{i + 1:02d}' for i in range(count)]
+    print(f"Full-fleet rebuild: {count} apps x {len(BULK_PLATFORMS['all'])} platforms, "
+          f"{mac_runners} Mac runners + 1 Windows builder, {REIMPORT}s Library reimport\n")
+    print(f"{'':<24} {'makespan':>10} {'runs':>6} {'reimports':>10}")
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        results.append(('blind dispatch', blind(apps, mac_runners)))
+        results.append(('scheduler', scheduled(apps, mac_runners, affinity=False)))
+        results.append(('scheduler + affinity', scheduled(apps, mac_runners, affinity=True)))
+    for name, fleet in results:
+        print(f"{name:<24} {fleet.now / 3600:9.2f}h {fleet.runs:6d} {fleet.reimports:10d}")
+    durations = results[0][1].durations
+    work = {pool: sum(d for (_, p), d in durations.items() if PLATFORM_POOLS[p] == pool) for pool in ('mac', 'windows')}
+    print(f"{'lower bound':<24} {max(work['mac'] / mac_runners, work['windows']) / 3600:9.2f}h"
+          f"   (all builds warm, runners never idle)")
+    base = results[0][1].now
+    print()
+    for name, fleet in results[1:]:
+        print(f"{name}: makespan {100 * (fleet.now - base) / base:+.1f}% vs blind dispatch")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Benchmark: recognizing a build failure in a large job log.
+
+Compares, on synthetic Unity job logs:
+
+  - the original analyzer checks (13 methods, each lower-casing the whole log
+    again and running its own substring searches until one matches)
+  - each phrase in failure_signatures searched for on its own with str.find,
+    chunk by chunk (the scanner's first version), and one alternation regex
+    over all the phrases
+  - failure_signatures.SignatureScanner fed in 64 KB chunks, as the agent
+    streams a log - reading it all, and stopping at the first decisive
+    signature
+
+for a log with no known failure (every original check runs), failures low and
+mid-way in the priority order near the end of the log, and a decisive failure
+half-way through. Then checks on small logs, one per failure, that the scanner
+picks the same fix the original checks did (priority order preserved), and
+that a decisive signature other than the first rule ends the read early.
+
+Usage: python3 scripts/bench-failure-signatures.py [size_mb]   (default 50)
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from failure_signatures import FAILURE_RULES, SignatureScanner, rule_phrases  # noqa: E402
+
+FILLER = [
+    '2026-10-17T11:02:13.1234567Z [Unity] Compiling shader variants for Standard (pass ForwardBase) ... done\n',
+    '2026-10-17T11:02:13.2234567Z Refreshing native plugins compatible for Editor in 0.84 ms, found 3 plugins.\n',
+    '2026-10-17T11:02:13.3234567Z [Xcode] CompileC Unity-iPhone.build/Objects-normal/arm64/UnityAppController.o\n',
+]
+
+# (sample failure lines, fix the original checks chose)
+SAMPLES = [
+    ("[!] Found multiple specs: duplicate sources for 'Firebase'\n", 'cocoapods_duplicate_repos'),
+    ("xcrun: error: tool 'xcodebuild' requires Xcode, but active developer directory "
+     "'/Library/Developer/CommandLineTools' is a command line tools instance\n", 'xcode_command_line_tools'),
+    ("[!] No provisioning profile found after match for com.luckyjackpot.roulette\n", 'provisioning_profile_not_found'),
+    ("security: SecKeychainUnlock ci-signing.keychain: User interaction is not allowed (locked)\n", 'keychain_timeout'),
+    ("/bin/sh: line 1: 4242 Terminated: 15 Unity -batchmode\n", 'unity_terminated'),
+    ("Running pod install...\nerror: Failed to connect to cdn.cocoapods.org port 443\n", 'pod_install_failure'),
+    ("git@github.com: Permission denied (publickey).\n", 'git_authentication'),
+    ("error: No signing certificate \"iOS Distribution\" found: no local code signing identities\n", 'certificate_not_found'),
+    ("curl: (6) Could not resolve host: api.revenuecat.com\n", 'transient_network_error'),
+    ("No Unity installation found for version 2022.3.40f1\n", 'windows_unity_not_found'),
+    ("IL2CPP error for method 'System.Void Game::Start()'\n", 'windows_il2cpp_failure'),
+    ("Visual Studio installation not found (C++ workload)\n", 'windows_visual_studio_missing'),
+    ("IOException: There is not enough space on the disk.\n", 'windows_disk_space'),
+    ("Assets/Scripts/Game.cs(12,7): error CS0246: The type or namespace 'Foo' could not be found\n", None),
+]
+
+# Logs differing from a sample only in case: the original checks that compared
+# against the log as is don't fire (and the next rule in line decides)
+CASE_SAMPLES = [
+    ("xcrun: error: tool 'xcodebuild' REQUIRES XCODE, but active developer directory "
+     "'/Library/Developer/commandlinetools' is a command line tools instance\n", None),
+    ("[!] no provisioning profile found after match for com.luckyjackpot.roulette\n", None),
+    ("/bin/sh: line 1: 4242 terminated: 15 Unity -batchmode\n", None),
+    ("Running pod install...\nerror: Failed to connect to CDN.CocoaPods.org port 443\n", None),
+    ("git@github.com: permission denied (publickey).\n", None),
+    ("fatal: authentication failed for 'https://github.com/LuckyJackpotCasino/roulette.git/'\n", None),
+]
+
+
+def original_checks(logs):
+    """The detection part of the original _fix_* methods, in their order"""
+    if 'duplicate sources' in logs.lower() or 'cocoapods/repos/cocoapods' in logs.lower():
+        return 'cocoapods_duplicate_repos'
+    if 'requires Xcode, but active developer directory' in logs and 'CommandLineTools' in logs:
+        return 'xcode_command_line_tools'
+    if 'No provisioning profile found after match' in logs:
+        return 'provisioning_profile_not_found'
+    if 'keychain' in logs.lower() and ('locked' in logs.lower() or 'timeout' in logs.lower()):
+        return 'keychain_timeout'
+    if 'Terminated: 15' in logs or 'exit code 143' in logs:
+        return 'unity_terminated'
+    if 'pod install' in logs.lower() and ('error' in logs.lower() or 'failed' in logs.lower()):
+        if 'cdn.cocoapods.org' in logs:
+            return 'pod_install_failure'
+    if 'Permission denied (publickey)' in logs or 'Authentication failed' in logs:
+        return 'git_authentication'
+    if 'no local code signing identities' in logs.lower() or 'certificate' in logs.lower() and 'not found' in logs.lower():
+        return 'certificate_not_found'
+    for error in ['connection refused', 'connection timeout', 'network is unreachable',
+                  'temporary failure in name resolution', 'could not resolve host']:
+        if error in logs.lower():
+            return 'transient_network_error'
+    if 'no unity installation found' in logs.lower() or 'unity.exe' in logs.lower() and 'not found' in logs.lower():
+        return 'windows_unity_not_found'
+    for error in ['il2cpp error', 'il2cpp.exe did not run properly', 'buildFailedException: il2cpp',
+                  'c++ compiler not found', 'msvc']:
+        if error in logs.lower():
+            return 'windows_il2cpp_failure'
+    if 'visual studio' in logs.lower() and ('not found' in logs.lower() or 'not installed' in logs.lower()):
+        return 'windows_visual_studio_missing'
+    if 'not enough space' in logs.lower() or 'disk full' in logs.lower() or 'no space left' in logs.lower():
+        return 'windows_disk_space'
+    return None
+
+
+def one_alternation(logs, chunk_size=64 * 1024):
+    """Phrases found by a single regex alternating over every phrase, per chunk"""
+    phrases = sorted({phrase.lower() for phrase, _ in rule_phrases(FAILURE_RULES)}, key=len, reverse=True)
+    pattern = re.compile('|'.join(re.escape(phrase) for phrase in phrases))
+    return {match.group() for i in range(0, len(logs), chunk_size)
+            for match in pattern.finditer(logs[i:i + chunk_size].lower())}
+
+
+def phrase_finds(logs, chunk_size=64 * 1024):
+    """Phrases found by one str.find per phrase not found yet, per chunk"""
+    pending = rule_phrases(FAILURE_RULES)
+    found = set()
+    for i in range(0, len(logs), chunk_size):
+        chunk = logs[i:i + chunk_size]
+        lowered = chunk.lower()
+        found |= {key for key in pending if (chunk if key[1] else lowered).find(key[0]) >= 0}
+        pending -= found
+    return found
+
+
+def scan(logs, chunk_size=64 * 1024, stop_early=False):
+    """Fix chosen by SignatureScanner fed the log in chunks"""
+    return scanned(logs, chunk_size, stop_early)[0]
+
+
+def scanned(logs, chunk_size=64 * 1024, stop_early=False):
+    """(fix chosen, characters read) by SignatureScanner fed the log in chunks"""
+    scanner = SignatureScanner()
+    for i in range(0, len(logs), chunk_size):
+        if scanner.feed(logs[i:i + chunk_size]) and stop_early:
+            break
+    else:
+        scanner.finish()
+    matches = scanner.matches()
+    return (matches[0]['fix'] if matches else None), scanner.chars
+
+
+def rank(rule_name):
+    return next(i for i, rule in enumerate(FAILURE_RULES) if rule['rule'] == rule_name)
+
+
+def synthetic_log(size_mb, failure):
+    filler = ''.join(FILLER) * 2000
+    repeats = max(1, size_mb * 1024 * 1024 // len(filler))
+    return filler * repeats + failure + ''.join(FILLER) * 50
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    filler = synthetic_log(size_mb // 2 or 1, '')
+    scenarios = [
+        ('no known failure', synthetic_log(size_mb, SAMPLES[-1][0])),
+        ('disk space, at the end', synthetic_log(size_mb, SAMPLES[12][0])),
+        ('CocoaPods CDN, at the end', synthetic_log(size_mb, SAMPLES[5][0])),
+        ('provisioning, half-way', filler + SAMPLES[2][0] + filler),
+    ]
+    print(f"{size_mb} MB logs, seconds:\n")
+    print(f"{'':<27} {'original':>9} {'scanner':>9} {'early stop':>11}   fix chosen")
+    for name, logs in scenarios:
+        times = []
+        fixes = set()
+        for fn, kwargs in [(original_checks, {}), (scan, {}), (scan, {'stop_early': True})]:
+            elapsed, fix = timed(fn, logs, **kwargs)
+            times.append(elapsed)
+            fixes.add(fix)
+        chosen = fixes.pop() if len(fixes) == 1 else f"MISMATCH {fixes}"
+        print(f"{name:<27} {times[0]:9.2f} {times[1]:9.2f} {times[2]:11.2f}   {chosen or '-'}")
+
+    print()
+    for name, logs in scenarios[:3]:
+        elapsed, phrases = timed(phrase_finds, logs)
+        print(f"one str.find per phrase, {name}: {elapsed:.2f}s ({len(phrases)} phrases found)")
+    elapsed, phrases = timed(one_alternation, scenarios[0][1])
+    print(f"one alternation regex, {scenarios[0][0]}: {elapsed:.2f}s ({len(phrases)} phrases found)")
+
+    print()
+    failures = 0
+    for text, expected in SAMPLES:
+        logs = synthetic_log(1, text)
+        got = (original_checks(logs), scan(logs))
+        ok = got == (expected, expected)
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {expected or 'no known failure'}" + ('' if ok else f"  original={got[0]} scanner={got[1]}"))
+
+    for text, expected in CASE_SAMPLES:
+        logs = synthetic_log(1, text)
+        got = (original_checks(logs), scan(logs))
+        ok = got == (expected, expected)
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} case differs: {text.strip().splitlines()[-1][:50]}... -> {expected or 'no known failure'}"
+              + ('' if ok else f"  original={got[0]} scanner={got[1]}"))
+
+    # Two failures in one log: priority order decides, not position
+    logs = synthetic_log(1, SAMPLES[8][0] + SAMPLES[3][0])
+    ok = original_checks(logs) == scan(logs) == 'keychain_timeout'
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} keychain outranks the network error printed before it")
+
+    # Decisive signatures outrank the rest (the original checks ranked keychain first here),
+    # whether or not the read stops at them
+    logs = synthetic_log(1, SAMPLES[7][0] + ''.join(FILLER) * 500 + SAMPLES[3][0])
+    got = (scan(logs), scan(logs, stop_early=True))
+    ok = got == ('certificate_not_found', 'certificate_not_found')
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} a decisive signing-identity error outranks a keychain error printed after it"
+          + ('' if ok else f"  scanner={got}"))
+
+    # The first decisive signature in the log ends the read, wherever its rule is ranked
+    half = synthetic_log(1, '')
+    logs = half + SAMPLES[2][0] + SAMPLES[0][0] + half
+    fix, read = scanned(logs, stop_early=True)
+    ok = fix == 'provisioning_profile_not_found' and read < len(half) + 2 * 64 * 1024 and scan(logs) == fix
+    failures += not ok
+    print(f"{'✅' if ok else '❌'} provisioning (rule {rank('provisioning-profile-not-found')}) half-way: "
+          f"stopped after {100 * read // len(logs)}% of the log, ahead of the higher-ranked duplicate-sources after it"
+          + ('' if ok else f"  scanner={fix}"))
+
+    total = len(SAMPLES) + len(CASE_SAMPLES) + 3
+    print(f"\n{total - failures}/{total} logs resolved to the same fix")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
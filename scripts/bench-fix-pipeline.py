@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Simulation: the auto-fix agent handling many failures at once.
+
+Runs the agent's own scan/fetch/analyze/retry functions against a fake GitHub
+backend (simulated API and log download latency, synthetic failure logs, a
+recording workflow dispatch) and a throwaway build history, two ways:
+
+  - sequential: the previous loop - every app, run and failed job one after
+    another, sleeping before delayed retries
+  - pipeline: FixPipeline's bounded scan/fetch, analysis and retry pools
+
+and reports wall time, failures handled per second, peak concurrent GitHub
+requests, full log downloads saved by the failure fingerprint cache (the
+same few failures repeat across apps), and whether each app's retries went out
+in the order its failures were analyzed. Latencies and retry delays are multiplied by the time scale,
+so a 60s CocoaPods delay takes 3s at the default 0.05.
+
+Usage: python3 scripts/bench-fix-pipeline.py [apps] [failed_runs_per_app] [time_scale]
+       (defaults 12, 2, 0.05)
+"""
+
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from build_history import BuildHistory  # noqa: E402
+from fix_pipeline import FixPipeline  # noqa: E402
+
+# Simulated latencies in seconds, before scaling
+LIST_RUNS_LATENCY = 0.4
+LIST_JOBS_LATENCY = 0.4
+LOG_DOWNLOAD_LATENCY = 4.0  # Unity job logs run to tens of MB
+LOG_TAIL_LATENCY = 0.5  # The last 64 KB of one, for its fingerprint
+DISPATCH_LATENCY = 0.5
+
+# Failure logs cycled through the failed jobs: (log excerpt, retry recommended)
+FAILURE_LOGS = [
+    ('❌ error: No provisioning profile found after match for com.luckyjackpot.app\n', True),
+    ('[!] pod install failed: Failed to connect to cdn.cocoapods.org port 443\nerror: pod install\n', True),
+    ('fatal: unable to access repo: connection timeout after 30000 ms\n', True),
+    ('Assets/Scripts/Game.cs(12,7): error CS0246: The type or namespace could not be found\n', False),
+]
+LOG_FILLER = '[Unity] Compiling shader variants for Standard (pass ForwardBase) ... done\n' * 2000
+
+
+class FakeGitHub:
+    """Just enough of github_api.GitHubClient for the agent, with simulated latency"""
+
+    def __init__(self, apps, failed_runs, scale):
+        self.scale = scale
+        self.runs = {}
+        self.jobs = {}
+        self.logs = {}
+        self.dispatches = []  # [(app, time)]
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        failure = 0
+        for a, app in enumerate(apps):
+            runs = []
+            for r in range(failed_runs + 1):
+                run_id = 1000 * (a + 1) + r
+                failed = r > 0  # The oldest run passed; the newer ones failed
+                runs.insert(0, {
+                    'id': run_id, 'run_number': r + 1, 'name': f'{app} Builds', 'event': 'workflow_dispatch',
+                    'head_branch': 'main', 'status': 'completed', 'conclusion': 'failure' if failed else 'success',
+                    'created_at': '2026-10-17T10:00:00Z', 'updated_at': f'2026-10-17T1{r}:00:00Z'
+                })
+                if failed:
+                    text, _ = FAILURE_LOGS[failure % len(FAILURE_LOGS)]
+                    failure += 1
+                jobs = []
+                for j, platform in enumerate(['ios', 'aab']):
+                    if failed:
+                        self.logs[run_id * 10 + j] = LOG_FILLER + text
+                    jobs.append({
+                        'id': run_id * 10 + j, 'name': f'build-{platform} / build', 'status': 'completed',
+                        'conclusion': 'failure' if failed else 'success', 'runner_name': 'mac-studio-runner-1',
+                        'created_at': '2026-10-17T10:00:00Z', 'started_at': '2026-10-17T10:01:00Z',
+                        'completed_at': '2026-10-17T11:00:00Z'
+                    })
+                self.jobs[(app, run_id)] = jobs
+            self.runs[app] = runs
+
+    @contextlib.contextmanager
+    def _request(self, latency):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(latency * self.scale)
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def list_runs(self, repo, per_page=25, status=None, page=1):
+        with self._request(LIST_RUNS_LATENCY):
+            return [dict(r) for r in self.runs[repo]][(page - 1) * per_page:page * per_page]
+
+    def list_jobs(self, repo, run_id):
+        with self._request(LIST_JOBS_LATENCY):
+            return [dict(j) for j in self.jobs[(repo, run_id)]]
+
+    def stream_job_logs(self, repo, job_id, chunk_size=64 * 1024):
+        with self._request(LOG_DOWNLOAD_LATENCY):
+            log = self.logs[job_id]
+        for i in range(0, len(log), chunk_size):
+            yield log[i:i + chunk_size]
+
+    def job_log_tail(self, repo, job_id, size):
+        with self._request(LOG_TAIL_LATENCY):
+            return self.logs[job_id][-size:]
+
+    def dispatch_workflow(self, repo, workflow, inputs=None, ref=None):
+        with self._request(DISPATCH_LATENCY):
+            with self._lock:
+                self.dispatches.append((repo, time.time()))
+
+
+def load_agent():
+    spec = importlib.util.spec_from_file_location('build_fix_agent', os.path.join(ROOT, 'build-fix-agent.py'))
+    agent = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent)
+    return agent
+
+
+def simulate(mode, apps, failed_runs, scale):
+    """Handle every failure once in the given mode; returns the measurements"""
+    agent = load_agent()
+    github = FakeGitHub(apps, failed_runs, scale)
+    order = {app: {'analyzed': [], 'retried': []} for app in apps}
+    order_lock = threading.Lock()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        agent.history = BuildHistory(os.path.join(tmp, 'history.sqlite3'))
+        agent.get_client = lambda: github
+        agent.DASHBOARD_URL = 'http://127.0.0.1:9'  # Nothing listens: rebuilds dispatch directly (to the fake)
+
+        def analyze(failed_run):
+            fix = agent.analyze_failure(failed_run)
+            with order_lock:
+                order[failed_run.app]['analyzed'].append((failed_run.run_id, len(failed_run.jobs),
+                                                          bool(fix and fix.get('retry'))))
+            if fix and fix.get('delay'):
+                fix = dict(fix, delay=fix['delay'] * scale)
+            return fix
+
+        def retry(failed_run, fix):
+            with order_lock:
+                order[failed_run.app]['retried'].append(failed_run.run_id)
+            agent.retry_failure(failed_run, fix)
+
+        started = time.time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if mode == 'sequential':
+                for app in apps:
+                    for failed_run in agent.find_new_failures(app):
+                        if agent.fetch_failure_logs(failed_run):
+                            fix = analyze(failed_run)
+                            if fix and fix.get('retry'):
+                                time.sleep(fix.get('delay', 0))
+                                retry(failed_run, fix)
+            else:
+                pipeline = FixPipeline(agent.find_new_failures, agent.fetch_failure_logs, analyze, retry)
+                for app in apps:
+                    pipeline.submit(app)
+                pipeline.wait_idle()
+                pipeline.shutdown()
+        elapsed = time.time() - started
+
+    analyzed = sum(jobs for o in order.values() for run_id, jobs, retried in o['analyzed'])
+    in_order = all(o['retried'] == [run_id for run_id, jobs, retried in o['analyzed'] if retried]
+                   for o in order.values())
+    return {
+        'elapsed': elapsed,
+        'analyzed': analyzed,
+        'retried': len(github.dispatches),
+        'peak_requests': github.peak_in_flight,
+        'cache_hits': agent.fingerprints.to_dict()['hits'],
+        'in_order': in_order
+    }
+
+
+def main():
+    app_count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    failed_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    scale = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    apps = [f'app{n:02d}' for n in range(app_count)]
+    print(f"{app_count} apps x {failed_runs} failed runs x 2 failed jobs, time scale {scale}\n")
+
+    results = {}
+    for mode in ('sequential', 'pipeline'):
+        r = results[mode] = simulate(mode, apps, failed_runs, scale)
+        print(f"{mode:<11} {r['elapsed']:7.2f}s  {r['analyzed']} failures analyzed "
+              f"({r['analyzed'] / r['elapsed']:.1f}/s), {r['retried']} retries, "
+              f"peak {r['peak_requests']} concurrent GitHub requests, "
+              f"{r['cache_hits']} resolved from the fingerprint cache, "
+              f"per-app retry order {'kept' if r['in_order'] else 'BROKEN'}")
+
+    speedup = results['sequential']['elapsed'] / results['pipeline']['elapsed']
+    print(f"\npipeline: {speedup:.1f}x faster")
+    ok = all(r['in_order'] and r['analyzed'] == app_count * failed_runs * 2 for r in results.values())
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: finding the current project in a runner's Worker log.
+
+Compares the old approach (readlines() of the whole file, keep the last 1000
+lines, regex each one) against runner_logs.WorkerLogTail on a synthetic diag
+log, reporting wall time and peak Python memory for:
+
+  - a cold scan (first time the log is seen)
+  - a warm scan after a few KB were appended (the steady state every 10s)
+
+Usage: python3 scripts/bench-worker-log-tail.py [size_mb]   (default 100)
+"""
+
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from runner_logs import WorkerLogTail  # noqa: E402
+
+APP_NAMES = ['blackjack21', 'keno4card', 'roulette', 'fvg-keno']
+FILLER = '[2026-10-17 10:59:{s:02d}Z INFO JobRunner] Processing step {n}: Run xcodebuild -workspace Unity-iPhone.xcworkspace\n'
+
+
+def write_log(path, size_mb):
+    """Write a synthetic Worker log of about size_mb MB mentioning the repo near the start"""
+    target = size_mb * 1024 * 1024
+    with open(path, 'w') as f:
+        f.write('[2026-10-17 10:58:00Z INFO Worker] Job message: repository LuckyJackpotCasino/roulette\n')
+        chunk = ''.join(FILLER.format(s=n % 60, n=n) for n in range(10000))
+        written = 0
+        while written < target:
+            f.write(chunk)
+            written += len(chunk)
+
+
+def append_log(path):
+    with open(path, 'a') as f:
+        f.write(''.join(FILLER.format(s=n % 60, n=n) for n in range(50)))
+        f.write('[2026-10-17 11:30:00Z INFO Worker] Checkout LuckyJackpotCasino/roulette.git\n')
+
+
+def old_scan(path):
+    """The previous implementation from get_runner_status()"""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        lines = f.readlines()[-1000:]
+    for line in reversed(lines):
+        if 'LuckyJackpotCasino/' in line:
+            match = re.search(r'LuckyJackpotCasino/([a-z0-9\-]+)(?:\s|/|$|\.git)', line, re.IGNORECASE)
+            if match and match.group(1) in APP_NAMES:
+                return match.group(1)
+    return None
+
+
+def measure(fn):
+    """Run fn twice: once for wall time, once under tracemalloc for peak memory"""
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def report(label, result, elapsed, peak):
+    print(f"{label:<28} {elapsed * 1000:>10.1f} ms {peak / 1024 / 1024:>10.2f} MB   project={result}")
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'Worker_20261017-105800-utc.log')
+        print(f"Writing {size_mb} MB synthetic Worker log...")
+        write_log(path, size_mb)
+        print(f"{'':<28} {'time':>13} {'peak mem':>13}")
+
+        report('readlines (cold)', *measure(lambda: old_scan(path)))
+        report('WorkerLogTail (cold)', *measure(lambda: WorkerLogTail().project('runner', path, APP_NAMES)))
+
+        # Steady state: the log grew a little since the last 10s scan
+        append_log(path)
+        report('readlines (appended)', *measure(lambda: old_scan(path)))
+        tail = WorkerLogTail()
+        tail.project('runner', path, APP_NAMES)
+        append_log(path)
+
+        def warm():
+            append_log(path)
+            return tail.project('runner', path, APP_NAMES)
+        report('WorkerLogTail (appended)', *measure(warm))
+
+
+if __name__ == '__main__':
+    main()
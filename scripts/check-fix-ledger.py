@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Check the auto-fix agent's ledger of handled failures (kept in the build history).
+
+Runs the agent's own scan and analysis functions against a fake GitHub backend
+and a throwaway history database, and checks that:
+
+  - failures handled before a restart aren't downloaded or analyzed again by
+    a freshly started agent
+  - ledger entries older than FIX_HISTORY_RETENTION are evicted, and failed
+    runs that old are left alone
+  - an app failing the same way run after run gets rebuilds further and
+    further apart, none after MAX_RETRIES, and a fresh start once it builds
+    successfully
+  - only the failed platforms are rebuilt, all of a run's in one dispatch,
+    and the run that dispatch started is linked back to the failed one
+
+Usage: python3 scripts/check-fix-ledger.py
+"""
+
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from build_history import BuildHistory  # noqa: E402
+
+APP = 'roulette'
+FAILURE_LOG = 'security: SecKeychainUnlock ci-signing.keychain: User interaction is not allowed (locked)\nerror: exit 1\n'
+
+
+class FakeGitHub:
+    """The parts of github_api.GitHubClient the agent's scan and fetch stages use"""
+
+    def __init__(self):
+        self.runs = []  # Newest first
+        self.jobs = {}
+        self.log_reads = 0
+        self.dispatches = []  # build_platforms of each dispatch
+
+    def add_run(self, run_id, conclusion, age=0, platforms=('ios', 'aab')):
+        created = datetime.fromtimestamp(time.time() - age, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        self.runs.insert(0, {
+            'id': run_id, 'run_number': run_id, 'name': 'Roulette Builds', 'event': 'workflow_dispatch',
+            'head_branch': 'main', 'status': 'completed', 'conclusion': conclusion,
+            'created_at': created, 'updated_at': created
+        })
+        self.jobs[run_id] = [{
+            'id': run_id * 10 + j, 'name': f'build-{platform} / build', 'status': 'completed',
+            'conclusion': conclusion, 'runner_name': 'mac-studio-runner-1',
+            'created_at': created, 'started_at': created, 'completed_at': created
+        } for j, platform in enumerate(platforms)]
+
+    def list_runs(self, repo, per_page=25, status=None, page=1):
+        return [dict(r) for r in self.runs][(page - 1) * per_page:page * per_page]
+
+    def list_jobs(self, repo, run_id):
+        return [dict(j) for j in self.jobs[run_id]]
+
+    def stream_job_logs(self, repo, job_id, chunk_size=64 * 1024):
+        self.log_reads += 1
+        yield FAILURE_LOG
+
+    def job_log_tail(self, repo, job_id, size):
+        self.log_reads += 1
+        return FAILURE_LOG
+
+    def dispatch_workflow(self, repo, workflow, inputs=None, ref=None):
+        self.dispatches.append(inputs['build_platforms'])
+
+
+def load_agent(history, github):
+    spec = importlib.util.spec_from_file_location('build_fix_agent', os.path.join(ROOT, 'build-fix-agent.py'))
+    agent = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent)
+    agent.history = history
+    agent.get_client = lambda: github
+    agent.subprocess.run = lambda *args, **kwargs: None  # The keychain fix's cleanup
+    agent.DASHBOARD_URL = 'http://127.0.0.1:9'  # Nothing listens: rebuilds dispatch directly (to the fake)
+    return agent
+
+
+def handle(agent, app=APP):
+    """One scan of the app, each new failure fetched and analyzed: [fix result]"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [agent.analyze_failure(a) for a in agent.find_new_failures(app) if agent.fetch_failure_logs(a)]
+
+
+def check(description, ok, detail=''):
+    print(f"{'✅' if ok else '❌'} {description}" + ('' if ok else f"\n   {detail}"))
+    return ok
+
+
+def main():
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'history.sqlite3')
+        github = FakeGitHub()
+        github.add_run(1, 'failure')
+        github.add_run(2, 'failure')
+        agent = load_agent(BuildHistory(path), github)
+        fixes = handle(agent)
+        results.append(check('failures of two runs handled', len(fixes) == 2, fixes))
+
+        # Restart: a new process, new history connection, empty in-memory caches
+        github.log_reads = 0
+        agent = load_agent(BuildHistory(path), github)
+        fixes = handle(agent)
+        results.append(check('nothing re-analyzed after a restart', fixes == [] and github.log_reads == 0,
+                             f"{len(fixes)} analyzed, {github.log_reads} log reads"))
+
+        # Eviction: age run 1 and its fix attempt past the retention
+        history = BuildHistory(path)
+        old = datetime.fromtimestamp(time.time() - agent.FIX_HISTORY_RETENTION - 60, timezone.utc)
+        github.runs[-1]['created_at'] = old.strftime('%Y-%m-%dT%H:%M:%SZ')
+        history._db().execute('UPDATE fix_attempts SET attempted_at = attempted_at - ? WHERE run_id = 1',
+                              (agent.FIX_HISTORY_RETENTION + 60,))
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent.evict_fix_history()
+        results.append(check('ledger entries past retention evicted, newer ones kept',
+                             not history.fix_attempted(APP, 1) and history.fix_attempted(APP, 2)))
+
+        github.add_run(3, 'failure', age=agent.FIX_HISTORY_RETENTION + 3600)
+        github.runs.sort(key=lambda r: r['id'], reverse=True)
+        fixes = handle(agent)
+        results.append(check('failed runs older than the retention (evicted or never seen) left alone', fixes == [],
+                             f"{len(fixes)} analyzed"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        github = FakeGitHub()
+        agent = load_agent(BuildHistory(os.path.join(tmp, 'history.sqlite3')), github)
+        plans = []
+        for run_id in range(10, 10 + agent.MAX_RETRIES + 1):
+            github.add_run(run_id, 'failure')
+            plans.append([(f.get('retry'), f.get('delay', 0), f['failed_runs']) for f in handle(agent)])
+        expected = [[(True, 0, 1)]]
+        expected += [[(True, min(agent.RETRY_BACKOFF * 2 ** (n - 2), agent.MAX_RETRY_DELAY), n)]
+                     for n in range(2, agent.MAX_RETRIES + 1)]
+        expected += [[(False, 0, agent.MAX_RETRIES + 1)]]
+        results.append(check(f'same failure run after run: rebuilds back off, none after {agent.MAX_RETRIES}',
+                             plans == expected, f"got {plans}"))
+
+        github.add_run(20, 'success')
+        github.add_run(21, 'failure')
+        plans = [(f.get('retry'), f.get('delay', 0), f['failed_runs']) for f in handle(agent)]
+        results.append(check('a successful build resets the back-off', plans == [(True, 0, 1)], f"got {plans}"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        github = FakeGitHub()
+        history = BuildHistory(os.path.join(tmp, 'history.sqlite3'))
+        agent = load_agent(history, github)
+        github.add_run(30, 'failure', platforms=['windows', 'ios'])
+        with contextlib.redirect_stdout(io.StringIO()):
+            for failed_run in agent.find_new_failures(APP):
+                agent.fetch_failure_logs(failed_run)
+                agent.retry_failure(failed_run, agent.analyze_failure(failed_run))
+        results.append(check('a run with failed iOS and Windows jobs: one dispatch of just those two',
+                             github.dispatches == ['ios,windows'], f"dispatched {github.dispatches}"))
+
+        github.add_run(31, 'success', platforms=['ios', 'windows'])
+        handle(agent)
+        summary = history.retry_summary(0)
+        retry = summary['recent'][0] if summary['recent'] else {}
+        results.append(check('the rebuild is linked to the failed run, with its outcome',
+                             (retry.get('runId'), retry.get('retryRunId'), retry.get('outcome')) == (30, 31, 'success')
+                             and history.retry_of(APP, 31) == 30, f"got {retry}"))
+
+    print(f"\n{sum(results)}/{len(results)} checks passed")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
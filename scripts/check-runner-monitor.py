@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Check RunnerMonitor against a fake runners directory.
+
+Builds a temp tree the way ACTIONS_RUNNERS_DIR looks on the Mac Studio (runner
+dirs with a stub svc.sh, `_work/` and `_diag/`), starts the monitor on it and
+then acts like a runner: writes a Worker log, rotates to a new one for the
+next job, lets the log go quiet and adds a runner. After each step the
+monitor's snapshot must change to match. Runs once through inotify (Linux
+only) and once through the stat-polling fallback.
+
+Usage: python3 scripts/check-runner-monitor.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import runner_monitor  # noqa: E402
+from runner_monitor import Inotify, RunnerMonitor  # noqa: E402
+
+APP_NAMES = ['roulette', 'keno4card', 'blackjack21']
+TIMEOUT = 10  # Seconds a step may take to show up in the snapshot
+
+# Tick faster than on the Mac Studio, so the polling pass doesn't take minutes
+runner_monitor.POLL_INTERVAL = 0.2
+runner_monitor.DEBOUNCE = 0.05
+
+
+def worker_log(repository, display_name):
+    """Enough of a Worker log for runner_logs: a job started and the repo being checked out"""
+    return (f"[2026-10-17 10:58:00Z INFO Worker] Job message:\n"
+            f"[2026-10-17 10:58:01Z INFO JobRunner] Job {display_name}\n"
+            f"[2026-10-17 10:58:05Z INFO Worker] git fetch https://github.com/{repository}\n")
+
+
+def add_runner(base_dir, name):
+    runner_dir = os.path.join(base_dir, name)
+    os.makedirs(os.path.join(runner_dir, '_work', 'roulette'))
+    os.makedirs(os.path.join(runner_dir, '_work', 'keno4card'))
+    os.makedirs(os.path.join(runner_dir, '_diag'))
+    svc = os.path.join(runner_dir, 'svc.sh')
+    with open(svc, 'w') as f:
+        f.write('#!/bin/sh\necho "Started: 4242"\n')
+    os.chmod(svc, 0o755)
+    return runner_dir
+
+
+def wait_for(monitor, predicate):
+    """Wait until predicate(snapshot) holds; returns the last snapshot and whether it did"""
+    deadline = time.time() + TIMEOUT
+    while True:
+        snapshot = monitor.snapshot()
+        if predicate(snapshot) or time.time() > deadline:
+            return snapshot, predicate(snapshot)
+        time.sleep(0.05)
+
+
+def runner(snapshot, name):
+    return next((r for r in snapshot.runners if r['name'] == name), {})
+
+
+def check(use_inotify):
+    """Drive one monitor through the runner lifecycle; returns [(description, ok, snapshot dict)]"""
+    results = []
+    completed = []
+    with tempfile.TemporaryDirectory() as base_dir:
+        runner_dir = add_runner(base_dir, 'mac-studio-runner-1')
+        diag = os.path.join(runner_dir, '_diag')
+        monitor = RunnerMonitor(APP_NAMES, base_dir=base_dir, use_inotify=use_inotify,
+                                on_job_complete=lambda name, project: completed.append((name, project))).start()
+        monitor.scanned.wait(TIMEOUT)
+
+        def step(description, predicate):
+            before = monitor.snapshot()
+            snapshot, ok = wait_for(monitor, lambda s: s is not before and predicate(s))
+            results.append((description, ok, snapshot.to_dict()))
+
+        snapshot = monitor.snapshot()
+        first = runner(snapshot, 'mac-studio-runner-1')
+        results.append(('first scan finds an idle, online runner',
+                         first.get('status') == 'online' and not first.get('busy'), snapshot.to_dict()))
+
+        with open(os.path.join(diag, 'Worker_20261017-105800-utc.log'), 'w') as f:
+            f.write(worker_log('LuckyJackpotCasino/roulette', 'build-ios / build'))
+        step('new Worker log: runner busy building roulette',
+             lambda s: runner(s, 'mac-studio-runner-1').get('busy')
+             and runner(s, 'mac-studio-runner-1').get('project') == 'roulette')
+
+        # The runner starts a new Worker log for its next job and the old one is cleaned up
+        with open(os.path.join(diag, 'Worker_20261017-120000-utc.log'), 'w') as f:
+            f.write(worker_log('LuckyJackpotCasino/keno4card', 'build-aab / build'))
+        os.remove(os.path.join(diag, 'Worker_20261017-105800-utc.log'))
+        step('log rotated: runner now building keno4card',
+             lambda s: runner(s, 'mac-studio-runner-1').get('project') == 'keno4card')
+
+        quiet = time.time() - runner_monitor.BUSY_WINDOW - 1
+        os.utime(os.path.join(diag, 'Worker_20261017-120000-utc.log'), (quiet, quiet))
+        step('log quiet past BUSY_WINDOW: runner idle, job reported complete',
+             lambda s: not runner(s, 'mac-studio-runner-1').get('busy')
+             and ('mac-studio-runner-1', 'keno4card') in completed)
+
+        add_runner(base_dir, 'mac-studio-runner-2')
+        step('runner added: picked up without a restart',
+             lambda s: runner(s, 'mac-studio-runner-2').get('status') == 'online' and s.total == 2)
+
+        results.insert(0, (f"monitor runs in {'inotify' if use_inotify else 'polling'} mode",
+                           monitor.mode == ('inotify' if use_inotify else 'polling'), {'mode': monitor.mode}))
+    return results
+
+
+def main():
+    try:
+        Inotify().close()
+        modes = [True, False]
+    except (OSError, AttributeError) as e:
+        print(f"⏭️  inotify unavailable here ({e}) - checking the polling fallback only")
+        modes = [False]
+
+    failures = total = 0
+    for use_inotify in modes:
+        print(f"\n{'inotify' if use_inotify else 'polling'}:")
+        for description, ok, snapshot in check(use_inotify):
+            total += 1
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {description}")
+            if not ok:
+                print(f"   snapshot {snapshot}")
+
+    print(f"\n{total - failures}/{total} checks passed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Check runner_logs against excerpts of real-format runner Worker_*.log files.
+
+Each sample is written to a temp file and read through WorkerLogTail, the same
+way the runner monitor reads a live log; the parsed project, job and run are
+compared with what the sample should produce. The platform is resolved with
+the dashboard's own platform_for_job().
+
+Usage: python3 scripts/check-worker-log-parser.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from runner_logs import WorkerLogTail  # noqa: E402
+from server import platform_for_job  # noqa: E402
+
+APP_NAMES = ['blackjack21', 'keno4card', 'roulette', 'fvg-keno', 'videopokercasino']
+
+HEADER = """[2026-10-17 10:58:00Z INFO HostContext] No proxy setting found.
+[2026-10-17 10:58:00Z INFO Worker] Version: 2.320.0
+[2026-10-17 10:58:00Z INFO Worker] Commit: 0ee4c1a6ab06b4d2c7ad5ae9ce7c5a6d0e4b2c3f
+[2026-10-17 10:58:00Z INFO Worker] Culture: en-US
+[2026-10-17 10:58:00Z INFO Worker] UI Culture: en-US
+[2026-10-17 10:58:00Z INFO Worker] Waiting to receive the job message from the channel.
+[2026-10-17 10:58:00Z INFO ProcessChannel] Receiving message of length 48211, with hash 'a4c9e3…'
+[2026-10-17 10:58:00Z INFO Worker] Message received.
+[2026-10-17 10:58:00Z INFO Worker] Job message:
+"""
+
+
+def job_message(display_name, repository, run_id, run_number, workflow, job_key='build'):
+    """The pretty-printed job message a runner logs when it picks up a job"""
+    return HEADER + f""" {{
+  "fileTable": [
+    ".github/workflows/{repository.split('/')[-1]}-builds.yml",
+    "LuckyJackpotCasino/github-workflows/.github/workflows/unity-ios-build-auto-signing.yml@refs/heads/main"
+  ],
+  "mask": [
+    {{
+      "type": "regex",
+      "value": "***"
+    }}
+  ],
+  "steps": [
+    {{
+      "type": "action",
+      "reference": {{
+        "name": "actions/checkout",
+        "ref": "v4",
+        "repositoryType": "GitHub",
+        "type": "repository"
+      }},
+      "displayNameToken": {{
+        "type": 0,
+        "lit": "Checkout"
+      }},
+      "contextName": "__actions_checkout"
+    }}
+  ],
+  "variables": {{
+    "system.github.job": {{
+      "value": "{job_key}"
+    }},
+    "system.github.token": {{
+      "value": "***",
+      "isSecret": true
+    }}
+  }},
+  "messageType": "PipelineAgentJobRequest",
+  "plan": {{
+    "scopeIdentifier": "00000000-0000-0000-0000-000000000000",
+    "planType": "actions",
+    "version": 0,
+    "planId": "5b8f2f0e-7d0a-4c1e-9a53-0c3f6a7d1e22"
+  }},
+  "timeline": {{
+    "id": "5b8f2f0e-7d0a-4c1e-9a53-0c3f6a7d1e22",
+    "changeId": 0,
+    "location": null
+  }},
+  "jobId": "8d6a4b1c-2e3f-5a6b-7c8d-9e0f1a2b3c4d",
+  "jobDisplayName": "{display_name}",
+  "jobName": "{job_key}",
+  "requestId": 4417,
+  "lockedUntil": "0001-01-01T00:00:00",
+  "resources": {{
+    "endpoints": []
+  }},
+  "contextData": {{
+    "github": {{
+      "t": 2,
+      "d": [
+        {{
+          "k": "server_url",
+          "v": "https://github.com"
+        }},
+        {{
+          "k": "repository",
+          "v": "{repository}"
+        }},
+        {{
+          "k": "run_id",
+          "v": "{run_id}"
+        }},
+        {{
+          "k": "run_number",
+          "v": "{run_number}"
+        }},
+        {{
+          "k": "job",
+          "v": "{job_key}"
+        }},
+        {{
+          "k": "workflow",
+          "v": "{workflow}"
+        }}
+      ]
+    }}
+  }}
+}}
+[2026-10-17 10:58:01Z INFO JobRunner] Job ID 8d6a4b1c-2e3f-5a6b-7c8d-9e0f1a2b3c4d
+[2026-10-17 10:58:01Z INFO JobRunner] Starting the job execution context.
+"""
+
+
+STEP_OUTPUT = """[2026-10-17 11:02:13Z INFO StepsRunner] Processing step: DisplayName='Build with Unity'
+[2026-10-17 11:02:13Z INFO ProcessInvokerWrapper] Starting process:
+[2026-10-17 11:02:13Z INFO ProcessInvokerWrapper]   File name: '/bin/bash'
+[2026-10-17 11:02:13Z INFO ProcessInvokerWrapper]   Arguments: '--noprofile --norc -e -o pipefail /Users/runner/actions-runners/mac-studio-runner-1/_work/_temp/6c1e.sh'
+"""
+
+# (description, log text, expected project, job, run_id, run_number, platform)
+SAMPLES = [
+    ('iOS job from a reusable workflow',
+     job_message('build-ios / build', 'LuckyJackpotCasino/roulette', 11372054921, 212, 'Roulette Builds') + STEP_OUTPUT,
+     'roulette', 'build-ios / build', 11372054921, 212, 'ios'),
+    ('Google Play job',
+     job_message('build-aab / build', 'LuckyJackpotCasino/keno4card', 11372060001, 87, 'Keno 4 Card Builds') + STEP_OUTPUT,
+     'keno4card', 'build-aab / build', 11372060001, 87, 'aab'),
+    ('Amazon job on an FVG app',
+     job_message('build-amazon / build', 'LuckyJackpotCasino/fvg-keno', 11372070002, 9, 'FVG Keno Builds'),
+     'fvg-keno', 'build-amazon / build', 11372070002, 9, 'amazon'),
+    ('setup job (no platform)',
+     job_message('setup', 'LuckyJackpotCasino/blackjack21', 11372080003, 301, 'Blackjack Builds', job_key='setup'),
+     'blackjack21', 'setup', 11372080003, 301, None),
+    ('job message not written yet; project from a later checkout line',
+     HEADER + '[2026-10-17 10:58:05Z INFO Worker] git fetch https://github.com/LuckyJackpotCasino/videopokercasino\n',
+     'videopokercasino', None, None, None, None),
+    ('repository not a dashboard app; falls back to mentions',
+     job_message('build-ios / build', 'LuckyJackpotCasino/github-workflows', 11372090004, 5, 'Tests')
+     + '[2026-10-17 11:00:00Z INFO Worker] Checkout LuckyJackpotCasino/roulette.git\n',
+     'roulette', 'build-ios / build', 11372090004, 5, 'ios'),
+]
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, (description, text, *expected) in enumerate(SAMPLES):
+            path = os.path.join(tmp, f'Worker_{i}.log')
+            with open(path, 'w') as f:
+                f.write(text)
+            log = WorkerLogTail().read('runner', path, APP_NAMES)
+            job = log['job'] or {}
+            platform = platform_for_job(job['job']) if job.get('job') else None
+            got = [log['project'], job.get('job'), job.get('run_id'), job.get('run_number'), platform]
+            ok = got == expected
+            failures += not ok
+            print(f"{'✅' if ok else '❌'} {description}")
+            if not ok:
+                print(f"   expected {expected}\n   got      {got}")
+
+        # A job message that arrives in two writes is picked up once it's complete
+        path = os.path.join(tmp, 'Worker_split.log')
+        text = job_message('build-windows / build', 'LuckyJackpotCasino/roulette', 11372100005, 44, 'Roulette Builds')
+        cut = text.index('"contextData"')
+        tail = WorkerLogTail()
+        with open(path, 'w') as f:
+            f.write(text[:cut])
+        first = tail.read('runner', path, APP_NAMES)['job']
+        with open(path, 'a') as f:
+            f.write(text[cut:])
+        second = tail.read('runner', path, APP_NAMES)['job']
+        ok = first['run_id'] is None and second['run_id'] == 11372100005 and second['job'] == 'build-windows / build'
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} job message split across two writes")
+
+    print(f"\n{len(SAMPLES) + 1 - failures}/{len(SAMPLES) + 1} samples parsed as expected")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
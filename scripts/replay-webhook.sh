@@ -0,0 +1,55 @@
+#!/bin/bash
+#
+# BuildBot 9000 - Replay Webhook
+#
+# Replays a recorded GitHub webhook payload against the dashboard server,
+# signed with GITHUB_WEBHOOK_SECRET the same way GitHub signs deliveries.
+# Usage:
+#   ./replay-webhook.sh <event> <payload.json> [server-url]
+#
+# Examples:
+#   ./replay-webhook.sh workflow_run payloads/run-requested.json
+#   ./replay-webhook.sh workflow_job payloads/build-ios-completed.json http://localhost:8765
+#
+# Recorded payloads can be copied from the repo/org webhook's
+# "Recent Deliveries" tab on GitHub.
+#
+
+set -e
+
+# Colors
+GREEN='\033[0;32m'
+RED='\033[0;31m'
+NC='\033[0m'
+
+if [ $# -lt 2 ]; then
+  echo -e "${RED}Usage:${NC} $0 <event> <payload.json> [server-url]"
+  echo ""
+  echo "Events: workflow_run, workflow_job, ping"
+  exit 1
+fi
+
+EVENT=$1
+PAYLOAD=$2
+SERVER="${3:-http://localhost:8765}"
+
+if [ -z "$GITHUB_WEBHOOK_SECRET" ]; then
+  echo -e "${RED}❌ GITHUB_WEBHOOK_SECRET is not set${NC}"
+  exit 1
+fi
+
+if [ ! -f "$PAYLOAD" ]; then
+  echo -e "${RED}❌ Payload file not found: $PAYLOAD${NC}"
+  exit 1
+fi
+
+SIGNATURE="sha256=$(openssl dgst -sha256 -hmac "$GITHUB_WEBHOOK_SECRET" < "$PAYLOAD" | sed 's/^.* //')"
+
+echo -e "${GREEN}📨 Replaying $EVENT from $PAYLOAD to $SERVER/webhook/github${NC}"
+curl -sS -X POST "$SERVER/webhook/github" \
+  -H "Content-Type: application/json" \
+  -H "X-GitHub-Event: $EVENT" \
+  -H "X-GitHub-Delivery: replay-$(date +%s)" \
+  -H "X-Hub-Signature-256: $SIGNATURE" \
+  --data-binary "@$PAYLOAD"
+echo ""
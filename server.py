@@ -1,28 +1,91 @@
 #!/usr/bin/env python3
 
+import hashlib
+import hmac
 import http.server
-import socketserver
 import json
+import logging
 import subprocess
+import sys
 import threading
 import time
 import os
-from urllib.parse import urlparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
 from datetime import datetime
 
+import github_api
+from github_api import GitHubAPIError, get_client, get_workflow_file, platform_for_job
+from runner_monitor import RunnerMonitor
+from build_history import BuildHistory, run_signature
+from build_metrics import BuildMetrics, DEFAULT_METRICS_WINDOW, METRICS_WINDOWS, parse_window
+from build_scheduler import BuildScheduler, RunnerAffinity
+from build_dispatch import DispatchCoalescer
+from instrumentation import instruments
+
 PORT = 8765
 
-# GitHub CLI path (may not be in PATH for non-interactive shells)
-GH_CLI = '/opt/homebrew/bin/gh'
+# Leveled logging: per-request and per-refresh detail ([LOCAL], [OVERRIDE], [WEBHOOK],
+# refresh ticks) is DEBUG, so by default it's never formatted, let alone printed
+LOG_LEVEL = os.environ.get('DASHBOARD_LOG_LEVEL', 'INFO').upper()
+log = logging.getLogger('dashboard')
 
-# Cache for build status (aggressive caching to avoid rate limits)
-cache = {}
-cache_time = {}
-CACHE_DURATION = 300  # 5 minutes (was 60 seconds)
+# Background status refresh (aggressive intervals to avoid rate limits)
+CACHE_DURATION = 300  # 5 minutes - refresh interval for apps whose builds have settled
+ACTIVE_REFRESH_INTERVAL = 30  # Refresh interval for apps with queued/in_progress builds
+POLLER_TICK = 2  # How often the poller checks which apps are due
 rate_limited_until = 0  # Track when rate limit expires
+rate_limit_lock = threading.Lock()
+
+# GitHub webhooks (workflow_run / workflow_job events pushed to /webhook/github)
+WEBHOOK_SECRET = os.environ.get('GITHUB_WEBHOOK_SECRET', '')
+WEBHOOK_ACTIVE_WINDOW = 3600  # Webhooks count as live if an event arrived within this long
+RECONCILE_INTERVAL = 900  # Polling interval while webhooks are live (reconciliation only)
+
+# Server-Sent Events (/api/events)
+EVENT_HISTORY = 1000  # Events kept for Last-Event-ID resume
+SSE_KEEPALIVE = 15  # Seconds between keep-alive comments on an idle stream
+
+# HTTP server limits
+MAX_REQUEST_WORKERS = 16  # Requests handled at once; further connections wait for a free worker
+MAX_QUEUED_REQUESTS = 64  # Connections waiting for a worker; past that they're answered 503 right away
+QUEUE_TIMEOUT = 10  # Seconds a connection may wait for a worker before it's answered 503
+MAX_EVENT_STREAMS = 8  # Open /api/events streams (each holds a worker), so streams can't starve requests
+REQUEST_TIMEOUT = 30  # Seconds a client may stall sending or receiving before it's dropped
+
+# Routes, for per-endpoint request metrics (see /api/internal/metrics)
+ROUTES = {
+    '/', '/dashboard', '/status', '/api/status', '/api/events', '/api/budget', '/api/metrics', '/api/queue',
+    '/runners', '/api/runners', '/api/internal/metrics', '/api/agent/fingerprints', '/api/agent/retries',
+    '/agent', '/api/agent', '/webhook/github'
+}
+ROUTE_PREFIXES = [
+    ('/status/', '/status/<app>'), ('/api/queue/', '/api/queue/<batch>'), ('/trigger/', '/trigger/<app>/<platform>'),
+    ('/trigger-bulk/', '/trigger-bulk/<platform>'), ('/cancel/', '/cancel/<app>/<run>'),
+    ('/restart-runner/', '/restart-runner/<runner>')
+]
+
+# Concurrency limits for GitHub lookups (the API client's connection pool caps
+# requests in flight at github_api.MAX_CONNECTIONS)
+RUNS_TO_SCAN = 10  # Most recent runs inspected per app
+APP_REFRESH_WORKERS = 4  # Apps refreshed in parallel per poller tick (REST mode)
+
+# How statuses are resolved: 'graphql' = one query for all due apps,
+# 'rest' = list runs, then one jobs request per run (N+1)
+STATUS_MODE = os.environ.get('DASHBOARD_STATUS_MODE', 'graphql')
+
+# API requests spent by the most recent refresh in each mode (see /api/budget)
+refresh_budget = {}
+last_graphql_cost = None  # Rate-limit points charged for the last GraphQL query
+job_lookup_pool = ThreadPoolExecutor(max_workers=github_api.MAX_CONNECTIONS, thread_name_prefix='gh-jobs')
+app_refresh_pool = ThreadPoolExecutor(max_workers=APP_REFRESH_WORKERS, thread_name_prefix='app-refresh')
 
-# Track runner states to detect job completion
-runner_states = {}  # {runner_name: {'busy': bool, 'project': str, 'last_check': timestamp}}
+event_stream_slots = threading.BoundedSemaphore(MAX_EVENT_STREAMS)
+
+# Runs and jobs persisted across restarts (shared with the auto-fix agent)
+history = BuildHistory()
+metrics = BuildMetrics(history)  # Queue/build time analytics, fed incrementally from the history
 
 apps = [
     # Lucky Jackpot Casino Games
@@ -41,39 +104,49 @@ apps = [
     {'name': 'fvg-fourcardkeno', 'aabOffset': 400, 'amazonOffset': 200, 'studio': 'FVG'}
 ]
 
-def get_workflow_file(app):
-    """Get the workflow filename for an app"""
-    workflow_map = {
-        'kenocasino': 'keno-builds.yml',
-        'blackjack21': 'blackjack-builds.yml',
-        'fvg-multicardkeno': 'fvg-multicardkeno-builds.yml',
-        'fvg-keno': 'fvg-keno-builds.yml',
-        'fvg-fourcardkeno': 'fvg-fourcardkeno-builds.yml'
-    }
-    return workflow_map.get(app, f'{app}-builds.yml')
+def note_rate_limit(error):
+    """Pause API polling if GitHub says we're out of quota"""
+    global rate_limited_until
+    if error.rate_limited:
+        reset = error.rate_limit_reset or time.time() + 3600
+        log.warning("⚠️  RATE LIMITED! Pausing API calls until %s", datetime.fromtimestamp(reset).strftime('%H:%M:%S'))
+        with rate_limit_lock:
+            rate_limited_until = max(rate_limited_until, reset)
+
+def is_rate_limited():
+    """True while GitHub's rate limit is in effect"""
+    with rate_limit_lock:
+        return time.time() < rate_limited_until
+
+def trigger_app_build(app, platform, runner_label=None):
+    """Trigger a build for an app on a platform ('all', 'ios' or e.g. 'ios,aab').
 
-def trigger_app_build(app, platform):
-    """Trigger a build for an app on a specific platform"""
+    Goes through the dispatch coalescer: platforms already queued/running are
+    skipped, and concurrent requests for the app share one dispatch.
+    """
+    handle, note = dispatcher.request(app, platform, runner_label)
+    if handle is None:
+        log.info("⏸️  Skipping trigger for %s (%s) - already queued/running", app, platform)
+        return {
+            'success': False,
+            'error': f'{platform} build(s) already queued/running',
+            'skipped': True
+        }
+    result = handle.wait(timeout=REQUEST_TIMEOUT)
+    if result is None:
+        # Still being sent; the caller can follow it in /api/queue
+        result = dict(handle.to_dict(), success=True, pending=True)
+    if note:
+        result[note] = True
+    return result
+
+def dispatch_build(app, platform, runner_label=None):
+    """Dispatch the app's build workflow for a platform (no queued/running check).
+
+    runner_label targets a specific runner; if the app's workflow doesn't take a
+    runner_label input, the build is dispatched to any runner instead.
+    """
     try:
-        # First check if there are already queued or running builds
-        check_cmd = f'{GH_CLI} run list --repo LuckyJackpotCasino/{app} --limit 5 --json status,databaseId 2>&1'
-        check_result = subprocess.run(check_cmd, shell=True, capture_output=True, text=True, timeout=10)
-        
-        if check_result.returncode == 0 and check_result.stdout.strip():
-            try:
-                runs = json.loads(check_result.stdout)
-                queued_or_running = [r for r in runs if r.get('status') in ['queued', 'in_progress', 'waiting']]
-                
-                if queued_or_running:
-                    print(f"⏸️  Skipping trigger for {app} - {len(queued_or_running)} builds already queued/running", flush=True)
-                    return {
-                        'success': False, 
-                        'error': f'{len(queued_or_running)} build(s) already queued/running',
-                        'skipped': True
-                    }
-            except json.JSONDecodeError:
-                pass  # If we can't parse, proceed with trigger
-        
         workflow = get_workflow_file(app)
         
         # Map platform to build_platforms input
@@ -86,383 +159,816 @@ def trigger_app_build(app, platform):
         }
         platforms_input = platform_map.get(platform, platform)
         
-        cmd = f'{GH_CLI} workflow run {workflow} --repo LuckyJackpotCasino/{app} -f build_platforms="{platforms_input}" 2>&1'
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=30)
+        inputs = {'build_platforms': platforms_input}
+        if runner_label:
+            inputs['runner_label'] = runner_label
+        try:
+            get_client().dispatch_workflow(app, workflow, inputs)
+        except GitHubAPIError as e:
+            if not runner_label or e.status != 422:
+                raise
+            log.warning("⚠️  %s workflow rejected runner_label (%s) - dispatching to any runner", app, e.message)
+            runner_label = None
+            get_client().dispatch_workflow(app, workflow, {'build_platforms': platforms_input})
         
-        if result.returncode == 0:
-            print(f"✅ Triggered {app} ({platform})", flush=True)
-            # Clear cache for this app so next status check fetches fresh data
-            if app in cache:
-                del cache[app]
-            if app in cache_time:
-                del cache_time[app]
-            return {'success': True, 'app': app, 'platform': platform}
-        else:
-            return {'success': False, 'error': result.stderr or result.stdout}
+        log.info("✅ Triggered %s (%s)%s", app, platform, f' on {runner_label}' if runner_label else '')
+        # Mark snapshot stale so the poller fetches fresh data on its next tick
+        status_store.invalidate(app)
+        return {'success': True, 'app': app, 'platform': platform, 'runnerLabel': runner_label}
+    except GitHubAPIError as e:
+        note_rate_limit(e)
+        return {'success': False, 'error': e.message}
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
 def cancel_app_build(app, run_id):
     """Cancel a running build for an app"""
     try:
-        cmd = f'{GH_CLI} run cancel {run_id} --repo LuckyJackpotCasino/{app} 2>&1'
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=30)
+        get_client().cancel_run(app, run_id)
         
-        if result.returncode == 0:
-            # Clear cache for this app
-            if app in cache:
-                del cache[app]
-            if app in cache_time:
-                del cache_time[app]
-            return {'success': True, 'app': app, 'run_id': run_id}
-        else:
-            return {'success': False, 'error': result.stderr or result.stdout}
+        # Mark snapshot stale so the poller picks up the cancellation
+        status_store.invalidate(app)
+        return {'success': True, 'app': app, 'run_id': run_id}
+    except GitHubAPIError as e:
+        note_rate_limit(e)
+        return {'success': False, 'error': e.message}
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def check_local_build_status(app):
-    """Check if this app is currently building on any runner"""
-    print(f"[LOCAL-CHECK] Checking if {app} is building...", flush=True)
-    try:
-        # Use runner status to determine if app is actively building
-        runner_data = get_runner_status()
-        
-        for runner in runner_data.get('runners', []):
-            if runner.get('busy') and runner.get('project') == app:
-                print(f"[LOCAL] ⚡ {app} is BUILDING on {runner.get('name')}", flush=True)
-                # App is actively building - mark iOS as in_progress (assume iOS build)
-                # TODO: Could check workflow file or job details for actual platform
-                return {'ios': 'in_progress'}
-        
-        print(f"[LOCAL-CHECK] {app} is not currently building on any runner", flush=True)
+def check_local_build_status(app, runners):
+    """Check if this app is currently building on any runner in the given RunnerSnapshot.
+
+    Returns the platform fields for the running job (from the job message in the
+    runner's Worker log), or None if the app isn't building or the job's platform
+    isn't known yet.
+    """
+    runner = runners.runner_for(app)
+    if not runner:
         return None
-    except Exception as e:
-        print(f"[LOCAL-CHECK] Error checking local status for {app}: {e}", flush=True)
+    
+    platform = platform_for_job(runner.get('job') or '')
+    if not platform:
+        what = f"job '{runner['job']}'" if runner.get('job') else 'job not identified yet'
+        log.debug("[LOCAL] %s is busy on %s (%s) - leaving status to the API", app, runner['name'], what)
         return None
+    
+    log.debug("[LOCAL] ⚡ %s is BUILDING %s (run %s) on %s", app, platform, runner.get('runId'), runner['name'])
+    return {
+        platform: 'in_progress',
+        f'{platform}Run': runner.get('runNumber'),
+        f'{platform}RunId': runner.get('runId')
+    }
+
+def default_status():
+    """Status reported for an app before any build has been found"""
+    return {'ios': 'pending', 'aab': 'pending', 'amazon': 'pending', 'windows': 'pending'}
+
+def has_unstable_status(status):
+    """True if any platform is queued/in progress and should be refreshed more often"""
+    return any(
+        status.get(platform) in ['queued', 'in_progress', 'waiting']
+        for platform in ['ios', 'aab', 'amazon', 'windows']
+    )
+
+def platform_fields(status, platform):
+    """The (state, run number, run id) a status dict holds for one platform"""
+    return status.get(platform), status.get(f'{platform}Run'), status.get(f'{platform}RunId')
+
+class StatusStore:
+    """Per-app build status snapshots, kept warm by the background poller.
+
+    HTTP handlers only ever read from here, so every status request is an
+    in-memory lookup. Each snapshot records when it was taken and which
+    refresh (or webhook event) produced it.
+    """
+
+    def __init__(self, on_change=None):
+        self._lock = threading.Lock()
+        self.on_change = on_change  # Called with (app, {key: new value}) after each change
+        self._snapshots = {}  # {app: {'status': dict, 'updated_at': ts, 'refresh_id': int, 'source': str}}
+        self._checked_at = {}  # {app: timestamp of last refresh attempt, successful or not}
+        self._stale = set()  # Apps invalidated by a trigger/cancel/job completion
+        self._refresh_counter = 0
+        self._run_numbers = {}  # {run_id: run_number} learned from workflow_run events
+        self.last_webhook_at = 0
+
+    def begin_refresh(self):
+        """Allocate an id for a new refresh pass"""
+        with self._lock:
+            self._refresh_counter += 1
+            return self._refresh_counter
+
+    def put(self, app, status, refresh_id, started_at=None):
+        """Store a freshly fetched status for an app.
+
+        If webhook events updated the app after the refresh started, their
+        newer per-platform runs are kept rather than overwritten.
+        """
+        now = time.time()
+        with self._lock:
+            existing = self._snapshots.get(app)
+            if existing and started_at and existing['source'] == 'webhook' and existing['updated_at'] > started_at:
+                status = status.copy()
+                for platform in ['ios', 'aab', 'amazon', 'windows']:
+                    state, run_number, run_id = platform_fields(existing['status'], platform)
+                    if run_id and run_id >= (status.get(f'{platform}RunId') or 0):
+                        status[platform] = state
+                        status[f'{platform}Run'] = run_number
+                        status[f'{platform}RunId'] = run_id
+            changes = self._replace(app, status, refresh_id, 'poll')
+            self._checked_at[app] = now
+            self._stale.discard(app)
+        self._notify(app, changes)
+
+    def _replace(self, app, status, refresh_id, source):
+        """Swap in a new snapshot (lock held) and return the status keys that changed"""
+        previous = self._snapshots.get(app)
+        previous_status = previous['status'] if previous else {}
+        self._snapshots[app] = {
+            'status': status,
+            'updated_at': time.time(),
+            'refresh_id': refresh_id,
+            'source': source
+        }
+        return {key: value for key, value in status.items() if previous_status.get(key) != value}
+
+    def _notify(self, app, changes):
+        if changes and self.on_change:
+            self.on_change(app, changes)
+
+    def note_run(self, run_id, run_number):
+        """Remember a run's display number (job events only carry the run id)"""
+        with self._lock:
+            self._run_numbers[run_id] = run_number
+            self.last_webhook_at = time.time()
+
+    def apply_job_event(self, app, platform, run_id, state):
+        """Apply one workflow_job event to the app's snapshot.
+
+        Keeps the poller's semantics: the most recent non-skipped job per
+        platform wins, and a skipped job only shows if nothing else has run.
+        Returns False if the event was older than what we already have.
+        """
+        with self._lock:
+            self.last_webhook_at = time.time()
+            snapshot = self._snapshots.get(app)
+            status = dict(snapshot['status']) if snapshot else default_status()
+            current_state, current_number, current_run_id = platform_fields(status, platform)
+            
+            if state == 'skipped':
+                if current_run_id and current_state != 'skipped':
+                    return False
+            elif current_run_id and run_id < current_run_id and current_state != 'skipped':
+                return False
+            
+            status[platform] = state
+            status[f'{platform}RunId'] = run_id
+            if run_id in self._run_numbers:
+                status[f'{platform}Run'] = self._run_numbers[run_id]
+            elif current_run_id != run_id:
+                # Run number unknown until the poller reconciles
+                status[f'{platform}Run'] = None
+                self._stale.add(app)
+            
+            changes = self._replace(app, status, snapshot['refresh_id'] if snapshot else None, 'webhook')
+        self._notify(app, changes)
+        return True
+
+    def seed(self, app, status):
+        """Load a status from the build history at startup; the app stays due for a refresh"""
+        with self._lock:
+            if app in self._snapshots:
+                return
+            changes = self._replace(app, status, None, 'history')
+        self._notify(app, changes)
+
+    def mark_checked(self, app):
+        """Record a failed refresh attempt so the app isn't retried every tick"""
+        with self._lock:
+            self._checked_at[app] = time.time()
+            self._stale.discard(app)
+
+    def invalidate(self, app):
+        """Force the app to be refreshed on the poller's next tick"""
+        with self._lock:
+            self._stale.add(app)
+
+    def get(self, app):
+        """Return a copy of the app's snapshot, annotated with its age and source"""
+        with self._lock:
+            snapshot = self._snapshots.get(app)
+        instruments.cache('status_snapshot', snapshot is not None)
+        if snapshot is None:
+            status = default_status()
+            status['snapshotAge'] = None
+            status['refreshId'] = None
+            status['snapshotSource'] = None
+        else:
+            status = snapshot['status'].copy()
+            status['snapshotAge'] = round(time.time() - snapshot['updated_at'], 1)
+            status['refreshId'] = snapshot['refresh_id']
+            status['snapshotSource'] = snapshot['source']
+        if is_rate_limited():
+            status['rate_limited'] = True
+        return status
+
+    def current(self, app):
+        """Return the raw status from the app's last snapshot, or None"""
+        with self._lock:
+            snapshot = self._snapshots.get(app)
+        return snapshot['status'].copy() if snapshot else None
+
+    def webhooks_live(self):
+        """True if webhook events are arriving, so polling only needs to reconcile"""
+        return time.time() - self.last_webhook_at < WEBHOOK_ACTIVE_WINDOW
+
+    def due_apps(self, app_names):
+        """Apps whose snapshot is missing, invalidated, or older than its refresh interval"""
+        now = time.time()
+        webhooks_live = self.webhooks_live()
+        due = []
+        with self._lock:
+            for app in app_names:
+                snapshot = self._snapshots.get(app)
+                if app in self._stale or app not in self._checked_at:
+                    due.append(app)
+                    continue
+                if snapshot is None or has_unstable_status(snapshot['status']):
+                    interval = ACTIVE_REFRESH_INTERVAL
+                else:
+                    interval = CACHE_DURATION
+                if webhooks_live:
+                    interval = max(interval, RECONCILE_INTERVAL)
+                if now - self._checked_at.get(app, 0) >= interval:
+                    due.append(app)
+        return due
+
+class EventHub:
+    """Sequenced feed of state changes for Server-Sent Events clients.
+
+    Keeps the last EVENT_HISTORY events so a reconnecting client can resume
+    from its Last-Event-ID instead of reloading everything.
+    """
+
+    def __init__(self, history=EVENT_HISTORY):
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=history)  # [(id, event, data)]
+        self._last_id = 0
+        self.closed = False
+
+    @property
+    def last_id(self):
+        with self._cond:
+            return self._last_id
+
+    def publish(self, event, data):
+        with self._cond:
+            self._last_id += 1
+            self._events.append((self._last_id, event, data))
+            self._cond.notify_all()
+
+    def since(self, last_id):
+        """Events after last_id, or None if some of them were already dropped"""
+        with self._cond:
+            if last_id > self._last_id:
+                return None
+            if self._events and last_id < self._events[0][0] - 1:
+                return None
+            if not self._events and last_id < self._last_id:
+                return None
+            return [e for e in self._events if e[0] > last_id]
+
+    def wait(self, last_id, timeout):
+        """Block until there are events after last_id (or timeout), then return them"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._last_id > last_id or self.closed, timeout)
+        return self.since(last_id)
+
+    def close(self):
+        """Wake every waiting stream so it can end (server shutdown)"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+event_hub = EventHub()
+
+def publish_status_change(app, changes):
+    """Status store callback: push the change to the event stream and let queued builds re-check capacity"""
+    event_hub.publish('status', {'app': app, 'changes': changes})
+    scheduler.wake()
+
+status_store = StatusStore(on_change=publish_status_change)
 
 def get_build_status(app):
-    """Fetch build status for an app from GitHub Actions"""
-    global rate_limited_until
+    """Return the latest status snapshot for an app (never blocks on GitHub)"""
+    return status_store.get(app)
+
+def fetch_run_jobs(app, run_id):
+    """Fetch the jobs of one workflow run, or None if the lookup failed"""
+    try:
+        return get_client().list_jobs(app, run_id)
+    except GitHubAPIError as e:
+        note_rate_limit(e)
+        return None
+    except OSError as e:
+        log.warning("[JOBS] Error fetching jobs for %s run %s: %s", app, run_id, e)
+        return None
+
+def resolve_platform_status(run_jobs):
+    """Find the most recent status for EACH platform.
+
+    `run_jobs` yields (run_id, run_number, jobs) newest run first; jobs may be
+    None if the lookup failed. Prefers non-skipped builds, but falls back to
+    skipped if that's all we have. Stops consuming runs once every platform
+    has a non-skipped build.
+    """
+    status = {
+        'ios': 'pending',
+        'aab': 'pending',
+        'amazon': 'pending',
+        'windows': 'pending',
+        'iosRun': None,
+        'aabRun': None,
+        'amazonRun': None,
+        'windowsRun': None,
+        'iosRunId': None,
+        'aabRunId': None,
+        'amazonRunId': None,
+        'windowsRunId': None
+    }
+    
+    # Track skipped builds as fallback (in case we don't find any non-skipped builds)
+    skipped_fallback = {
+        'ios': None,
+        'aab': None,
+        'amazon': None,
+        'windows': None
+    }
+    
+    for run_id, run_number, jobs in run_jobs:
+        if jobs is not None:
+            for job in jobs:
+                platform = platform_for_job(job.get('name', ''))
+                if not platform:
+                    continue
+                
+                job_status = job.get('conclusion') if job.get('status') == 'completed' else job.get('status')
+                job_conclusion = job.get('conclusion')
+                
+                # Store as fallback if skipped (only if we don't have a fallback yet)
+                if job_conclusion == 'skipped':
+                    if skipped_fallback[platform] is None:
+                        skipped_fallback[platform] = {
+                            'status': 'skipped',
+                            'run_number': run_number,
+                            'run_id': run_id
+                        }
+                    continue
+                
+                # Store actual build status (only if we haven't found one yet for this platform)
+                if status[f'{platform}Run'] is None:
+                    status[platform] = job_status or 'unknown'
+                    status[f'{platform}Run'] = run_number  # Display number
+                    status[f'{platform}RunId'] = run_id    # API ID
+        
+        # Early exit if we've already found all 4 platforms (non-skipped)
+        if status['iosRun'] and status['aabRun'] and status['amazonRun'] and status['windowsRun']:
+            break
+    
+    # Apply fallbacks for platforms where we found no actual builds
+    for platform in ['ios', 'aab', 'amazon', 'windows']:
+        if status[f'{platform}Run'] is None and skipped_fallback[platform]:
+            fb = skipped_fallback[platform]
+            status[platform] = fb['status']
+            status[f'{platform}Run'] = fb['run_number']
+            status[f'{platform}RunId'] = fb['run_id']
     
+    return status
+
+def local_override(app, runners):
+    """Status to report if the app is building on a local runner, else None"""
     # First check local runner status for instant feedback
-    local_status = check_local_build_status(app)
-    
-    # If local shows in_progress, ALWAYS return that immediately (don't use cache)
-    if local_status and any(status == 'in_progress' for status in local_status.values()):
-        print(f"[OVERRIDE] {app} is building locally - showing in_progress", flush=True)
-        # Still fetch from cache for other platforms, but override in_progress ones
-        if app in cache:
-            cached = cache[app].copy()
-            for platform, local_state in local_status.items():
-                if local_state == 'in_progress':
-                    cached[platform] = 'in_progress'
-            return cached
-        # No cache, return local status with pending for others
-        result = {'ios': 'pending', 'aab': 'pending', 'amazon': 'pending', 'windows': 'pending'}
+    local_status = check_local_build_status(app, runners)
+    
+    # If a platform is building locally, report that without going to the API
+    if local_status:
+        log.debug("[OVERRIDE] %s is building locally - showing in_progress", app)
+        # Keep last known state for other platforms, but override the building one and its run
+        result = status_store.current(app) or default_status()
         result.update(local_status)
         return result
-    
-    # If rate limited, return stale cache with indicator
-    if time.time() < rate_limited_until:
-        if app in cache:
-            status = cache[app].copy()
-            status['rate_limited'] = True
-            return status
-        return {'ios': 'pending', 'aab': 'pending', 'amazon': 'pending', 'windows': 'pending', 'rate_limited': True}
-    
-    # Smart cache: use cache UNLESS status suggests it might be stale
-    if app in cache and app in cache_time:
-        cache_age = time.time() - cache_time[app]
-        
-        # If cache shows "queued" or "in_progress", refresh more frequently (30 sec)
-        # If cache shows stable status (success/failure), use full cache duration (5 min)
-        cached = cache[app]
-        has_unstable_status = any(
-            status in ['queued', 'in_progress', 'waiting'] 
-            for status in [cached.get('ios'), cached.get('aab'), cached.get('amazon')]
-        )
-        
-        cache_duration = 30 if has_unstable_status else CACHE_DURATION
-        
-        if cache_age < cache_duration:
-            print(f"[CACHE] Using {cache_age:.0f}s old cache for {app} (max: {cache_duration}s)", flush=True)
-            return cached.copy()
+    return None
+
+def fetch_build_status(app, runners):
+    """Fetch build status for an app from GitHub Actions (list runs, then jobs per run).
+
+    Called from the background poller only, with the tick's RunnerSnapshot.
+    Returns None if the status could not be fetched, in which case the
+    previous snapshot is kept.
+    """
+    override = local_override(app, runners)
+    if override:
+        return override
     
     try:
-        # Get recent workflow runs - check MORE runs to find last actual build per platform
-        cmd = f"{GH_CLI} run list --repo LuckyJackpotCasino/{app} --limit 25 --json status,conclusion,databaseId,number 2>/dev/null"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=10)
+        # Page in runs newer than the history's high-water mark; jobs are only
+        # looked up (in parallel) for runs that changed since they were stored
+        history.sync(app, get_client(), map_fn=job_lookup_pool.map, fetch_jobs=fetch_run_jobs)
         
-        if result.returncode != 0 or not result.stdout.strip():
-            return {'ios': 'pending', 'aab': 'pending', 'amazon': 'pending', 'windows': 'pending'}
-        
-        runs = json.loads(result.stdout)
-        status = {
-            'ios': 'pending',
-            'aab': 'pending',
-            'amazon': 'pending',
-            'windows': 'pending',
-            'iosRun': None,
-            'aabRun': None,
-            'amazonRun': None,
-            'windowsRun': None,
-            'iosRunId': None,
-            'aabRunId': None,
-            'amazonRunId': None,
-            'windowsRunId': None
-        }
+        # Then resolve from the stored runs with an indexed query
+        status = resolve_platform_status(history.recent_run_jobs(app, RUNS_TO_SCAN))
         
-        # Track skipped builds as fallback (in case we don't find any non-skipped builds)
-        skipped_fallback = {
-            'ios': None,
-            'aab': None,
-            'amazon': None,
-            'windows': None
-        }
-        
-        # Check each run's jobs to find the most recent status for EACH platform
-        # Prefer non-skipped builds, but fall back to skipped if that's all we have
-        # OPTIMIZATION: Stop early if we've found all 3 platforms
-        for run in runs[:10]:  # Reduced from 25 to 10 for performance
-            run_id = run['databaseId']
-            run_number = run.get('number', run_id)  # Use run_number if available, fallback to databaseId
-            run_status = run['status']
-            
-            # Early exit if we've already found all 4 platforms (non-skipped)
-            if status['iosRun'] and status['aabRun'] and status['amazonRun'] and status['windowsRun']:
-                break
-            
-            # Get jobs for this run to see which platforms were built
-            jobs_cmd = f"{GH_CLI} run view {run_id} --repo LuckyJackpotCasino/{app} --json jobs 2>/dev/null"
-            jobs_result = subprocess.run(jobs_cmd, shell=True, capture_output=True, text=True, timeout=5)
-            
-            if jobs_result.returncode == 0 and jobs_result.stdout.strip():
-                try:
-                    run_data = json.loads(jobs_result.stdout)
-                    jobs = run_data.get('jobs', [])
-                    
-                    for job in jobs:
-                        job_name = job.get('name', '').lower()
-                        job_status = job.get('conclusion') if job.get('status') == 'completed' else job.get('status')
-                        job_conclusion = job.get('conclusion')
-                        
-                        # Skip setup jobs
-                        if job_name == 'setup':
-                            continue
-                        
-                        # Detect platform from job name
-                        platform = None
-                        if 'build-ios' in job_name or 'ios' in job_name:
-                            platform = 'ios'
-                        elif 'build-aab' in job_name or 'aab' in job_name:
-                            platform = 'aab'
-                        elif 'build-amazon' in job_name or 'amazon' in job_name:
-                            platform = 'amazon'
-                        elif 'build-windows' in job_name or 'windows' in job_name:
-                            platform = 'windows'
-                        
-                        if not platform:
-                            continue
-                        
-                        # Store as fallback if skipped (only if we don't have a fallback yet)
-                        if job_conclusion == 'skipped':
-                            if skipped_fallback[platform] is None:
-                                skipped_fallback[platform] = {
-                                    'status': 'skipped',
-                                    'run_number': run_number,
-                                    'run_id': run_id
-                                }
-                            continue
-                        
-                        # Store actual build status (only if we haven't found one yet for this platform)
-                        if status[f'{platform}Run'] is None:
-                            status[platform] = job_status or 'unknown'
-                            status[f'{platform}Run'] = run_number  # Display number
-                            status[f'{platform}RunId'] = run_id    # API ID
-                except:
-                    pass
-        
-        # Apply fallbacks for platforms where we found no actual builds
-        for platform in ['ios', 'aab', 'amazon', 'windows']:
-            if status[f'{platform}Run'] is None and skipped_fallback[platform]:
-                fb = skipped_fallback[platform]
-                status[platform] = fb['status']
-                status[f'{platform}Run'] = fb['run_number']
-                status[f'{platform}RunId'] = fb['run_id']
-        
-        cache[app] = status
-        cache_time[app] = time.time()
-        
-        # Log cache update for debugging
-        print(f"[{time.strftime('%H:%M:%S')}] Cached status for {app}", flush=True)
+        log.debug("[POLLER] Refreshed status for %s", app)
         return status
         
+    except GitHubAPIError as e:
+        log.warning("Error fetching %s: %s", app, e)
+        note_rate_limit(e)
+        # Keep the previous snapshot
+        return None
     except Exception as e:
-        error_msg = str(e)
-        print(f"Error fetching {app}: {error_msg}", flush=True)
-        
-        # Detect rate limiting
-        if 'rate limit' in error_msg.lower() or 'API rate limit exceeded' in error_msg:
-            print(f"⚠️  RATE LIMITED! Pausing API calls for 1 hour", flush=True)
-            rate_limited_until = time.time() + 3600  # Pause for 1 hour
-        
-        # Return stale cache if available
-        if app in cache:
-            return cache[app]
-        return {'ios': 'pending', 'aab': 'pending', 'amazon': 'pending', 'windows': 'pending'}
+        log.warning("Error fetching %s: %s", app, e)
+        # Keep the previous snapshot
+        return None
 
-def get_runner_status():
-    """Fetch status of all GitHub Actions runners from local system"""
-    global runner_states
-    
+# One GraphQL query resolves every app: the newest workflow runs (check suites
+# created by GitHub Actions) on recent default-branch commits, with their jobs.
+# GraphQL has no repository-wide list of workflow runs, so unlike the REST path
+# (the newest runs on any branch) it can't see builds of other branches; apps
+# with such a build among their recent runs are refreshed over REST instead
+GRAPHQL_REPO_FRAGMENT = """
+  %(alias)s: repository(owner: "LuckyJackpotCasino", name: "%(app)s") {
+    defaultBranchRef {
+      name
+      target {
+        ... on Commit {
+          history(first: %(commits)d) {
+            nodes {
+              checkSuites(last: %(runs)d, filterBy: {appId: %(actions_app_id)d}) {
+                nodes {
+                  status conclusion
+                  workflowRun { databaseId runNumber event createdAt updatedAt }
+                  checkRuns(first: 20) { nodes { databaseId name status conclusion startedAt completedAt } }
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }"""
+GITHUB_ACTIONS_APP_ID = 15368
+GRAPHQL_COMMITS_TO_SCAN = 5
+default_branches = {}  # {app: default branch name}, learned from GraphQL responses
+
+def builds_off_default_branch(app):
+    """Whether any of the app's recent runs (webhooks, REST syncs) built another branch than the default"""
+    branch = default_branches.get(app)
+    if not branch:
+        return False
     try:
-        runners = []
-        base_dir = os.path.expanduser('~/actions-runners')
-        completed_jobs = []  # Track jobs that just completed
-        
-        # Look for mac-studio-runner directories
-        if not os.path.exists(base_dir):
-            return {'error': 'Runners directory not found', 'total': 0, 'online': 0, 'busy': 0, 'idle': 0, 'runners': []}
-        
-        for item in os.listdir(base_dir):
-            if item.startswith('mac-studio-runner'):
-                runner_dir = os.path.join(base_dir, item)
-                if os.path.isdir(runner_dir):
-                    # Check if service is running via svc.sh status
-                    try:
-                        status_cmd = f"cd {runner_dir} && ./svc.sh status 2>&1"
-                        result = subprocess.run(status_cmd, shell=True, capture_output=True, text=True, timeout=5)
-                        output = result.stdout.lower()
-                        
-                        print(f"[RUNNER-DEBUG] {item}: output='{output[:100]}'", flush=True)
-                        
-                        # Parse status from output
-                        is_running = 'started:' in output or 'running' in output
-                        
-                        print(f"[RUNNER-DEBUG] {item}: is_running={is_running}", flush=True)
-                        
-                        # Check if busy and get project name
-                        is_busy = False
-                        project_name = None
-                        
-                        work_dir = os.path.join(runner_dir, '_work')
-                        if os.path.exists(work_dir):
-                            # Get the most recent Worker log
-                            diag_dir = os.path.join(runner_dir, '_diag')
-                            if os.path.exists(diag_dir):
-                                worker_logs = [f for f in os.listdir(diag_dir) if f.startswith('Worker_')]
-                                if worker_logs:
-                                    latest_log = max(worker_logs, key=lambda f: os.path.getmtime(os.path.join(diag_dir, f)))
-                                    log_path = os.path.join(diag_dir, latest_log)
-                                    # Check if log was modified in last 2 minutes (indicates active job)
-                                    mtime = os.path.getmtime(log_path)
-                                    if time.time() - mtime < 120:
-                                        is_busy = True
-                                        
-                                        # Try to extract project name from log
-                                        try:
-                                            with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
-                                                # Read last 1000 lines to find job info
-                                                lines = f.readlines()[-1000:]
-                                                
-                                                # Get valid app names
-                                                app_names = [app['name'] for app in apps]
-                                                
-                                                for line in reversed(lines):
-                                                    if 'LuckyJackpotCasino/' in line:
-                                                        import re
-                                                        match = re.search(r'LuckyJackpotCasino/([a-z0-9\-]+)(?:\s|/|$|\.git)', line, re.IGNORECASE)
-                                                        if match:
-                                                            candidate = match.group(1)
-                                                            if candidate in app_names:
-                                                                project_name = candidate
-                                                                print(f"[DEBUG] Found project in log (most recent): {project_name}", flush=True)
-                                                                break
-                                                
-                                                # project_name is set; inner loop already exited via break
-                                        except Exception as log_err:
-                                                            print(f"Error reading log {log_path}: {log_err}", flush=True)
-                            
-                            # If still no project name, check work directory for repos
-                            if is_busy and not project_name:
-                                try:
-                                    work_items = os.listdir(work_dir)
-                                    # Filter out metadata directories
-                                    repos = [d for d in work_items if not d.startswith('_') and os.path.isdir(os.path.join(work_dir, d))]
-                                    if repos:
-                                        # Get most recently modified repo directory
-                                        repos_with_mtime = [(d, os.path.getmtime(os.path.join(work_dir, d))) for d in repos]
-                                        if repos_with_mtime:
-                                            project_name = max(repos_with_mtime, key=lambda x: x[1])[0]
-                                except:
-                                    pass
-                        
-                        # Detect job completion: was busy, now idle
-                        runner_name = item
-                        previous_state = runner_states.get(runner_name, {})
-                        
-                        if previous_state.get('busy') and not is_busy:
-                            # Runner just finished a job!
-                            completed_project = previous_state.get('project')
-                            if completed_project:
-                                completed_jobs.append(completed_project)
-                                print(f"🎯 [JOB COMPLETE] {runner_name} just finished building {completed_project}! Clearing cache...", flush=True)
-                                # Clear cache for this app to force immediate refresh
-                                if completed_project in cache:
-                                    del cache[completed_project]
-                                if completed_project in cache_time:
-                                    del cache_time[completed_project]
-                        
-                        # Update runner state tracking
-                        runner_states[runner_name] = {
-                            'busy': is_busy,
-                            'project': project_name,
-                            'last_check': time.time()
-                        }
-                        
-                        runners.append({
-                            'id': hash(item),
-                            'name': item,
-                            'status': 'online' if is_running else 'offline',
-                            'busy': is_busy,
-                            'project': project_name,
-                            'labels': ['macos', 'self-hosted', 'mac-studio-runner']
-                        })
-                    except Exception as e:
-                        print(f"Error checking {item}: {e}", flush=True)
-                        runners.append({
-                            'id': hash(item),
-                            'name': item,
-                            'status': 'unknown',
-                            'busy': False,
-                            'project': None,
-                            'labels': ['macos', 'self-hosted', 'mac-studio-runner']
-                        })
-        
-        # Calculate stats
-        total = len(runners)
-        online = len([r for r in runners if r['status'] == 'online'])
-        busy = len([r for r in runners if r.get('busy') == True])
-        idle = online - busy
-        
-        result = {
-            'total': total,
-            'online': online,
-            'busy': busy,
-            'idle': idle,
-            'runners': runners,
-            'completed_jobs': completed_jobs  # Include list of just-completed jobs
+        return any(b != branch for b in history.recent_branches(app, RUNS_TO_SCAN))
+    except Exception as e:
+        log.warning("[HISTORY] Error reading %s branches: %s", app, e)
+        return False
+
+def fetch_build_statuses_graphql(app_names):
+    """Resolve the status of several apps with a single GraphQL request.
+
+    Returns {app: status}; raises GitHubAPIError if the query fails.
+    """
+    fragments = [
+        GRAPHQL_REPO_FRAGMENT % {
+            'alias': f'app{i}',
+            'app': app,
+            'commits': GRAPHQL_COMMITS_TO_SCAN,
+            'runs': RUNS_TO_SCAN,
+            'actions_app_id': GITHUB_ACTIONS_APP_ID
         }
+        for i, app in enumerate(app_names)
+    ]
+    query = 'query {%s\n  rateLimit { cost remaining }\n}' % ''.join(fragments)
+    data = get_client().graphql(query)
+    
+    global last_graphql_cost
+    last_graphql_cost = (data.get('rateLimit') or {}).get('cost')
+    
+    results = {}
+    for i, app in enumerate(app_names):
+        runs = {}
+        run_rows = {}
+        repo = data.get(f'app{i}') or {}
+        branch = repo.get('defaultBranchRef') or {}
+        if branch.get('name'):
+            default_branches[app] = branch['name']
+        target = branch.get('target') or {}
+        for commit in ((target.get('history') or {}).get('nodes') or []):
+            for suite in ((commit.get('checkSuites') or {}).get('nodes') or []):
+                run = suite.get('workflowRun')
+                if not run:
+                    continue
+                jobs = [
+                    {
+                        'id': check.get('databaseId'),
+                        'name': check.get('name', ''),
+                        'status': (check.get('status') or '').lower(),
+                        'conclusion': (check.get('conclusion') or '').lower() or None,
+                        'started_at': check.get('startedAt'),
+                        'completed_at': check.get('completedAt')
+                    }
+                    for check in ((suite.get('checkRuns') or {}).get('nodes') or [])
+                ]
+                runs[run['databaseId']] = (run['databaseId'], run.get('runNumber', run['databaseId']), jobs)
+                run_rows[run['databaseId']] = {
+                    'id': run['databaseId'],
+                    'run_number': run.get('runNumber'),
+                    'event': run.get('event'),
+                    'head_branch': branch.get('name'),
+                    'status': (suite.get('status') or '').lower() or None,
+                    'conclusion': (suite.get('conclusion') or '').lower() or None,
+                    'created_at': run.get('createdAt'),
+                    'updated_at': run.get('updatedAt')
+                }
         
-        print(f"[RUNNER-RESULT] Returning {total} runners: {online} online, {busy} busy", flush=True)
+        # Newest run first, as many as the REST path (but default branch only)
+        newest = [runs[run_id] for run_id in sorted(runs, reverse=True)[:RUNS_TO_SCAN]]
+        results[app] = resolve_platform_status(newest)
+        record_graphql_history(app, [run_rows[run_id] for run_id, _, _ in newest], newest)
+    
+    return results
+
+def record_graphql_history(app, run_rows, run_jobs):
+    """Store runs/jobs seen by a GraphQL refresh so history stays current in either mode"""
+    try:
+        history.record_runs(app, run_rows)
+        synced = history.jobs_synced(app, [run['id'] for run in run_rows])
+        for run, (run_id, _, jobs) in zip(run_rows, run_jobs):
+            # Unchanged runs keep the jobs already stored (REST ones carry runner and queue times)
+            if synced.get(run_id) == run_signature(run):
+                continue
+            if jobs and all(job['id'] for job in jobs):
+                history.record_jobs(app, run_id, jobs, run_signature(run))
+    except Exception as e:
+        log.warning("[HISTORY] Error recording %s: %s", app, e)
+
+def refresh_statuses(due, runners=None):
+    """Fetch fresh statuses for the due apps using the configured STATUS_MODE.
+
+    All apps are checked against one RunnerSnapshot (the monitor's current one
+    by default). Returns ({app: status or None}, mode that ran) - the mode is
+    'graphql-fallback' when the GraphQL query failed and REST refreshed the apps.
+    """
+    runners = runners or runner_monitor.snapshot()
+    results = {}
+    remaining = list(due)
+    mode = STATUS_MODE
+    
+    if STATUS_MODE == 'graphql':
+        # Apps building on a local runner don't need the API at all
+        for app in due:
+            override = local_override(app, runners)
+            if override:
+                results[app] = override
+        # Apps building other branches too: only REST sees those runs
+        rest_apps = [app for app in due if app not in results and builds_off_default_branch(app)]
+        remaining = [app for app in due if app not in results and app not in rest_apps]
         
-        return result
+        if remaining:
+            try:
+                results.update(fetch_build_statuses_graphql(remaining))
+                log.debug("[POLLER] Refreshed status for %d apps via GraphQL", len(remaining))
+                remaining = []
+            except GitHubAPIError as e:
+                log.warning("[POLLER] GraphQL refresh failed (%s) - falling back to REST", e)
+                note_rate_limit(e)
+                if e.rate_limited:
+                    return {app: results.get(app) for app in due}, mode
+                mode = 'graphql-fallback'
+            except Exception as e:
+                log.warning("[POLLER] GraphQL refresh failed (%s) - falling back to REST", e)
+                mode = 'graphql-fallback'
+        remaining += rest_apps
+    
+    # REST: refresh apps in parallel; API calls share the client's connection cap
+    refreshes = {app: app_refresh_pool.submit(fetch_build_status, app, runners) for app in remaining}
+    for app, refresh in refreshes.items():
+        results[app] = refresh.result()
+    return results, mode
+
+def record_refresh_budget(mode, app_count, requests, not_modified=0):
+    """Remember how many API requests a refresh pass cost, scaled to all apps.
+
+    304 Not Modified answers don't count against the primary rate limit, so
+    they're reported separately from the requests that used quota.
+    """
+    scale = len(apps) / app_count if app_count else 0
+    entry = {
+        'apps': app_count,
+        'requests': requests,
+        'notModified': not_modified,
+        'requestsPerFullRefresh': round(requests * scale, 1),
+        'quotaPerFullRefresh': round((requests - not_modified) * scale, 1),
+        'at': time.time()
+    }
+    if mode == 'graphql':
+        entry['graphqlCost'] = last_graphql_cost
+    # Publish the finished entry in one step; /api/budget reads it from handler threads
+    refresh_budget[mode] = entry
+
+def status_poller():
+    """Background loop that keeps every app's status snapshot warm"""
+    app_names = [app['name'] for app in apps]
+    
+    while True:
+        try:
+            # Don't touch the API while rate limited - handlers keep serving stale snapshots
+            if not is_rate_limited():
+                due = status_store.due_apps(app_names)
+                if due:
+                    refresh_id = status_store.begin_refresh()
+                    log.debug("[POLLER] Refresh #%s: %s", refresh_id, due)
+                    client = get_client()
+                    requests_before, not_modified_before = client.requests_made, client.not_modified
+                    started_at = time.time()
+                    # Runner state is read once per tick and shared by every app in it
+                    refresh_started = time.perf_counter()
+                    statuses, mode = refresh_statuses(due, runner_monitor.snapshot())
+                    # Recorded under the mode that ran, so a GraphQL failure's REST calls aren't billed to GraphQL
+                    instruments.observe('status_refresh_seconds', time.perf_counter() - refresh_started, mode=mode)
+                    instruments.count('status_refresh_apps_total', len(due), mode=mode)
+                    record_refresh_budget(mode, len(due), client.requests_made - requests_before,
+                                          client.not_modified - not_modified_before)
+                    for app, status in statuses.items():
+                        if status is None:
+                            status_store.mark_checked(app)
+                        else:
+                            status_store.put(app, status, refresh_id, started_at)
+        except Exception as e:
+            log.error("[POLLER] Error refreshing status: %s", e)
         
+        time.sleep(POLLER_TICK)
+
+def seed_statuses_from_history():
+    """Load every app's status from the build history (startup)"""
+    seeded = 0
+    for app in apps:
+        try:
+            run_jobs = history.recent_run_jobs(app['name'], RUNS_TO_SCAN)
+        except Exception as e:
+            log.warning("[HISTORY] Error reading %s: %s", app['name'], e)
+            continue
+        if run_jobs:
+            status_store.seed(app['name'], resolve_platform_status(run_jobs))
+            seeded += 1
+    log.info("[HISTORY] Loaded %d app statuses from %s", seeded, history.path)
+    try:
+        affinity.seed(history.last_runners())
+    except Exception as e:
+        log.warning("[HISTORY] Error reading last runners: %s", e)
+
+def budget_report():
+    """Run one full refresh in each status mode and print the API requests it cost"""
+    global STATUS_MODE, last_graphql_cost
+    app_names = [app['name'] for app in apps]
+    client = get_client()
+    
+    print(f"{'Mode':<16} {'Requests':>9} {'304s':>6} {'Quota used':>11} {'GraphQL cost':>13}")
+    # REST runs twice: the second pass revalidates the first pass's responses with ETags
+    for mode, label in [('rest', 'rest (cold)'), ('rest', 'rest (warm)'), ('graphql', 'graphql')]:
+        STATUS_MODE = mode
+        last_graphql_cost = None
+        before, not_modified_before = client.requests_made, client.not_modified
+        _, ran = refresh_statuses(app_names)
+        if ran != mode:
+            label = ran
+        spent = client.requests_made - before
+        not_modified = client.not_modified - not_modified_before
+        cost = last_graphql_cost if last_graphql_cost is not None else '-'
+        print(f"{label:<16} {spent:>9} {not_modified:>6} {spent - not_modified:>11} {cost:>13}")
+    
+    if client.response_cache is not None:
+        client.response_cache.save()
+
+def get_runner_status():
+    """Status of all GitHub Actions runners on this machine, in the /api/runners shape"""
+    return runner_monitor.snapshot().to_dict()
+
+def publish_runner_changes(changed, removed):
+    """Runner monitor callback: push runner changes to the event stream"""
+    event_hub.publish('runners', {'summary': runner_monitor.snapshot().summary(), 'changed': changed, 'removed': removed})
+    affinity.observe(changed)
+    scheduler.wake()
+
+def refresh_finished_job(runner, project):
+    """Runner monitor callback: a runner just finished a job, so refresh that app's status now"""
+    status_store.invalidate(project)
+
+runner_monitor = RunnerMonitor(
+    [app['name'] for app in apps],
+    on_change=publish_runner_changes,
+    on_job_complete=refresh_finished_job
+)
+
+# Every trigger (dashboard, bulk queue, auto-fix agent) is dispatched through here
+dispatcher = DispatchCoalescer(dispatch_build, status_store.current)
+
+# Which runner last built each app/platform (Unity Library cache), and the hit rate
+affinity = RunnerAffinity()
+
+# Bulk triggers queue here and are dispatched as runner capacity frees up
+scheduler = BuildScheduler(
+    [app['name'] for app in apps],
+    dispatch=trigger_app_build,
+    runners=runner_monitor.snapshot,
+    status=status_store.current,
+    estimate=metrics.build_time,
+    paused=is_rate_limited,
+    on_change=lambda: event_hub.publish('queue', scheduler.to_dict(batches=False)),
+    affinity=affinity
+)
+
+def verify_webhook_signature(body, signature):
+    """Check the X-Hub-Signature-256 header against our webhook secret"""
+    if not WEBHOOK_SECRET or not signature:
+        return False
+    expected = 'sha256=' + hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+def record_webhook_history(app, run=None, job=None):
+    """Write a webhook's run or job into the build history"""
+    try:
+        if run and run.get('id'):
+            history.record_runs(app, [run])
+        if job and job.get('id') and job.get('run_id'):
+            history.record_job(app, job)
     except Exception as e:
-        print(f"Error fetching runner status: {e}", flush=True)
-        return {'error': str(e), 'total': 0, 'online': 0, 'busy': 0, 'idle': 0, 'runners': []}
+        log.warning("[HISTORY] Error recording webhook for %s: %s", app, e)
+
+def handle_webhook_event(event, payload):
+    """Apply a workflow_run / workflow_job event to the status store.
+
+    Returns a short description of what happened (for the response/log).
+    """
+    app = (payload.get('repository') or {}).get('name')
+    if not any(a['name'] == app for a in apps):
+        return f'ignored: unknown repository {app}'
+    
+    if event == 'workflow_run':
+        run = payload.get('workflow_run') or {}
+        status_store.note_run(run.get('id'), run.get('run_number'))
+        record_webhook_history(app, run=run)
+        if payload.get('action') == 'completed':
+            # Reconcile against the API in case some job events went missing
+            status_store.invalidate(app)
+        return f"run {run.get('id')} {payload.get('action')}"
+    
+    if event == 'workflow_job':
+        job = payload.get('workflow_job') or {}
+        platform = platform_for_job(job.get('name', ''))
+        if not platform or not job.get('run_id'):
+            return f"ignored: job {job.get('name')}"
+        state = job.get('conclusion') if job.get('status') == 'completed' else job.get('status')
+        record_webhook_history(app, job=job)
+        applied = status_store.apply_job_event(app, platform, job.get('run_id'), state or 'unknown')
+        log.debug("[WEBHOOK] %s %s run %s: %s%s", app, platform, job.get('run_id'), state, '' if applied else ' (stale, ignored)')
+        return f"{platform} {state}" if applied else 'ignored: older than current snapshot'
+    
+    return f'ignored: {event} event'
+
+def endpoint_label(path):
+    """A request path as its route (/status/<app>), for metric labels; unknown paths are 'other'"""
+    for prefix, route in ROUTE_PREFIXES:
+        if path.startswith(prefix):
+            return route
+    return path if path in ROUTES else 'other'
 
 class DashboardHandler(http.server.SimpleHTTPRequestHandler):
+    # Socket timeout: a client that stops sending or reading is dropped instead of pinning a worker
+    timeout = REQUEST_TIMEOUT
+    status_code = None
+    
+    def handle_one_request(self):
+        """Handle one request, timing it by route and response status"""
+        self.status_code = None
+        started = time.perf_counter()
+        try:
+            super().handle_one_request()
+        finally:
+            if self.status_code is not None:
+                method = self.command if self.command in ('GET', 'POST', 'OPTIONS', 'HEAD') else 'other'
+                endpoint = endpoint_label(urlparse(getattr(self, 'path', '')).path)
+                elapsed = time.perf_counter() - started
+                if endpoint == '/api/events':
+                    # An event stream lasts as long as the tab stays open - kept out of the request latencies
+                    instruments.observe('sse_stream_seconds', elapsed, status=str(self.status_code))
+                else:
+                    instruments.observe('http_request_seconds', elapsed, method=method, endpoint=endpoint,
+                                        status=str(self.status_code))
+    
+    def send_response(self, code, message=None):
+        self.status_code = code
+        super().send_response(code, message)
+    
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
         self.send_response(200)
@@ -523,6 +1029,70 @@ class DashboardHandler(http.server.SimpleHTTPRequestHandler):
             self.wfile.write(json.dumps(results).encode())
             return
         
+        # API: Server-Sent Events stream of status/runner changes
+        if parsed_path.path == '/api/events':
+            self.stream_events()
+            return
+        
+        # API: GitHub requests spent per full refresh, per status mode
+        if parsed_path.path == '/api/budget':
+            budget = {
+                'mode': STATUS_MODE,
+                'apps': len(apps),
+                'lastRefresh': dict(refresh_budget),
+                'totalRequests': get_client().requests_made,
+                'totalNotModified': get_client().not_modified
+            }
+            
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(json.dumps(budget).encode())
+            return
+        
+        # API: Queue and build time percentiles from the build history
+        if parsed_path.path == '/api/metrics':
+            query = parse_qs(parsed_path.query)
+            window = query.get('window', [DEFAULT_METRICS_WINDOW])[0]
+            app_name = query.get('app', [None])[0]
+            if app_name and not any(app['name'] == app_name for app in apps):
+                self.send_error(404, 'App not found')
+                return
+            try:
+                summary = dict(metrics.summary(window, app_name), windows=METRICS_WINDOWS)
+            except ValueError as e:
+                self.send_response(400)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(json.dumps({'error': str(e)}).encode())
+                return
+            
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+            self.end_headers()
+            self.wfile.write(json.dumps(summary).encode())
+            return
+        
+        # API: Bulk build queue (all of it, or one batch)
+        if parsed_path.path == '/api/queue' or parsed_path.path.startswith('/api/queue/'):
+            batch_id = parsed_path.path[len('/api/queue/'):] if parsed_path.path.startswith('/api/queue/') else None
+            queue = scheduler.batch(batch_id) if batch_id else dict(scheduler.to_dict(), dispatch=dispatcher.to_dict())
+            if queue is None:
+                self.send_error(404, 'Batch not found')
+                return
+            
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+            self.end_headers()
+            self.wfile.write(json.dumps(queue).encode())
+            return
+        
         # API: Get runner status
         if parsed_path.path in ['/runners', '/api/runners']:
             runner_status = get_runner_status()
@@ -537,20 +1107,69 @@ class DashboardHandler(http.server.SimpleHTTPRequestHandler):
             self.wfile.write(json.dumps(runner_status).encode())
             return
         
+        # API: Internal metrics - handler, GitHub, subprocess and runner scan timings, cache hit/miss counts.
+        # Prometheus text for scrapers (?format=prometheus or Accept: text/plain), JSON otherwise
+        if parsed_path.path == '/api/internal/metrics':
+            fmt = parse_qs(parsed_path.query).get('format', [''])[0]
+            if fmt == 'prometheus' or (not fmt and 'text/plain' in self.headers.get('Accept', '')):
+                body = instruments.to_prometheus().encode()
+                content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            else:
+                body = json.dumps(instruments.to_dict()).encode()
+                content_type = 'application/json'
+            self.send_response(200)
+            self.send_header('Content-type', content_type)
+            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        
+        # API: The agent's failure fingerprints (how often an earlier analysis was reused, and the
+        # commonest failures) and its retries (which platforms were rebuilt and how those builds went)
+        if parsed_path.path in ['/api/agent/fingerprints', '/api/agent/retries']:
+            query = parse_qs(parsed_path.query)
+            window = query.get('window', [DEFAULT_METRICS_WINDOW])[0]
+            seconds = parse_window(window)
+            if parsed_path.path.endswith('/fingerprints'):
+                summarize, default_limit = history.fingerprint_summary, '10'
+            else:
+                summarize, default_limit = history.retry_summary, '20'
+            try:
+                limit = int(query.get('limit', [default_limit])[0])
+            except ValueError:
+                limit = 0
+            if seconds is None or not 0 < limit <= 100:
+                self.send_response(400)
+                self.send_header('Content-type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(json.dumps({'error': f"Invalid window '{window}' or limit"}).encode())
+                return
+            
+            summary = dict(summarize(time.time() - seconds, limit), window=window)
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+            self.end_headers()
+            self.wfile.write(json.dumps(summary).encode())
+            return
+        
         # API: Get agent activity (last 20 lines of log)
         if parsed_path.path in ['/agent', '/api/agent']:
             try:
-                import subprocess
-                result = subprocess.run(
-                    ['tail', '-50', '/tmp/buildbot-agent.log'],
-                    capture_output=True, text=True, timeout=5
-                )
+                with instruments.timer('subprocess_seconds', command='tail'):
+                    result = subprocess.run(
+                        ['tail', '-50', '/tmp/buildbot-agent.log'],
+                        capture_output=True, text=True, timeout=5
+                    )
                 
                 # Check if agent is running
-                ps_result = subprocess.run(
-                    ['pgrep', '-f', 'python3 build-fix-agent.py'],
-                    capture_output=True, text=True, timeout=5
-                )
+                with instruments.timer('subprocess_seconds', command='pgrep'):
+                    ps_result = subprocess.run(
+                        ['pgrep', '-f', 'python3 build-fix-agent.py'],
+                        capture_output=True, text=True, timeout=5
+                    )
                 is_running = ps_result.returncode == 0
                 
                 agent_data = {
@@ -578,6 +1197,28 @@ class DashboardHandler(http.server.SimpleHTTPRequestHandler):
         """Handle POST requests for triggering builds"""
         parsed_path = urlparse(self.path)
         
+        # GitHub webhook delivery
+        if parsed_path.path == '/webhook/github':
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if not verify_webhook_signature(body, self.headers.get('X-Hub-Signature-256')):
+                self.send_error(401, 'Invalid webhook signature')
+                return
+            
+            event = self.headers.get('X-GitHub-Event', '')
+            try:
+                payload = json.loads(body)
+            except json.JSONDecodeError:
+                self.send_error(400, 'Invalid JSON payload')
+                return
+            
+            result = 'pong' if event == 'ping' else handle_webhook_event(event, payload)
+            
+            self.send_response(202)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({'result': result}).encode())
+            return
+        
         # Trigger single app build
         if parsed_path.path.startswith('/trigger/'):
             parts = parsed_path.path.split('/')
@@ -589,11 +1230,11 @@ class DashboardHandler(http.server.SimpleHTTPRequestHandler):
                     self.send_error(404, 'App not found')
                     return
                 
-                if platform not in ['all', 'ios', 'aab', 'amazon', 'windows']:
+                if platform != 'all' and not all(p in ['ios', 'aab', 'amazon', 'windows'] for p in platform.split(',')):
                     self.send_error(400, 'Invalid platform')
                     return
                 
-                result = trigger_app_build(app_name, platform)
+                result = scheduler.trigger(app_name, platform)
                 
                 self.send_response(200)
                 self.send_header('Content-type', 'application/json')
@@ -610,24 +1251,23 @@ class DashboardHandler(http.server.SimpleHTTPRequestHandler):
                 self.send_error(400, 'Invalid platform')
                 return
             
-            results = []
-            successful = []
-            
-            for app in apps:
-                result = trigger_app_build(app['name'], platform)
-                results.append(result)
-                if result['success']:
-                    successful.append(app['name'])
-                time.sleep(1)  # Small delay between triggers
+            try:
+                priority = int(parse_qs(parsed_path.query).get('priority', ['0'])[0])
+            except ValueError:
+                self.send_error(400, 'Invalid priority')
+                return
             
+            # Queue the builds; the scheduler dispatches them as runners free up
+            batch = scheduler.submit([app['name'] for app in apps], platform, priority)
             response = {
-                'success': len(successful) > 0,
-                'count': len(successful),
-                'apps': successful,
-                'results': results
+                'success': True,
+                'batchId': batch['id'],
+                'count': len(batch['items']),
+                'apps': [app['name'] for app in apps],
+                'queue': f"/api/queue/{batch['id']}"
             }
             
-            self.send_response(200)
+            self.send_response(202)
             self.send_header('Content-type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
@@ -659,11 +1299,11 @@ class DashboardHandler(http.server.SimpleHTTPRequestHandler):
             runner_id = parsed_path.path.split('/restart-runner/')[1]
             
             try:
-                import subprocess
-                result = subprocess.run(
-                    ['launchctl', 'kickstart', '-k', f'gui/{os.getuid()}/actions.runner.LuckyJackpotCasino.{runner_id}'],
-                    capture_output=True, text=True, timeout=10
-                )
+                with instruments.timer('subprocess_seconds', command='launchctl kickstart'):
+                    result = subprocess.run(
+                        ['launchctl', 'kickstart', '-k', f'gui/{os.getuid()}/actions.runner.LuckyJackpotCasino.{runner_id}'],
+                        capture_output=True, text=True, timeout=10
+                    )
                 
                 response = {
                     'success': result.returncode == 0,
@@ -686,15 +1326,149 @@ class DashboardHandler(http.server.SimpleHTTPRequestHandler):
         
         self.send_error(404, 'Not found')
     
+    def send_event(self, event_id, event, data):
+        self.wfile.write(f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n".encode())
+        self.wfile.flush()
+    
+    def stream_events(self):
+        """Serve /api/events: a full snapshot (or a Last-Event-ID replay), then diffs as they happen"""
+        if not event_stream_slots.acquire(blocking=False):
+            # Too many open streams - the dashboard falls back to polling /api/status
+            self.send_response(503)
+            self.send_header('Retry-After', str(SSE_KEEPALIVE))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            return
+        try:
+            self.write_event_stream()
+        finally:
+            event_stream_slots.release()
+    
+    def write_event_stream(self):
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        
+        try:
+            last_id = int(self.headers.get('Last-Event-ID', ''))
+        except ValueError:
+            last_id = None
+        
+        try:
+            pending = event_hub.since(last_id) if last_id is not None else None
+            if pending is None:
+                # New client, or it missed events we no longer have - start from a full snapshot
+                last_id = event_hub.last_id
+                snapshot = {
+                    'status': {app['name']: get_build_status(app['name']) for app in apps},
+                    'runners': get_runner_status(),
+                    'queue': scheduler.to_dict(batches=False)
+                }
+                self.send_event(last_id, 'snapshot', snapshot)
+                pending = []
+            
+            while True:
+                for event_id, event, data in pending:
+                    self.send_event(event_id, event, data)
+                    last_id = event_id
+                pending = event_hub.wait(last_id, timeout=SSE_KEEPALIVE)
+                if pending is None or event_hub.closed:
+                    # Fell too far behind; make the client reconnect and resnapshot
+                    return
+                if not pending:
+                    self.wfile.write(b': keep-alive\n\n')
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, TimeoutError):
+            return
+    
     def log_message(self, format, *args):
         # Custom logging
         return
 
+BUSY_RESPONSE = (b'HTTP/1.1 503 Service Unavailable\r\nContent-Type: text/plain\r\nRetry-After: 1\r\n'
+                 b'Content-Length: 12\r\nConnection: close\r\n\r\nServer busy\n')
+
+class DashboardServer(http.server.HTTPServer):
+    """HTTP server that handles requests on a bounded pool of worker threads.
+
+    ThreadingHTTPServer starts a new thread for every connection; this caps
+    them at MAX_REQUEST_WORKERS. Up to MAX_QUEUED_REQUESTS more connections
+    wait for a worker, for at most QUEUE_TIMEOUT; the rest are answered 503.
+    """
+    allow_reuse_address = True  # Prevent "Address already in use" errors on restart
+
+    def __init__(self, server_address, handler_class, max_workers=MAX_REQUEST_WORKERS,
+                 max_queued=MAX_QUEUED_REQUESTS):
+        # Listen backlog (read by server_activate): room for every connection we'd accept
+        self.request_queue_size = max_workers + max_queued
+        super().__init__(server_address, handler_class)
+        self.workers = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='http')
+        self.slots = threading.BoundedSemaphore(max_workers + max_queued)
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            self.reject(request, 'queue_full')
+            self.shutdown_request(request)
+            return
+        try:
+            self.workers.submit(self.process_request_thread, request, client_address, time.monotonic())
+        except RuntimeError:  # Shutting down
+            self.slots.release()
+            self.shutdown_request(request)
+
+    def process_request_thread(self, request, client_address, accepted_at):
+        try:
+            if time.monotonic() - accepted_at > QUEUE_TIMEOUT:
+                self.reject(request, 'queue_timeout')
+                return
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def reject(self, request, reason):
+        """Answer 503 without reading the request, and close the connection"""
+        instruments.count('http_rejected_total', reason=reason)
+        log.warning("Server busy (%s) - answering 503", reason.replace('_', ' '))
+        try:
+            request.settimeout(1)
+            request.sendall(BUSY_RESPONSE)
+        except OSError:
+            pass
+
+    def server_close(self):
+        # Let open event streams finish so the worker threads can exit
+        event_hub.close()
+        super().server_close()
+        self.workers.shutdown(wait=False, cancel_futures=True)
+
 if __name__ == '__main__':
-    # Allow socket reuse to prevent "Address already in use" errors
-    socketserver.TCPServer.allow_reuse_address = True
+    logging.basicConfig(level=LOG_LEVEL, format='%(message)s', stream=sys.stdout)
+    if '--budget-report' in sys.argv:
+        budget_report()
+        sys.exit(0)
+    
+    # Load the GitHub token once, up front
+    if not get_client().token:
+        print("⚠️  No GitHub token found - set GITHUB_TOKEN or run: gh auth login", flush=True)
+    
+    # Show the last known statuses immediately; the poller then syncs only what's new
+    seed_statuses_from_history()
+    
+    # Keep the runner table current from filesystem events (or polling where inotify is unavailable).
+    # The first poller tick needs it, so wait (briefly) for the initial scan
+    runner_monitor.start().scanned.wait(timeout=10)
+    # Keep status snapshots warm in the background so requests never wait on GitHub
+    threading.Thread(target=status_poller, name='status-poller', daemon=True).start()
+    scheduler.start()
     
-    with socketserver.TCPServer(("", PORT), DashboardHandler) as httpd:
+    # Requests run on a bounded worker pool, so a slow bulk trigger or an open
+    # /api/events stream doesn't hold up other tabs
+    with DashboardServer(("", PORT), DashboardHandler) as httpd:
         print("""
 ╔════════════════════════════════════════════════════════════╗
 ║   🎰 Multi-Studio Build Dashboard Server                  ║